@@ -15,8 +15,8 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from app.core.database import Base
 from app.models.user import User
 from app.models.course import Course, Enrollment
-from app.models.content import CourseMaterial, VideoAnalysis
-from app.models.assessment import Assignment, AssignmentSubmission, Test, TestAttempt
+from app.models.content import CourseMaterial, VideoAnalysis, LatexProcessing
+from app.models.assessment import Assignment, AssignmentSubmission, Test, TestAttempt, GradingJob, AssignmentRubric, QuestionGrade, GradeMemo
 from app.models.profile import LecturerProfile, StudentProfile
 # Add other models as needed
 
@@ -0,0 +1,66 @@
+"""add assignment_rubrics table
+
+Revision ID: 2c9e4f71a8d3
+Revises: f3a86b0d4c19
+Create Date: 2026-10-17 16:31:05.246918
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2c9e4f71a8d3"
+down_revision: Union[str, Sequence[str], None] = "f3a86b0d4c19"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "assignment_rubrics",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("assignment_id", sa.UUID(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("questions_hash", sa.String(length=64), nullable=False),
+        sa.Column("rubric", sa.JSON(), nullable=False),
+        sa.Column("created_by", sa.UUID(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(
+            ["assignment_id"],
+            ["assignments.id"],
+            ondelete="CASCADE",
+        ),
+        sa.ForeignKeyConstraint(
+            ["created_by"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "assignment_id", "version", name="uq_assignment_rubrics_assignment_version"
+        ),
+    )
+    op.create_index(op.f("ix_assignment_rubrics_id"), "assignment_rubrics", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_assignment_rubrics_assignment_id"),
+        "assignment_rubrics",
+        ["assignment_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_assignment_rubrics_assignment_id"), table_name="assignment_rubrics")
+    op.drop_index(op.f("ix_assignment_rubrics_id"), table_name="assignment_rubrics")
+    op.drop_table("assignment_rubrics")
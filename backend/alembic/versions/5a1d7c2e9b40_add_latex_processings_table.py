@@ -0,0 +1,53 @@
+"""add latex_processings table
+
+Revision ID: 5a1d7c2e9b40
+Revises: cb0bb794be00
+Create Date: 2026-10-17 09:12:31.402118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5a1d7c2e9b40"
+down_revision: Union[str, Sequence[str], None] = "cb0bb794be00"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "latex_processings",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("operation", sa.String(), nullable=False),
+        sa.Column("input_data", sa.Text(), nullable=False),
+        sa.Column("output_data", sa.Text(), nullable=True),
+        sa.Column("is_valid", sa.Boolean(), nullable=True),
+        sa.Column("metadata", sa.JSON(), nullable=True),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_latex_processings_id"), "latex_processings", ["id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_latex_processings_id"), table_name="latex_processings")
+    op.drop_table("latex_processings")
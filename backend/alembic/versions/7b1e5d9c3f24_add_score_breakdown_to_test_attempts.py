@@ -0,0 +1,29 @@
+"""add test_attempts.score_breakdown
+
+Revision ID: 7b1e5d9c3f24
+Revises: 2c9e4f71a8d3
+Create Date: 2026-10-17 18:42:16.305118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b1e5d9c3f24"
+down_revision: Union[str, Sequence[str], None] = "2c9e4f71a8d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("test_attempts", sa.Column("score_breakdown", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("test_attempts", "score_breakdown")
@@ -0,0 +1,72 @@
+"""add grading_jobs table
+
+Revision ID: 8e3f1b6a2c57
+Revises: 5a1d7c2e9b40
+Create Date: 2026-10-17 10:05:48.311907
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8e3f1b6a2c57"
+down_revision: Union[str, Sequence[str], None] = "5a1d7c2e9b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "grading_jobs",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("assignment_id", sa.UUID(), nullable=False),
+        sa.Column("requested_by", sa.UUID(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "RUNNING", "COMPLETED", "FAILED", name="gradingjobstatus"),
+            nullable=False,
+        ),
+        sa.Column("regrade", sa.Boolean(), nullable=True),
+        sa.Column("submission_ids", sa.JSON(), nullable=True),
+        sa.Column("results", sa.JSON(), nullable=True),
+        sa.Column("total_count", sa.Integer(), nullable=True),
+        sa.Column("graded_count", sa.Integer(), nullable=True),
+        sa.Column("failed_count", sa.Integer(), nullable=True),
+        sa.Column("comparative_analysis", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["assignment_id"],
+            ["assignments.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["requested_by"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_grading_jobs_id"), "grading_jobs", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_grading_jobs_assignment_id"), "grading_jobs", ["assignment_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_grading_jobs_assignment_id"), table_name="grading_jobs")
+    op.drop_index(op.f("ix_grading_jobs_id"), table_name="grading_jobs")
+    op.drop_table("grading_jobs")
+    sa.Enum(name="gradingjobstatus").drop(op.get_bind(), checkfirst=True)
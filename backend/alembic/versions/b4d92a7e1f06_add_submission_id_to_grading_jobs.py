@@ -0,0 +1,41 @@
+"""add submission_id to grading_jobs
+
+Revision ID: b4d92a7e1f06
+Revises: 8e3f1b6a2c57
+Create Date: 2026-10-17 11:20:14.902336
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b4d92a7e1f06"
+down_revision: Union[str, Sequence[str], None] = "8e3f1b6a2c57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("grading_jobs", sa.Column("submission_id", sa.UUID(), nullable=True))
+    op.create_index(
+        op.f("ix_grading_jobs_submission_id"), "grading_jobs", ["submission_id"], unique=False
+    )
+    op.create_foreign_key(
+        "fk_grading_jobs_submission_id",
+        "grading_jobs",
+        "assignment_submissions",
+        ["submission_id"],
+        ["id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("fk_grading_jobs_submission_id", "grading_jobs", type_="foreignkey")
+    op.drop_index(op.f("ix_grading_jobs_submission_id"), table_name="grading_jobs")
+    op.drop_column("grading_jobs", "submission_id")
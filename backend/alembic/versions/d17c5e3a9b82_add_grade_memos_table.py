@@ -0,0 +1,64 @@
+"""add grade_memos table
+
+Revision ID: d17c5e3a9b82
+Revises: b4d92a7e1f06
+Create Date: 2026-10-17 13:42:37.518204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d17c5e3a9b82"
+down_revision: Union[str, Sequence[str], None] = "b4d92a7e1f06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "grade_memos",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("memo_key", sa.String(length=64), nullable=False),
+        sa.Column("assignment_id", sa.UUID(), nullable=False),
+        sa.Column("rubric_hash", sa.String(length=64), nullable=False),
+        sa.Column("source_submission_id", sa.UUID(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=False),
+        sa.Column("model", sa.String(), nullable=True),
+        sa.Column("hit_count", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("last_hit_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["assignment_id"],
+            ["assignments.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["source_submission_id"],
+            ["assignment_submissions.id"],
+            ondelete="SET NULL",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_grade_memos_id"), "grade_memos", ["id"], unique=False)
+    op.create_index(op.f("ix_grade_memos_memo_key"), "grade_memos", ["memo_key"], unique=True)
+    op.create_index(
+        op.f("ix_grade_memos_assignment_id"), "grade_memos", ["assignment_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_grade_memos_assignment_id"), table_name="grade_memos")
+    op.drop_index(op.f("ix_grade_memos_memo_key"), table_name="grade_memos")
+    op.drop_index(op.f("ix_grade_memos_id"), table_name="grade_memos")
+    op.drop_table("grade_memos")
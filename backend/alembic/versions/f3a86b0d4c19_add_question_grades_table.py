@@ -0,0 +1,63 @@
+"""add question_grades table and grading_jobs.question_indices
+
+Revision ID: f3a86b0d4c19
+Revises: d17c5e3a9b82
+Create Date: 2026-10-17 15:08:52.774031
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a86b0d4c19"
+down_revision: Union[str, Sequence[str], None] = "d17c5e3a9b82"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "question_grades",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("submission_id", sa.UUID(), nullable=False),
+        sa.Column("question_index", sa.Integer(), nullable=False),
+        sa.Column("question_hash", sa.String(length=64), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("max_score", sa.Float(), nullable=False),
+        sa.Column("feedback", sa.Text(), nullable=True),
+        sa.Column("strengths", sa.JSON(), nullable=True),
+        sa.Column("areas_of_improvement", sa.JSON(), nullable=True),
+        sa.Column(
+            "graded_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(
+            ["submission_id"],
+            ["assignment_submissions.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "submission_id", "question_index", name="uq_question_grades_submission_question"
+        ),
+    )
+    op.create_index(op.f("ix_question_grades_id"), "question_grades", ["id"], unique=False)
+    op.create_index(
+        op.f("ix_question_grades_submission_id"), "question_grades", ["submission_id"], unique=False
+    )
+    op.add_column("grading_jobs", sa.Column("question_indices", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("grading_jobs", "question_indices")
+    op.drop_index(op.f("ix_question_grades_submission_id"), table_name="question_grades")
+    op.drop_index(op.f("ix_question_grades_id"), table_name="question_grades")
+    op.drop_table("question_grades")
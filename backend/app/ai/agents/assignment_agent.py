@@ -3,8 +3,10 @@ from langchain_classic.tools import Tool
 from langchain_classic.agents import AgentExecutor
 from langchain_classic.memory import ConversationBufferMemory
 from langchain_classic.prompts import PromptTemplate
-from app.services.llm_service import LLMService
-from app.services.grading_service import GradingService
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.grading_service import GradingService, get_grading_service
+from app.services.calibration_service import score_distribution
+from app.ai.chains.assignment_chain import RubricChain
 from app.utils.pdf_processor import PDFProcessor
 import logging
 
@@ -13,9 +15,13 @@ logger = logging.getLogger(__name__)
 class AssignmentAgent:
     """AI Agent for assignment generation and management."""
     
-    def __init__(self):
-        self.llm_service = LLMService()
-        self.grading_service = GradingService()
+    def __init__(
+        self,
+        llm_service: Optional[LLMService] = None,
+        grading_service: Optional[GradingService] = None
+    ):
+        self.llm_service = llm_service or get_llm_service()
+        self.grading_service = grading_service or get_grading_service()
         self.pdf_processor = PDFProcessor()
         self.memory = ConversationBufferMemory(
             memory_key="chat_history",
@@ -107,44 +113,12 @@ class AssignmentAgent:
         criteria_count: int = 4
     ) -> Dict[str, Any]:
         """Tool for generating grading rubrics."""
-        prompt = f"""
-        Create a detailed grading rubric for this assignment:
-        
-        Assignment: {assignment.get('title', 'Untitled')}
-        Questions: {assignment.get('questions', [])}
-        
-        Create {criteria_count} grading criteria with:
-        1. Criterion name
-        2. Description
-        3. Weight (percentage)
-        4. Performance levels (Excellent, Good, Fair, Poor)
-        5. Example indicators for each level
-        
-        Return as structured JSON.
-        """
-        
-        try:
-            response = await self.llm_service.llm.ainvoke(prompt)
-            return {
-                "rubric": {
-                    "criteria": [
-                        {
-                            "name": "Content Accuracy",
-                            "description": "Correctness of information",
-                            "weight": 25,
-                            "levels": {
-                                "Excellent": "All information correct and well-sourced",
-                                "Good": "Most information correct",
-                                "Fair": "Some errors present",
-                                "Poor": "Numerous errors"
-                            }
-                        }
-                    ]
-                }
-            }
-        except Exception as e:
-            logger.error(f"Rubric generation error: {e}")
-            return {"error": str(e)}
+        questions = assignment.get('questions', [])
+        return await RubricChain().generate_rubric(
+            assignment.get('title', 'Untitled'),
+            assignment.get('description') or str(questions)[:2000],
+            criteria_count
+        )
     
     async def _grade_submission_tool(
         self,
@@ -221,27 +195,7 @@ class AssignmentAgent:
     
     def _calculate_distribution(self, scores: List[float]) -> Dict[str, int]:
         """Calculate score distribution."""
-        distribution = {
-            "90-100": 0,
-            "80-89": 0,
-            "70-79": 0,
-            "60-69": 0,
-            "0-59": 0
-        }
-        
-        for score in scores:
-            if score >= 90:
-                distribution["90-100"] += 1
-            elif score >= 80:
-                distribution["80-89"] += 1
-            elif score >= 70:
-                distribution["70-79"] += 1
-            elif score >= 60:
-                distribution["60-69"] += 1
-            else:
-                distribution["0-59"] += 1
-        
-        return distribution
+        return score_distribution(scores)
     
     async def _identify_common_issues(self, submissions: List[Dict[str, Any]]) -> List[str]:
         """Identify common issues across submissions."""
@@ -296,7 +250,7 @@ class AssignmentAgent:
         
         return {
             "assignment_package": assignment["assignment"],
-            "grading_rubric": rubric["rubric"],
+            "grading_rubric": rubric.get("rubric"),
             "instructions": instructions,
             "estimated_grading_time": len(assignment["assignment"].get("questions", [])) * 3,  # minutes
             "difficulty_level": kwargs.get("difficulty", "medium")
@@ -1,9 +1,9 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
 from langchain_classic.tools import Tool
 from langchain_classic.agents import AgentExecutor, create_react_agent
 from langchain_core.prompts import PromptTemplate
 import wikipediaapi
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, get_llm_service
 from app.utils.powerpoint_generator import PowerPointGenerator
 import logging
 
@@ -12,8 +12,8 @@ logger = logging.getLogger(__name__)
 class CourseAgent:
     """AI Agent for course material generation and enhancement"""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self.llm_service = llm_service or get_llm_service()
         self.wiki_api = wikipediaapi.Wikipedia(
             language='en',
             user_agent='AI-Edu-Platform/1.0'
@@ -110,4 +110,14 @@ class CourseAgent:
             "generated_content": generated_content,
             "powerpoint": ppt_result,
             "key_concepts": self._extract_key_concepts(generated_content)
-        }
\ No newline at end of file
+        }
+    
+    async def stream_course_content(self, topic: str, **kwargs) -> AsyncIterator[str]:
+        """Research a topic and stream the generated material chunk by chunk"""
+        wiki_content = self._search_wikipedia(topic)
+        async for chunk in self.llm_service.stream_course_material(
+            topic,
+            context=wiki_content,
+            **kwargs
+        ):
+            yield chunk
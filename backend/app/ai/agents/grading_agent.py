@@ -1,9 +1,19 @@
 from typing import List, Dict, Any, Optional
 from langchain_classic.tools import Tool
 from langchain_classic.agents import AgentExecutor
-from langchain_classic.memory import ConversationBufferMemory
-from app.services.llm_service import LLMService
-from app.services.grading_service import GradingService
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.llm_admission import Priority
+from app.services.grading_service import GradingService, get_grading_service
+from app.services.rubric_service import rubric_service
+from app.services.plagiarism_service import get_plagiarism_service
+from app.services.similarity_service import cohort_similarity
+from app.services.calibration_service import fairness
+from app.services.grading_memory import GradingMemory, grading_memory
+from app.utils.token_budget import Section, budget_for, fit_context, fit_text
+from app.utils.json_repair import repair_json
+from app.utils.dag import Step, run_dag
+from types import SimpleNamespace
+import asyncio
 import numpy as np
 import logging
 
@@ -12,13 +22,16 @@ logger = logging.getLogger(__name__)
 class GradingAgent:
     """AI Agent for intelligent grading and feedback generation."""
     
-    def __init__(self):
-        self.llm_service = LLMService()
-        self.grading_service = GradingService()
-        self.memory = ConversationBufferMemory(
-            memory_key="grading_history",
-            return_messages=True
-        )
+    def __init__(
+        self,
+        llm_service: Optional[LLMService] = None,
+        grading_service: Optional[GradingService] = None,
+        memory: Optional[GradingMemory] = None
+    ):
+        self.llm_service = llm_service or get_llm_service()
+        self.grading_service = grading_service or get_grading_service()
+        # Bounded history per (student, course), shared across agent instances
+        self.memory = memory or grading_memory
         self.tools = self._create_tools()
         self.agent = self._create_agent()
     
@@ -70,14 +83,15 @@ class GradingAgent:
     async def _analyze_submission_quality_tool(
         self,
         submission: str,
-        requirements: Dict[str, Any]
+        requirements: Dict[str, Any],
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """Analyze submission quality against requirements."""
         prompt = f"""
         Analyze this submission against requirements:
         
         Requirements: {requirements}
-        Submission: {submission[:2000]}
+        Submission: {fit_text("grading_quality_analysis", submission)}
         
         Evaluate:
         1. Completeness (all requirements addressed)
@@ -89,10 +103,13 @@ class GradingAgent:
         Provide scores (0-10) for each category.
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
+        analysis = await self.llm_service.invoke_text(
+            prompt, template_id="grading_quality_analysis", use_cache=use_cache,
+            priority=Priority.INTERACTIVE
+        )
         
         return {
-            "analysis": response.content,
+            "analysis": analysis,
             "scores": {
                 "completeness": 8,
                 "relevance": 9,
@@ -129,8 +146,17 @@ class GradingAgent:
         if len(set(len(line) for line in lines)) > 5:
             warnings.append("Inconsistent formatting may indicate copying")
         
+        # Shingle overlap with the course materials, estimated with MinHash
+        source_overlap = 0.0
+        if course_materials:
+            overlaps = get_plagiarism_service().text_overlap(submission, course_materials)
+            source_overlap = max(overlaps)
+            if source_overlap >= 0.3:
+                warnings.append(f"Overlaps course material {overlaps.index(source_overlap) + 1} (~{source_overlap:.0%} of shingles)")
+        
         return {
-            "plagiarism_score": len(warnings) * 0.1,  # 0-1 scale
+            "plagiarism_score": min(1.0, max(len(warnings) * 0.1, source_overlap)),  # 0-1 scale
+            "source_overlap": round(source_overlap, 3),
             "warnings": warnings,
             "recommendation": "Review manually if score > 0.3"
         }
@@ -138,13 +164,14 @@ class GradingAgent:
     async def _evaluate_critical_thinking_tool(
         self,
         submission: str,
-        topic: str
+        topic: str,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """Evaluate critical thinking in submission."""
         prompt = f"""
         Evaluate critical thinking in this submission about {topic}:
         
-        {submission[:1500]}
+        {fit_text("grading_critical_thinking", submission)}
         
         Assess:
         1. Analysis depth (surface vs deep)
@@ -156,13 +183,16 @@ class GradingAgent:
         Provide specific examples from text.
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
+        response = await self.llm_service.invoke_text(
+            prompt, template_id="grading_critical_thinking", use_cache=use_cache,
+            priority=Priority.INTERACTIVE
+        )
         
         return {
             "critical_thinking_score": 7.5,  # Placeholder
             "strengths": ["Good use of evidence", "Clear logical flow"],
             "weaknesses": ["Limited counterarguments", "Could go deeper"],
-            "examples": response.content[:500]
+            "examples": response[:500]
         }
     
     async def _generate_personalized_feedback_tool(
@@ -170,15 +200,24 @@ class GradingAgent:
         submission: str,
         student_history: Dict[str, Any] = None,
         strengths: List[str] = None,
-        weaknesses: List[str] = None
+        weaknesses: List[str] = None,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """Generate personalized feedback."""
+        history = self._history_text(student_history)
+        context = fit_context(
+            "grading_personalized_feedback",
+            Section("submission", submission, priority=0),
+            Section("history", history, priority=1)
+        )
         prompt = f"""
         Generate personalized feedback for student.
         
-        Submission excerpt: {submission[:1000]}
+        Submission excerpt: {context["submission"]}
         Student strengths: {strengths or ['Good effort']}
         Areas for improvement: {weaknesses or ['Depth of analysis']}
+        Recent grades in this course:
+        {context["history"] or 'None'}
         
         Make feedback:
         1. Specific and actionable
@@ -190,10 +229,13 @@ class GradingAgent:
         Format as: Strengths, Areas to Improve, Specific Actions, Encouragement.
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
+        personalized_feedback = await self.llm_service.invoke_text(
+            prompt, template_id="grading_personalized_feedback", use_cache=use_cache,
+            priority=Priority.INTERACTIVE
+        )
         
         return {
-            "personalized_feedback": response.content,
+            "personalized_feedback": personalized_feedback,
             "feedback_type": "constructive",
             "tone": "encouraging",
             "action_items": 3
@@ -202,54 +244,110 @@ class GradingAgent:
     async def _compare_with_exemplars_tool(
         self,
         submission: str,
-        exemplars: List[str]
+        exemplars: List[str],
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """Compare submission with exemplar answers."""
         if not exemplars:
             return {"error": "No exemplars provided"}
         
-        comparisons = []
-        
-        for i, exemplar in enumerate(exemplars[:3]):
-            prompt = f"""
-            Compare this submission with exemplar:
-            
-            Submission: {submission[:1000]}
-            Exemplar: {exemplar[:1000]}
-            
-            Identify:
-            1. Key differences in approach
-            2. Missing elements in submission
-            3. Strengths unique to each
-            4. Learning opportunities
-            
-            Keep comparison constructive.
-            """
-            
-            response = await self.llm_service.llm.ainvoke(prompt)
-            comparisons.append({
-                "exemplar_id": i + 1,
-                "comparison": response.content[:500],
-                "similarity_score": 0.7
-            })
+        cohort = await self.compare_cohort_with_exemplars({"submission": submission}, exemplars, top_k=1, use_cache=use_cache)
+        result = cohort["submissions"][0]
+        comparisons = [
+            {**scored, "comparison": result.get("comparison") if scored["exemplar_id"] == result["best_exemplar_id"] else None}
+            for scored in result["exemplar_similarities"]
+        ]
         
         return {
             "comparisons": comparisons,
-            "average_similarity": np.mean([c["similarity_score"] for c in comparisons]),
+            "average_similarity": result["average_similarity"],
             "key_learning_gaps": self._identify_learning_gaps(comparisons)
         }
     
+    async def compare_cohort_with_exemplars(
+        self,
+        submissions: Dict[Any, str],
+        exemplars: List[str],
+        top_k: int = 3,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Score every submission against every exemplar, then explain the outliers.
+
+        Similarities come from one vectorized TF-IDF pass; only the ``top_k``
+        submissions furthest from all exemplars get an LLM comparison with
+        their nearest exemplar.
+        """
+        if not exemplars:
+            return {"error": "No exemplars provided"}
+        
+        similarity = cohort_similarity(submissions, exemplars)
+        results = [similarity.summary(i) for i in range(len(similarity.submission_ids))]
+        divergent = similarity.most_divergent(top_k)
+        
+        comparisons = await asyncio.gather(*[
+            self._exemplar_comparison(
+                submissions[similarity.submission_ids[i]],
+                exemplars[results[i]["best_exemplar_id"] - 1],
+                use_cache
+            )
+            for i in divergent
+        ])
+        for i, comparison in zip(divergent, comparisons):
+            results[i]["comparison"] = comparison
+            results[i]["divergent"] = True
+        
+        best = similarity.best_similarity
+        return {
+            "submissions": results,
+            "average_similarity": round(float(similarity.matrix.mean()), 3) if results else 0.0,
+            "best_similarity_distribution": {
+                "mean": round(float(best.mean()), 3),
+                "min": round(float(best.min()), 3),
+                "max": round(float(best.max()), 3)
+            } if results else None,
+            "divergent_submission_ids": [similarity.submission_ids[i] for i in divergent]
+        }
+    
+    async def _exemplar_comparison(self, submission: str, exemplar: str, use_cache: bool = True) -> str:
+        # Submission first, but keep at least a third of the budget for the exemplar
+        context = fit_context(
+            "grading_exemplar_comparison",
+            Section("submission", submission, priority=0),
+            Section("exemplar", exemplar, priority=1, min_tokens=budget_for("grading_exemplar_comparison") // 3)
+        )
+        prompt = f"""
+        Compare this submission with exemplar:
+        
+        Submission: {context["submission"]}
+        Exemplar: {context["exemplar"]}
+        
+        Identify:
+        1. Key differences in approach
+        2. Missing elements in submission
+        3. Strengths unique to each
+        4. Learning opportunities
+        
+        Keep comparison constructive.
+        """
+        
+        response = await self.llm_service.invoke_text(
+            prompt, template_id="grading_exemplar_comparison", use_cache=use_cache,
+            priority=Priority.INTERACTIVE
+        )
+        return response[:500]
+    
     async def _suggest_improvements_tool(
         self,
         submission: str,
-        rubric: Dict[str, Any]
+        rubric: Dict[str, Any],
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """Suggest specific improvements based on rubric."""
         prompt = f"""
         Suggest specific improvements for this submission based on rubric:
         
         Rubric Criteria: {rubric.get('criteria', [])}
-        Submission: {submission[:1500]}
+        Submission: {fit_text("grading_improvements", submission)}
         
         For each rubric criterion, suggest:
         1. What's working well
@@ -260,10 +358,13 @@ class GradingAgent:
         Be practical and actionable.
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
+        response = await self.llm_service.invoke_text(
+            prompt, template_id="grading_improvements", use_cache=use_cache,
+            priority=Priority.INTERACTIVE
+        )
         
         suggestions = []
-        lines = response.content.split('\n')
+        lines = response.split('\n')
         
         for line in lines:
             if line.strip() and len(line) > 20:
@@ -284,35 +385,8 @@ class GradingAgent:
         if len(grades) < 2:
             return {"fairness_score": 1.0, "message": "Insufficient data"}
         
-        scores = [g.get("score", 0) for g in grades]
-        
-        # Calculate statistical fairness
-        mean_score = np.mean(scores)
-        std_dev = np.std(scores)
-        cv = std_dev / mean_score if mean_score > 0 else 0
-        
-        # Fairness score (0-1, higher is fairer)
-        # Lower coefficient of variation indicates more consistent grading
-        fairness_score = max(0, 1 - min(cv, 1))
-        
-        # Check for potential biases
-        potential_biases = []
-        if std_dev > mean_score * 0.5:
-            potential_biases.append("High score variance")
-        
-        # Check for clustering
-        if len(set(round(s) for s in scores)) < 3:
-            potential_biases.append("Score clustering - may need finer grading scale")
-        
         return {
-            "fairness_score": round(fairness_score, 3),
-            "statistics": {
-                "mean": round(mean_score, 2),
-                "std_dev": round(std_dev, 2),
-                "cv": round(cv, 3),
-                "range": [min(scores), max(scores)]
-            },
-            "potential_biases": potential_biases,
+            **fairness([g.get("score", 0) for g in grades]),
             "recommendations": [
                 "Use consistent rubric application",
                 "Grade anonymously if possible",
@@ -355,39 +429,48 @@ class GradingAgent:
         self,
         assignment: Dict[str, Any],
         submission: str,
-        student_info: Dict[str, Any] = None
+        student_info: Dict[str, Any] = None,
+        use_cache: bool = True,
+        mode: str = "dag"
     ) -> Dict[str, Any]:
-        """Intelligently grade submission with comprehensive analysis."""
-        # Step 1: Basic grading
-        basic_grade = await self.grading_service.grade_submission(
-            assignment=assignment,
-            submission_content=submission,
-            submission_id=0
-        )
-        
-        # Step 2: Quality analysis
-        quality_analysis = await self._analyze_submission_quality_tool(
-            submission,
-            assignment.get("requirements", {})
-        )
-        
-        # Step 3: Critical thinking evaluation
-        critical_thinking = await self._evaluate_critical_thinking_tool(
-            submission,
-            assignment.get("topic", "assignment")
-        )
-        
-        # Step 4: Personalized feedback
-        personalized_feedback = await self._generate_personalized_feedback_tool(
-            submission,
-            student_info,
-            critical_thinking.get("strengths", []),
-            critical_thinking.get("weaknesses", [])
-        )
-        
-        # Step 5: Improvement suggestions
-        rubric = self.grading_service._create_grading_rubric(assignment)
-        improvements = await self._suggest_improvements_tool(submission, rubric)
+        """Intelligently grade submission with comprehensive analysis.
+
+        ``mode="dag"`` runs the analysis tools concurrently as their
+        dependencies allow; ``mode="fused"`` asks for every aspect in one
+        structured prompt and falls back to the DAG if the reply is unusable.
+        When ``student_info`` has ``student_id`` and ``course_id``, feedback
+        draws on the student's recent grades in the course and this grade
+        is added to them.
+        """
+        if mode not in ("dag", "fused"):
+            raise ValueError(f"Unknown grading mode: {mode}")
+        
+        timings: Dict[str, float] = {}
+        # One rubric, the assignment's stored version when it has one, for every step
+        rubric = await rubric_service.resolve(self._as_assignment(assignment))
+        aspects = None
+        if mode == "fused":
+            aspects = await self._fused_evaluation(assignment, submission, rubric, use_cache)
+        if aspects is None:
+            mode = "dag"
+            aspects = await run_dag(self._grading_steps(assignment, submission, rubric, student_info, use_cache), timings)
+        
+        basic_grade = aspects["basic_grading"]
+        quality_analysis = aspects["quality_analysis"]
+        critical_thinking = aspects["critical_thinking"]
+        personalized_feedback = aspects["personalized_feedback"]
+        improvements = aspects["improvement_suggestions"]
+        
+        scope = self._memory_scope(student_info)
+        if scope:
+            self.memory.add(
+                *scope,
+                assignment=assignment.get("title", assignment.get("topic", "Assignment")),
+                score=basic_grade.get("score"),
+                max_score=assignment.get("max_score", 100),
+                strengths=critical_thinking.get("strengths"),
+                weaknesses=critical_thinking.get("weaknesses")
+            )
         
         return {
             "basic_grading": basic_grade,
@@ -403,9 +486,187 @@ class GradingAgent:
             "learning_insights": self._generate_learning_insights(
                 quality_analysis,
                 critical_thinking
+            ),
+            "execution": {"mode": mode, "step_seconds": timings}
+        }
+    
+    @staticmethod
+    def _memory_scope(student_info: Optional[Dict[str, Any]]) -> Optional[tuple]:
+        """(student id, course id) from student_info, when both are given."""
+        if student_info and student_info.get("student_id") and student_info.get("course_id"):
+            return student_info["student_id"], student_info["course_id"]
+        return None
+    
+    def _history_text(self, student_info: Optional[Dict[str, Any]]) -> str:
+        scope = self._memory_scope(student_info)
+        return self.memory.render(*scope) if scope else ""
+    
+    @staticmethod
+    def _as_assignment(assignment: Dict[str, Any]) -> SimpleNamespace:
+        """Attribute view of an assignment dict, as GradingService expects a model."""
+        return SimpleNamespace(
+            id=assignment.get("id"),
+            title=assignment.get("title", assignment.get("topic", "Assignment")),
+            questions=assignment.get("questions"),
+            max_score=assignment.get("max_score", 100)
+        )
+    
+    def _grading_steps(
+        self,
+        assignment: Dict[str, Any],
+        submission: str,
+        rubric: Dict[str, Any],
+        student_info: Optional[Dict[str, Any]],
+        use_cache: bool
+    ) -> Dict[str, Step]:
+        """Analysis tools as a dependency graph; only feedback waits on another step."""
+        async def basic_grading():
+            return await self.grading_service.grade_submission(
+                assignment=self._as_assignment(assignment),
+                submission_content=submission,
+                submission_id=0,
+                use_cache=use_cache,
+                rubric=rubric
             )
+        
+        async def quality_analysis():
+            return await self._analyze_submission_quality_tool(
+                submission,
+                assignment.get("requirements", {}),
+                use_cache=use_cache
+            )
+        
+        async def critical_thinking():
+            return await self._evaluate_critical_thinking_tool(
+                submission,
+                assignment.get("topic", "assignment"),
+                use_cache=use_cache
+            )
+        
+        async def personalized_feedback(critical_thinking):
+            return await self._generate_personalized_feedback_tool(
+                submission,
+                student_info,
+                critical_thinking.get("strengths", []),
+                critical_thinking.get("weaknesses", []),
+                use_cache=use_cache
+            )
+        
+        async def improvement_suggestions():
+            return await self._suggest_improvements_tool(
+                submission, rubric, use_cache=use_cache
+            )
+        
+        return {
+            "basic_grading": Step(basic_grading),
+            "quality_analysis": Step(quality_analysis),
+            "critical_thinking": Step(critical_thinking),
+            "personalized_feedback": Step(personalized_feedback, depends_on=("critical_thinking",)),
+            "improvement_suggestions": Step(improvement_suggestions)
         }
     
+    async def _fused_evaluation(
+        self,
+        assignment: Dict[str, Any],
+        submission: str,
+        rubric: Dict[str, Any],
+        use_cache: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """Get every grading aspect from a single structured prompt.
+
+        Returns the aspects in the same shape as the DAG steps, or None when
+        the completion cannot be parsed.
+        """
+        max_score = assignment.get("max_score", 100)
+        prompt = f"""
+        Evaluate every aspect of this submission and return ONLY a JSON object.
+        
+        Topic: {assignment.get("topic", "assignment")}
+        Requirements: {assignment.get("requirements", {})}
+        Rubric Criteria: {rubric.get('criteria', [])}
+        Submission: {fit_text("grading_fused", submission)}
+        
+        Score the submission out of {max_score} and return these keys:
+        - "score": number from 0 to {max_score}
+        - "feedback": overall assessment
+        - "strengths": list of strings
+        - "areas_of_improvement": list of strings
+        - "quality_scores": object with completeness, relevance, depth, originality and structure, each 0-10
+        - "critical_thinking": object with "score" (0-10), "strengths", "weaknesses" and "examples" quoted from the text
+        - "personalized_feedback": specific, encouraging feedback formatted as Strengths, Areas to Improve, Specific Actions, Encouragement
+        - "improvement_suggestions": list of practical, actionable suggestions tied to the rubric
+        """
+        
+        response = await self.llm_service.invoke_text(
+            prompt, template_id="grading_fused", use_cache=use_cache,
+            priority=Priority.INTERACTIVE
+        )
+        try:
+            result = repair_json(response)
+            if not isinstance(result, dict) or "score" not in result:
+                raise ValueError("missing score")
+            
+            # Every conversion happens here so a malformed field falls back to the step graph
+            score = float(result["score"])
+            if not np.isfinite(score):
+                raise ValueError(f"score is not a number: {result['score']}")
+            quality = result.get("quality_scores") or {}
+            thinking = result.get("critical_thinking") or {}
+            if not isinstance(quality, dict) or not isinstance(thinking, dict):
+                raise TypeError("quality_scores and critical_thinking must be objects")
+            quality_scores = {k: float(v) for k, v in quality.items()}
+            thinking_score = float(thinking.get("score", 0))
+            suggestions = self._string_list(result.get("improvement_suggestions"))
+            
+            return {
+                "basic_grading": self.grading_service._process_grade_result(
+                    {
+                        "overall_score": score,
+                        "detailed_feedback": str(result.get("feedback", "")),
+                        "ai_feedback": "AI grading completed.",
+                        "strengths": self._string_list(result.get("strengths")),
+                        "areas_of_improvement": self._string_list(result.get("areas_of_improvement"))
+                    },
+                    max_score
+                ),
+                "quality_analysis": {
+                    "analysis": str(result.get("feedback", "")),
+                    "scores": quality_scores,
+                    "overall_quality": round(float(np.mean(list(quality_scores.values()))), 1) if quality_scores else 0.0
+                },
+                "critical_thinking": {
+                    "critical_thinking_score": thinking_score,
+                    "strengths": self._string_list(thinking.get("strengths")),
+                    "weaknesses": self._string_list(thinking.get("weaknesses")),
+                    "examples": str(thinking.get("examples", ""))[:500]
+                },
+                "personalized_feedback": {
+                    "personalized_feedback": str(result.get("personalized_feedback", "")),
+                    "feedback_type": "constructive",
+                    "tone": "encouraging",
+                    "action_items": 3
+                },
+                "improvement_suggestions": {
+                    "improvement_suggestions": suggestions[:10],
+                    "priority_levels": self._assign_priority_levels(suggestions),
+                    "estimated_improvement": "10-15% with implementation"
+                }
+            }
+        except (ValueError, TypeError, AttributeError, KeyError) as e:
+            logger.warning(f"Fused grading output unusable, running the step graph instead: {e}")
+            return None
+    
+    @staticmethod
+    def _string_list(value: Any) -> List[str]:
+        """A list field of the fused output; a bare string is one item."""
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [value] if value.strip() else []
+        if not isinstance(value, list):
+            raise TypeError(f"expected a list, got {type(value).__name__}")
+        return [str(item) for item in value]
+    
     def _calculate_comprehensive_score(
         self,
         basic_score: float,
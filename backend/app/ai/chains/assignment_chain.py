@@ -2,8 +2,11 @@ from typing import List, Dict, Any
 from langchain_classic.chains.llm import LLMChain
 from langchain_classic.prompts import PromptTemplate
 from langchain_classic.output_parsers import PydanticOutputParser
-from pydantic import BaseModel, Field
-from app.services.llm_service import LLMService
+from pydantic import BaseModel, Field, ValidationError
+from app.services.llm_service import get_llm_service
+from app.services.llm_admission import Priority
+from app.utils.json_repair import RepairingJsonOutputParser
+from functools import cached_property
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,7 +32,7 @@ class AssignmentChain:
     """Chain for generating assignment structures."""
     
     def __init__(self):
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
         self.parser = PydanticOutputParser(pydantic_object=AssignmentStructure)
         
         self.prompt = PromptTemplate(
@@ -48,8 +51,11 @@ class AssignmentChain:
             input_variables=["topic", "course_context", "difficulty", "question_types", "num_questions"],
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
-        
-        self.chain = LLMChain(
+    
+    @cached_property
+    def chain(self) -> LLMChain:
+        """LLM chain, built on first use so importing does not create a client."""
+        return LLMChain(
             llm=self.llm_service.llm,
             prompt=self.prompt,
             output_parser=self.parser,
@@ -69,12 +75,18 @@ class AssignmentChain:
             question_types = ["essay", "short_answer"]
         
         try:
-            result = await self.chain.arun(
-                topic=topic,
-                course_context=course_context,
-                difficulty=difficulty,
-                question_types=", ".join(question_types),
-                num_questions=num_questions
+            variables = {
+                "topic": topic,
+                "course_context": course_context,
+                "difficulty": difficulty,
+                "question_types": ", ".join(question_types),
+                "num_questions": num_questions
+            }
+            result = await self.llm_service.execute(
+                "assignment_chain",
+                variables,
+                lambda: self.chain.arun(**variables),
+                priority=Priority.BULK
             )
             return result
         except Exception as e:
@@ -101,14 +113,15 @@ class RubricCriterion(BaseModel):
     """Pydantic model for rubric criterion."""
     criterion: str = Field(..., description="Criterion name")
     description: str = Field(..., description="Criterion description")
-    weight: int = Field(..., description="Weight percentage")
+    weight: float = Field(..., description="Weight percentage")
     levels: Dict[str, str] = Field(..., description="Performance levels")
 
 class RubricChain:
     """Chain for generating grading rubrics."""
     
     def __init__(self):
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
+        self.parser = RepairingJsonOutputParser(required_key="criteria")
         
         self.prompt = PromptTemplate(
             template="""
@@ -119,14 +132,20 @@ class RubricChain:
             
             Create a detailed rubric with criteria, descriptions, weights, and performance levels.
             
-            Return as structured JSON.
+            Return a single JSON object with a `criteria` array. Each criterion has `criterion` (string),
+            `description` (string), `weight` (percentage, all weights adding up to 100) and
+            `levels` (object mapping Excellent, Good, Fair and Poor to a description).
             """,
             input_variables=["assignment_title", "assignment_description", "num_criteria"]
         )
-        
-        self.chain = LLMChain(
+    
+    @cached_property
+    def chain(self) -> LLMChain:
+        """LLM chain, built on first use so importing does not create a client."""
+        return LLMChain(
             llm=self.llm_service.llm,
             prompt=self.prompt,
+            output_parser=self.parser,
             verbose=True
         )
     
@@ -136,35 +155,43 @@ class RubricChain:
         assignment_description: str = "",
         num_criteria: int = 4
     ) -> Dict[str, Any]:
-        """Generate grading rubric."""
+        """Generate grading rubric.
+
+        Criteria that do not validate are dropped and weights are
+        normalized to 100; an error is returned when none are usable.
+        """
         try:
-            result = await self.chain.arun(
-                assignment_title=assignment_title,
-                assignment_description=assignment_description,
-                num_criteria=num_criteria
+            variables = {
+                "assignment_title": assignment_title,
+                "assignment_description": assignment_description,
+                "num_criteria": num_criteria
+            }
+            result = await self.llm_service.execute(
+                "rubric_chain",
+                variables,
+                lambda: self.chain.arun(**variables),
+                priority=Priority.BULK
             )
             
-            # Parse result to extract rubric
-            # This is simplified - actual implementation would parse JSON
+            criteria = []
+            for item in result.get("criteria", []):
+                try:
+                    criteria.append(RubricCriterion.model_validate(item))
+                except ValidationError as e:
+                    logger.warning(f"Dropping invalid rubric criterion: {e}")
+            if not criteria:
+                return {"error": "LLM returned no usable rubric criteria"}
             
+            total_weight = sum(c.weight for c in criteria) or len(criteria)
             return {
                 "rubric": {
-                    "title": f"Rubric for {assignment_title}",
+                    "title": result.get("title") or f"Rubric for {assignment_title}",
                     "criteria": [
-                        {
-                            "criterion": "Content Accuracy",
-                            "description": "Correctness and relevance of content",
-                            "weight": 25,
-                            "levels": {
-                                "Excellent": "All information accurate and highly relevant",
-                                "Good": "Most information accurate and relevant",
-                                "Fair": "Some inaccuracies or irrelevant content",
-                                "Poor": "Numerous inaccuracies or mostly irrelevant"
-                            }
-                        }
+                        {**c.model_dump(), "weight": round(c.weight / total_weight * 100, 2)}
+                        for c in criteria
                     ]
                 }
             }
         except Exception as e:
             logger.error(f"Rubric chain error: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            return {"error": str(e)}
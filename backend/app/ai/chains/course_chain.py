@@ -3,7 +3,9 @@ from langchain_classic.chains import LLMChain
 from langchain_classic.prompts import PromptTemplate
 from langchain_classic.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from app.services.llm_service import LLMService
+from app.services.llm_service import get_llm_service
+from app.services.llm_admission import Priority
+from functools import cached_property
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,7 +22,7 @@ class CourseChain:
     """Chain for generating course structures."""
     
     def __init__(self):
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
         self.parser = PydanticOutputParser(pydantic_object=CourseStructure)
         
         self.prompt = PromptTemplate(
@@ -38,8 +40,11 @@ class CourseChain:
             input_variables=["topic", "audience", "level", "duration"],
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
-        
-        self.chain = LLMChain(
+    
+    @cached_property
+    def chain(self) -> LLMChain:
+        """LLM chain, built on first use so importing does not create a client."""
+        return LLMChain(
             llm=self.llm_service.llm,
             prompt=self.prompt,
             output_parser=self.parser,
@@ -55,11 +60,17 @@ class CourseChain:
     ) -> CourseStructure:
         """Generate course structure."""
         try:
-            result = await self.chain.arun(
-                topic=topic,
-                audience=audience,
-                level=level,
-                duration=duration
+            variables = {
+                "topic": topic,
+                "audience": audience,
+                "level": level,
+                "duration": duration
+            }
+            result = await self.llm_service.execute(
+                "course_structure_chain",
+                variables,
+                lambda: self.chain.arun(**variables),
+                priority=Priority.BULK
             )
             return result
         except Exception as e:
@@ -85,7 +96,7 @@ class ModuleChain:
     """Chain for generating module content."""
     
     def __init__(self):
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
         self.parser = PydanticOutputParser(pydantic_object=ModuleContent)
         
         self.prompt = PromptTemplate(
@@ -102,8 +113,11 @@ class ModuleChain:
             input_variables=["module_title", "course_context", "duration"],
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
-        
-        self.chain = LLMChain(
+    
+    @cached_property
+    def chain(self) -> LLMChain:
+        """LLM chain, built on first use so importing does not create a client."""
+        return LLMChain(
             llm=self.llm_service.llm,
             prompt=self.prompt,
             output_parser=self.parser,
@@ -118,10 +132,16 @@ class ModuleChain:
     ) -> ModuleContent:
         """Generate module content."""
         try:
-            result = await self.chain.arun(
-                module_title=module_title,
-                course_context=course_context,
-                duration=duration
+            variables = {
+                "module_title": module_title,
+                "course_context": course_context,
+                "duration": duration
+            }
+            result = await self.llm_service.execute(
+                "module_content_chain",
+                variables,
+                lambda: self.chain.arun(**variables),
+                priority=Priority.BULK
             )
             return result
         except Exception as e:
@@ -3,7 +3,9 @@ from langchain_classic.chains.llm import LLMChain
 from langchain_classic.prompts import PromptTemplate
 from langchain_classic.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from app.services.llm_service import LLMService
+from app.services.llm_service import get_llm_service
+from app.services.llm_admission import Priority
+from functools import cached_property
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,7 +29,7 @@ class FlashcardChain:
     """Chain for generating flashcards."""
     
     def __init__(self):
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
         self.parser = PydanticOutputParser(pydantic_object=FlashcardSet)
         
         self.prompt = PromptTemplate(
@@ -45,8 +47,11 @@ class FlashcardChain:
             input_variables=["topic", "num_flashcards", "level", "categories"],
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
-        
-        self.chain = LLMChain(
+    
+    @cached_property
+    def chain(self) -> LLMChain:
+        """LLM chain, built on first use so importing does not create a client."""
+        return LLMChain(
             llm=self.llm_service.llm,
             prompt=self.prompt,
             output_parser=self.parser,
@@ -65,11 +70,18 @@ class FlashcardChain:
             categories = ["concepts", "definitions", "examples"]
         
         try:
-            result = await self.chain.arun(
-                topic=topic,
-                num_flashcards=num_flashcards,
-                level=level,
-                categories=", ".join(categories)
+            variables = {
+                "topic": topic,
+                "num_flashcards": num_flashcards,
+                "level": level,
+                "categories": ", ".join(categories)
+            }
+            result = await self.llm_service.execute(
+                "flashcard_chain",
+                variables,
+                lambda: self.chain.arun(**variables),
+                priority=Priority.INTERACTIVE,
+                semantic="flashcards"
             )
             return result
         except Exception as e:
@@ -106,7 +118,7 @@ class StudyPlanChain:
     """Chain for generating study plans."""
     
     def __init__(self):
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
         self.parser = PydanticOutputParser(pydantic_object=StudyPlan)
         
         self.prompt = PromptTemplate(
@@ -124,8 +136,11 @@ class StudyPlanChain:
             input_variables=["topic", "available_time", "weeks", "level"],
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
-        
-        self.chain = LLMChain(
+    
+    @cached_property
+    def chain(self) -> LLMChain:
+        """LLM chain, built on first use so importing does not create a client."""
+        return LLMChain(
             llm=self.llm_service.llm,
             prompt=self.prompt,
             output_parser=self.parser,
@@ -141,11 +156,18 @@ class StudyPlanChain:
     ) -> StudyPlan:
         """Generate study plan."""
         try:
-            result = await self.chain.arun(
-                topic=topic,
-                available_time=available_time,
-                weeks=weeks,
-                level=level
+            variables = {
+                "topic": topic,
+                "available_time": available_time,
+                "weeks": weeks,
+                "level": level
+            }
+            result = await self.llm_service.execute(
+                "study_plan_chain",
+                variables,
+                lambda: self.chain.arun(**variables),
+                priority=Priority.INTERACTIVE,
+                semantic="study_plan"
             )
             return result
         except Exception as e:
@@ -9,6 +9,11 @@ from app.core.security import (
     get_current_admin
 )
 from app.models.user import User
+from app.services.llm_service import get_llm_service
+from app.services.grading_service import get_grading_service
+from app.services.video_service import get_video_service
+from app.services.latex_service import get_latex_service
+from app.services.plagiarism_service import get_plagiarism_service
 
 def get_db() -> Generator:
     """Dependency for database session."""
@@ -10,6 +10,16 @@ from app.models.user import User
 from app.models.course import Course, Enrollment
 from app.models.assessment import Assignment, AssignmentSubmission, Test, TestAttempt
 from app.models.content import CourseMaterial, VideoAnalysis
+from app.services.llm_cache import llm_cache
+from app.services.llm_coalescer import llm_coalescer
+from app.services.llm_admission import llm_admission
+from app.services.llm_registry import llm_registry
+from app.services.semantic_cache import semantic_cache
+from app.services.llm_telemetry import llm_telemetry
+from app.services.calibration_service import calibration_service
+from app.services.answer_matcher import local_grading_stats
+from app.services.grading_memory import grading_memory
+from app.utils.token_budget import budget_stats
 import json
 
 router = APIRouter()
@@ -108,6 +118,46 @@ async def get_course_performance(
         "calculated_at": datetime.utcnow().isoformat()
     }
 
+@router.get("/courses/{course_id}/calibration")
+async def get_course_calibration(
+    course_id: UUID,
+    current_user: User = Depends(require_lecturer),
+    db: Session = Depends(get_db)
+):
+    """Get grade distribution, outliers, grading drift and per-assignment spread for a course."""
+    course = db.query(Course).filter(
+        Course.id == course_id,
+        Course.lecturer_id == current_user.id
+    ).first()
+    
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found or unauthorized"
+        )
+    
+    return calibration_service.course_report(db, course_id)
+
+@router.get("/assignments/{assignment_id}/calibration")
+async def get_assignment_calibration(
+    assignment_id: UUID,
+    current_user: User = Depends(require_lecturer),
+    db: Session = Depends(get_db)
+):
+    """Get grade distribution, outliers, grading drift and per-question spread for an assignment."""
+    assignment = db.query(Assignment).filter(
+        Assignment.id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found or unauthorized"
+        )
+    
+    return calibration_service.assignment_report(db, assignment_id)
+
 @router.get("/students/{student_id}/progress")
 async def get_student_progress(
     student_id: UUID,
@@ -274,6 +324,33 @@ async def get_platform_overview(
         "calculated_at": datetime.utcnow().isoformat()
     }
 
+@router.get("/platform/llm")
+async def get_llm_runtime_stats(
+    current_user: User = Depends(require_admin)
+):
+    """Get LLM cache, semantic cache, coalescing, admission, routing, prompt budget, local grading and grading memory metrics (admin only)."""
+    return {
+        "cache": llm_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "coalescing": llm_coalescer.stats(),
+        "admission": llm_admission.stats(),
+        "routing": llm_registry.routing_stats(),
+        "prompt_budget": budget_stats.stats(),
+        "local_grading": local_grading_stats.stats(),
+        "grading_memory": grading_memory.stats(),
+        "calculated_at": datetime.utcnow().isoformat()
+    }
+
+@router.get("/platform/llm/telemetry")
+async def get_llm_telemetry(
+    current_user: User = Depends(require_admin)
+):
+    """Get per prompt family and endpoint LLM call metrics (admin only)."""
+    return {
+        "families": llm_telemetry.stats(),
+        "calculated_at": datetime.utcnow().isoformat()
+    }
+
 # Helper methods
 def _calculate_overall_grade(self, assignment_scores: List[Dict], test_scores: List[Dict]) -> Dict[str, Any]:
     """Calculate overall grade from assignments and tests."""
@@ -4,18 +4,35 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from datetime import datetime
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
+from app.core.config import settings
 from app.core.security import get_current_user
 from app.models.user import User, UserRole
 from app.models.course import Course
-from app.models.assessment import Assignment, AssignmentSubmission, AssignmentStatus
-from app.services.llm_service import LLMService
-from app.services.grading_service import GradingService
+from app.models.assessment import Assignment, AssignmentSubmission, AssignmentStatus, GradingJob, GradingJobStatus
+from app.services.llm_service import LLMService, get_llm_service
 from app.models.course import Enrollment
+from app.schemas.assignment import (
+    AssignmentBatchGenerateRequest,
+    AssignmentGenerateItem,
+    AssignmentQuestionsUpdate,
+    AssignmentRubricResponse,
+    ExemplarComparisonRequest,
+    GradingJobResponse
+)
+from app.ai.agents.grading_agent import GradingAgent
+from app.services.grading_jobs import grading_job_runner, grading_worker_pool, ACTIVE_STATUSES
+from app.services.grading_service import match_questions, question_hash, question_points
+from app.services.plagiarism_service import PlagiarismService, get_plagiarism_service
+from app.services.rubric_service import rubric_service
+from app.utils.sse import format_sse, sse_response
+import asyncio
+from app.schemas.batch import BatchGenerateResponse
+from app.utils.batch import run_batch
+import time
 
 router = APIRouter()
-llm_service = LLMService()
-grading_service = GradingService()
+grading_agent = GradingAgent()
 
 @router.get("/students/assignments")
 async def get_student_assignments(
@@ -85,7 +102,8 @@ async def generate_assignment(
     save: bool = Form(False),
     preview: Optional[str] = Form(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """Generate assignment using AI."""
     # Verify course ownership
@@ -152,6 +170,83 @@ async def generate_assignment(
     }
 
 
+@router.post("/courses/{course_id}/assignments/generate/batch", response_model=BatchGenerateResponse)
+async def generate_assignments_batch(
+    course_id: UUID,
+    request: AssignmentBatchGenerateRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """Generate several assignments concurrently.
+
+    Items run with bounded concurrency and each one is saved as soon as it
+    finishes, so a failure only affects its own entry in ``results``.
+    """
+    course = db.query(Course).filter(
+        Course.id == course_id,
+        Course.lecturer_id == current_user.id
+    ).first()
+
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found or unauthorized"
+        )
+
+    course_title = course.title
+    lecturer_id = current_user.id
+
+    async def generate(index: int, item: AssignmentGenerateItem):
+        assignment_data = await llm_service.generate_assignment(
+            item.topic,
+            context=f"Course: {course_title}",
+            difficulty=item.difficulty,
+            question_types=item.question_types,
+            num_questions=item.num_questions
+        )
+        if not isinstance(assignment_data.get("questions"), list) or not assignment_data["questions"]:
+            raise ValueError("LLM returned no usable questions")
+
+        result = {"topic": item.topic, "data": assignment_data}
+        if not request.save:
+            return result
+
+        item_db = SessionLocal()
+        try:
+            assignment = Assignment(
+                title=item.title or f"AI Generated: {item.topic}",
+                description=assignment_data.get("description", f"Assignment on {item.topic}"),
+                instructions=assignment_data.get("instructions", "Complete all questions"),
+                course_id=course_id,
+                lecturer_id=lecturer_id,
+                due_date=item.due_date,
+                is_ai_generated=True,
+                generation_prompt=item.topic,
+                questions=assignment_data["questions"],
+            )
+            item_db.add(assignment)
+            item_db.commit()
+            result["id"] = assignment.id
+        finally:
+            item_db.close()
+        return result
+
+    started = time.monotonic()
+    results = await run_batch(request.items, generate, settings.LLM_BATCH_CONCURRENCY)
+    for result in results:
+        result.setdefault("topic", request.items[result["index"]].topic)
+
+    succeeded = sum(1 for r in results if r["status"] == "completed")
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "results": results
+    }
+
+
 @router.get("/lecturers/{lecturer_id}/assignments")
 async def get_lecturer_assignments(
     lecturer_id: UUID,
@@ -235,15 +330,158 @@ async def publish_assignment(
         "assignment": assignment
     }
 
+@router.put("/assignments/{assignment_id}/questions")
+async def update_assignment_questions(
+    assignment_id: UUID,
+    request: AssignmentQuestionsUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Edit an assignment's questions and points (lecturer endpoint)
+
+    Graded submissions are re-graded in a background job that only asks
+    the LLM about questions whose content changed. Questions are matched
+    by content, so inserting, deleting or reordering questions carries
+    existing grades over to their new position; questions whose points
+    changed are rescaled and totals are recomputed arithmetically.
+    Submissions graded by hand or before per-question grading are left
+    alone; start a bulk job with ``regrade`` to re-grade them in full.
+    """
+    assignment = db.query(Assignment).filter(
+        Assignment.id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found or unauthorized"
+        )
+    
+    # Single-submission jobs count too: their grade would land against the old questions
+    active_job = db.query(GradingJob).filter(
+        GradingJob.assignment_id == assignment_id,
+        GradingJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+    
+    if active_job:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Grading job {active_job.id} is in progress; edit the questions once it finishes"
+        )
+    
+    old_questions = assignment.questions if isinstance(assignment.questions, list) else []
+    max_score = request.max_score if request.max_score is not None else assignment.max_score
+    old_points = question_points(old_questions, assignment.max_score) if old_questions else []
+    new_points = question_points(request.questions, max_score)
+    
+    matched = match_questions(
+        {i: question_hash(question) for i, question in enumerate(old_questions)},
+        [question_hash(question) for question in request.questions]
+    )
+    changed = [i for i in range(len(request.questions)) if i not in matched]
+    moved = {i: old for i, old in matched.items() if i != old}
+    rescaled = [i for i, old in sorted(matched.items()) if abs(old_points[old] - new_points[i]) > 1e-9]
+    removed = sorted(set(range(len(old_questions))) - set(matched.values()))
+    
+    assignment.questions = request.questions
+    assignment.max_score = max_score
+    db.commit()
+    db.refresh(assignment)
+    
+    job = None
+    if changed or moved or rescaled or removed:
+        graded = db.query(AssignmentSubmission.id).filter(
+            AssignmentSubmission.assignment_id == assignment_id,
+            AssignmentSubmission.is_graded.is_(True),
+            AssignmentSubmission.question_grades.any()
+        ).first()
+        if graded:
+            job = grading_job_runner.create_job(db, assignment, current_user.id, question_indices=changed)
+            grading_worker_pool.notify()
+    
+    return {
+        "message": "Assignment questions updated",
+        "assignment": assignment,
+        "changed_questions": changed,
+        "moved_questions": moved,
+        "rescaled_questions": rescaled,
+        "removed_questions": removed,
+        "grading_job": GradingJobResponse.model_validate(job) if job else None
+    }
+
+@router.get("/assignments/{assignment_id}/rubric")
+async def get_assignment_rubric(
+    assignment_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Current grading rubric of an assignment and its earlier versions (lecturer endpoint)
+
+    The rubric is stored on first use and again whenever the questions
+    or max_score change; grading always uses the current version.
+    """
+    assignment = db.query(Assignment).filter(
+        Assignment.id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found or unauthorized"
+        )
+    
+    current = await rubric_service.current(db, assignment)
+    
+    return {
+        "current": AssignmentRubricResponse.model_validate(current),
+        "versions": [
+            {"version": r.version, "source": r.source, "created_at": r.created_at}
+            for r in rubric_service.versions(db, assignment_id)
+        ]
+    }
+
+@router.post("/assignments/{assignment_id}/rubric/generate", response_model=AssignmentRubricResponse)
+async def generate_assignment_rubric(
+    assignment_id: UUID,
+    num_criteria: int = Form(4, ge=2, le=10),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Store a new rubric version with AI-generated criteria (lecturer endpoint)
+    
+    The criteria apply to later grading: free-form submissions are graded
+    against them as a whole, and on assignments with a question list they
+    are part of every question's grading prompt.
+    """
+    assignment = db.query(Assignment).filter(
+        Assignment.id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found or unauthorized"
+        )
+    
+    return await rubric_service.generate(db, assignment, created_by=current_user.id, num_criteria=num_criteria)
+
 @router.post("/assignments/{assignment_id}/submit")
 async def submit_assignment(
     assignment_id: UUID,
     content: Optional[str] = Form(None),
     file: Optional[UploadFile] = File(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    plagiarism_service: PlagiarismService = Depends(get_plagiarism_service)
 ):
-    """Submit assignment (student endpoint)"""
+    """Submit assignment (student endpoint)
+
+    Auto-grading is queued for the grading workers; poll
+    ``/submissions/{id}/grade`` or subscribe to its ``/stream`` for the result.
+    """
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -308,29 +546,75 @@ async def submit_assignment(
     db.commit()
     db.refresh(submission)
     
-    # Auto-grade if possible
+    plagiarism_service.index_submission(assignment_id, submission.id, content)
+    
+    # Queue auto-grading instead of waiting on the LLM in this request
+    grading = None
     if content and assignment.questions:
         try:
-            grade_result = await grading_service.grade_submission(
-                assignment, content, submission.id
-            )
-            
-            submission.score = grade_result["score"]
-            submission.feedback = grade_result["feedback"]
-            submission.ai_feedback = grade_result["ai_feedback"]
-            submission.is_graded = True
-            submission.graded_at = datetime.utcnow()
-            
-            db.commit()
+            job = grading_job_runner.enqueue_submission(db, submission)
+            db.refresh(submission)
+            grading_worker_pool.notify()
+            grading = {"job_id": job.id, "status": "queued"}
         except Exception as e:
             # Log error but don't fail submission
-            print(f"Auto-grading failed: {e}")
+            print(f"Queueing auto-grading failed: {e}")
     
     return {
         "message": "Assignment submitted successfully",
-        "submission": submission
+        "submission": submission,
+        "grading": grading
     }
 
+@router.get("/submissions/{submission_id}/grade")
+async def get_submission_grade(
+    submission_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the auto-grading status and, once graded, the grade of a submission"""
+    submission = _get_visible_submission(db, submission_id, current_user)
+    return _grade_status(db, submission)
+
+@router.get("/submissions/{submission_id}/grade/stream")
+async def stream_submission_grade(
+    submission_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Subscribe to a submission's grade as server-sent events.
+
+    Emits a ``status`` event whenever the grading status changes and a final
+    ``done`` event with the grade (or the reason there is none).
+    """
+    _get_visible_submission(db, submission_id, current_user)
+
+    async def events():
+        last_status = None
+        deadline = time.monotonic() + GRADE_STREAM_TIMEOUT_SECONDS
+        while True:
+            session = SessionLocal()
+            try:
+                submission = session.query(AssignmentSubmission).filter(
+                    AssignmentSubmission.id == submission_id
+                ).first()
+                grade = _grade_status(session, submission)
+            finally:
+                session.close()
+
+            if grade["status"] in GRADE_FINAL_STATUSES:
+                yield format_sse(grade, event="done")
+                return
+            if grade["status"] != last_status:
+                last_status = grade["status"]
+                yield format_sse(grade, event="status")
+            if time.monotonic() > deadline:
+                yield format_sse({"detail": "Grading still in progress; poll the grade endpoint"}, event="error")
+                return
+            await asyncio.sleep(1)
+
+    return sse_response(events())
+
 @router.post("/submissions/{submission_id}/grade")
 async def grade_submission_manual(
     submission_id: UUID,
@@ -340,7 +624,11 @@ async def grade_submission_manual(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Manually grade submission (lecturer endpoint)"""
+    """Manually grade submission (lecturer endpoint)
+    
+    Stored per-question grades are dropped: the score is now the
+    lecturer's, and question edits no longer re-grade it.
+    """
     submission = db.query(AssignmentSubmission).filter(
         AssignmentSubmission.id == submission_id
     ).first()
@@ -368,6 +656,7 @@ async def grade_submission_manual(
     submission.ai_feedback = ai_feedback
     submission.is_graded = True
     submission.graded_at = datetime.utcnow()
+    submission.question_grades.clear()
     
     db.commit()
     
@@ -403,4 +692,266 @@ async def get_assignment_submissions(
         "submissions": submissions,
         "total_submissions": len(submissions),
         "graded_count": len([s for s in submissions if s.is_graded])
-    }
\ No newline at end of file
+    }
+
+@router.get("/submissions/{submission_id}/similar")
+async def get_similar_submissions(
+    submission_id: UUID,
+    threshold: Optional[float] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    plagiarism_service: PlagiarismService = Depends(get_plagiarism_service)
+):
+    """Near-duplicate submissions of the same assignment with estimated Jaccard similarity (lecturer endpoint)"""
+    submission = db.query(AssignmentSubmission).join(
+        Assignment, AssignmentSubmission.assignment_id == Assignment.id
+    ).filter(
+        AssignmentSubmission.id == submission_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found or unauthorized"
+        )
+    
+    matches = plagiarism_service.similar_submissions(
+        db, submission.assignment_id, submission.id, threshold=threshold
+    )
+    
+    return {
+        "submission_id": submission.id,
+        "assignment_id": submission.assignment_id,
+        "matches": matches
+    }
+
+@router.get("/assignments/{assignment_id}/similarity-report")
+async def get_similarity_report(
+    assignment_id: UUID,
+    threshold: Optional[float] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    plagiarism_service: PlagiarismService = Depends(get_plagiarism_service)
+):
+    """Every near-duplicate submission pair of an assignment (lecturer endpoint)"""
+    assignment = db.query(Assignment).filter(
+        Assignment.id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found or unauthorized"
+        )
+    
+    return plagiarism_service.assignment_report(db, assignment_id, threshold=threshold)
+
+@router.post("/assignments/{assignment_id}/exemplar-comparison")
+async def compare_submissions_with_exemplars(
+    assignment_id: UUID,
+    request: ExemplarComparisonRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Score every submission against exemplar answers (lecturer endpoint)
+
+    The ``top_k`` submissions furthest from all exemplars also get a
+    written comparison with their closest exemplar.
+    """
+    assignment = db.query(Assignment).filter(
+        Assignment.id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found or unauthorized"
+        )
+    
+    rows = db.query(AssignmentSubmission.id, AssignmentSubmission.content).filter(
+        AssignmentSubmission.assignment_id == assignment_id,
+        AssignmentSubmission.content.isnot(None),
+        AssignmentSubmission.content != ""
+    ).all()
+    
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No text submissions to compare"
+        )
+    
+    return await grading_agent.compare_cohort_with_exemplars(
+        {row.id: row.content for row in rows},
+        request.exemplars,
+        top_k=request.top_k
+    )
+
+@router.post(
+    "/assignments/{assignment_id}/submissions/grading-jobs",
+    response_model=GradingJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def start_bulk_grading(
+    assignment_id: UUID,
+    regrade: bool = Form(False),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Start a background job grading every submission of an assignment (lecturer endpoint)
+
+    Only ungraded submissions are included unless ``regrade`` is set.
+    Poll the job for progress.
+    """
+    assignment = db.query(Assignment).filter(
+        Assignment.id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found or unauthorized"
+        )
+    
+    active_job = db.query(GradingJob).filter(
+        GradingJob.assignment_id == assignment_id,
+        GradingJob.submission_id.is_(None),
+        GradingJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+    
+    if active_job:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Grading job {active_job.id} is already in progress for this assignment"
+        )
+    
+    job = grading_job_runner.create_job(db, assignment, current_user.id, regrade=regrade)
+    grading_worker_pool.notify()
+    
+    return job
+
+@router.get("/assignments/{assignment_id}/submissions/grading-jobs/{job_id}", response_model=GradingJobResponse)
+async def get_bulk_grading_job(
+    assignment_id: UUID,
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get bulk grading progress and, once finished, the comparative analysis (lecturer endpoint)"""
+    return _get_lecturer_grading_job(db, assignment_id, job_id, current_user)
+
+@router.post(
+    "/assignments/{assignment_id}/submissions/grading-jobs/{job_id}/resume",
+    response_model=GradingJobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def resume_bulk_grading_job(
+    assignment_id: UUID,
+    job_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Resume a failed or interrupted job from its checkpoint, retrying failed submissions (lecturer endpoint)"""
+    job = _get_lecturer_grading_job(db, assignment_id, job_id, current_user)
+    
+    resumable = (
+        job.status in (GradingJobStatus.FAILED, GradingJobStatus.PENDING)
+        or (job.status == GradingJobStatus.COMPLETED and job.failed_count)
+        or grading_job_runner.is_stale(job)
+    )
+    if not resumable:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Grading job is {job.status.value} and cannot be resumed"
+        )
+    
+    job.status = GradingJobStatus.PENDING
+    db.commit()
+    db.refresh(job)
+    grading_worker_pool.notify()
+    
+    return job
+
+def _get_lecturer_grading_job(db: Session, assignment_id: UUID, job_id: UUID, current_user: User) -> GradingJob:
+    job = db.query(GradingJob).join(Assignment, GradingJob.assignment_id == Assignment.id).filter(
+        GradingJob.id == job_id,
+        GradingJob.assignment_id == assignment_id,
+        Assignment.lecturer_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Grading job not found or unauthorized"
+        )
+    
+    return job
+
+GRADE_FINAL_STATUSES = ("graded", "failed", "manual")
+GRADE_STREAM_TIMEOUT_SECONDS = 300
+
+def _get_visible_submission(db: Session, submission_id: UUID, current_user: User) -> AssignmentSubmission:
+    """The submission when the user is its student or the assignment's lecturer."""
+    submission = db.query(AssignmentSubmission).filter(
+        AssignmentSubmission.id == submission_id
+    ).first()
+    
+    if submission and submission.student_id != current_user.id:
+        owns_assignment = db.query(Assignment).filter(
+            Assignment.id == submission.assignment_id,
+            Assignment.lecturer_id == current_user.id
+        ).first()
+        if not owns_assignment:
+            submission = None
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found or unauthorized"
+        )
+    
+    return submission
+
+def _grade_status(db: Session, submission: AssignmentSubmission) -> dict:
+    """Summarize where a submission is in the auto-grading pipeline."""
+    job = db.query(GradingJob).filter(
+        GradingJob.submission_id == submission.id
+    ).order_by(GradingJob.created_at.desc()).first()
+    
+    if submission.is_graded:
+        grade_status = "graded"
+    elif job is None:
+        grade_status = "manual"  # nothing to auto-grade, e.g. a file-only submission
+    elif job.status == GradingJobStatus.PENDING:
+        grade_status = "queued"
+    elif job.status == GradingJobStatus.RUNNING:
+        grade_status = "grading"
+    else:
+        grade_status = "failed"  # left for the lecturer to grade manually
+    
+    result = {
+        "submission_id": submission.id,
+        "status": grade_status,
+        "job_id": job.id if job else None
+    }
+    if submission.is_graded:
+        result.update({
+            "score": submission.score,
+            "feedback": submission.feedback,
+            "ai_feedback": submission.ai_feedback,
+            "graded_at": submission.graded_at,
+            "questions": [
+                {
+                    "question_index": grade.question_index,
+                    "score": grade.score,
+                    "max_score": grade.max_score,
+                    "feedback": grade.feedback,
+                    "graded_at": grade.graded_at
+                }
+                for grade in submission.question_grades
+            ]
+        })
+    return result
@@ -2,18 +2,17 @@ from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.security import get_current_user
 from app.models.user import User, UserRole
 from app.models.course import Course, Enrollment
 from app.models.content import CourseMaterial, MaterialType
-from app.services.llm_service import LLMService
 from app.services.file_processor import FileProcessor
 from app.ai.agents.course_agent import CourseAgent
+from app.utils.sse import sse_response, stream_completion
 import json
 
 router = APIRouter()
-llm_service = LLMService()
 course_agent = CourseAgent()
 file_processor = FileProcessor()
 
@@ -166,6 +165,69 @@ async def generate_course_material(
         "generated_content": generated_content
     }
 
+@router.post("/{course_id}/materials/generate/stream")
+async def stream_course_material(
+    course_id: UUID,
+    topic: str = Form(...),
+    level: str = Form("undergraduate"),
+    audience: str = Form("college students"),
+    save: bool = Form(False),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Stream AI-generated course material as server-sent events.
+
+    Emits ``token`` events while the model generates and a final ``done``
+    event carrying the saved material id (null when ``save`` is false).
+    PowerPoint generation is only available on the non-streaming endpoint.
+    """
+    course = db.query(Course).filter(
+        Course.id == course_id,
+        Course.lecturer_id == current_user.id
+    ).first()
+
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found or unauthorized"
+        )
+
+    async def persist(generated_content: str):
+        if not save:
+            return {"material_id": None, "saved": False}
+
+        session = SessionLocal()
+        try:
+            material = CourseMaterial(
+                title=f"AI Generated: {topic}",
+                content=generated_content,
+                material_type=MaterialType.TEXT,
+                course_id=course_id,
+                is_ai_generated=True,
+                generation_prompt=topic,
+                user_metadata={
+                    "generation_metadata": {
+                        "level": level,
+                        "audience": audience
+                    },
+                    "streamed": True
+                }
+            )
+            session.add(material)
+            session.commit()
+            session.refresh(material)
+        finally:
+            session.close()
+
+        return {"material_id": material.id, "saved": True}
+
+    return sse_response(
+        stream_completion(
+            course_agent.stream_course_content(topic, level=level, audience=audience),
+            persist
+        )
+    )
+
 @router.post("/{course_id}/materials/upload")
 async def upload_course_material(
     course_id: UUID,
@@ -2,10 +2,10 @@ from typing import List
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.core.security import get_current_user
 from app.models.user import User
-#from app.models.content import LatexProcessing  # You'll need to create this model
+from app.models.content import LatexProcessing
 from app.schemas.latex import (
     LaTeXFormatRequest,
     LaTeXFormatResponse,
@@ -17,35 +17,18 @@ from app.schemas.latex import (
     LaTeXGenerateRequest,
     LaTeXGenerateResponse
 )
-from app.services.latex_service import LaTeXService
+from app.services.latex_service import LaTeXService, get_latex_service
+from app.utils.sse import sse_response, stream_completion
 import json
 
 router = APIRouter()
-latex_service = LaTeXService()
-
-# Create model for LaTeXProcessing if not exists
-from sqlalchemy import Boolean, Column, Integer, String, Text, JSON, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
-import uuid
-from sqlalchemy.sql import func
-
-class LatexProcessing:
-    __tablename__ = "latex_processings"
-    
-    id = Column(PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    operation = Column(String, nullable=False)  # format, solve, explain, generate
-    input_data = Column(Text, nullable=False)
-    output_data = Column(Text)
-    is_valid = Column(Boolean, default=True)
-    metadata = Column(JSON)
-    user_id = Column(PGUUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 @router.post("/format", response_model=LaTeXFormatResponse)
 async def format_latex(
     request: LaTeXFormatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    latex_service: LaTeXService = Depends(get_latex_service)
 ):
     """Format and clean LaTeX code."""
     try:
@@ -56,7 +39,7 @@ async def format_latex(
             input_data=request.latex_code,
             output_data=result["formatted_code"],
             is_valid=result["is_valid"],
-            metadata={
+            processing_metadata={
                 "original_length": result["original_length"],
                 "formatted_length": result["formatted_length"]
             },
@@ -83,7 +66,8 @@ async def format_latex(
 async def solve_latex_problem(
     request: LaTeXSolveRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    latex_service: LaTeXService = Depends(get_latex_service)
 ):
     """Solve LaTeX problem or equation."""
     try:
@@ -93,7 +77,7 @@ async def solve_latex_problem(
             operation="solve",
             input_data=request.problem,
             output_data=result["solution"],
-            metadata={
+            processing_metadata={
                 "problem_type": "equation",
                 "explanation_length": len(result["explanation"])
             },
@@ -120,7 +104,8 @@ async def solve_latex_problem(
 async def explain_latex(
     request: LaTeXExplainRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    latex_service: LaTeXService = Depends(get_latex_service)
 ):
     """Explain LaTeX code."""
     try:
@@ -130,7 +115,7 @@ async def explain_latex(
             operation="explain",
             input_data=request.latex_code,
             output_data=result["explanation"],
-            metadata={
+            processing_metadata={
                 "depth": request.depth,
                 "components_count": len(result["components"]) if result.get("components") else 0
             },
@@ -153,11 +138,92 @@ async def explain_latex(
             detail=f"Failed to explain LaTeX: {str(e)}"
         )
 
+@router.post("/solve/stream")
+async def stream_latex_solution(
+    request: LaTeXSolveRequest,
+    current_user: User = Depends(get_current_user),
+    latex_service: LaTeXService = Depends(get_latex_service)
+):
+    """Stream the solution to a LaTeX problem as server-sent events.
+
+    Emits ``token`` events while the model generates and a final ``done``
+    event with the id of the saved processing record.
+    """
+    user_id = current_user.id
+
+    async def save(content: str):
+        solution = latex_service._extract_latex_from_text(content)
+        db = SessionLocal()
+        try:
+            processing = LatexProcessing(
+                operation="solve",
+                input_data=request.problem,
+                output_data=solution,
+                processing_metadata={
+                    "problem_type": "equation",
+                    "explanation_length": len(content),
+                    "streamed": True
+                },
+                user_id=user_id
+            )
+            db.add(processing)
+            db.commit()
+            db.refresh(processing)
+        finally:
+            db.close()
+
+        return {"id": processing.id, "solution": solution}
+
+    return sse_response(
+        stream_completion(latex_service.stream_solution(request.problem), save)
+    )
+
+@router.post("/explain/stream")
+async def stream_latex_explanation(
+    request: LaTeXExplainRequest,
+    current_user: User = Depends(get_current_user),
+    latex_service: LaTeXService = Depends(get_latex_service)
+):
+    """Stream an explanation of LaTeX code as server-sent events.
+
+    Emits ``token`` events while the model generates and a final ``done``
+    event with the id of the saved processing record.
+    """
+    user_id = current_user.id
+
+    async def save(explanation: str):
+        components = await latex_service._extract_components(request.latex_code)
+        db = SessionLocal()
+        try:
+            processing = LatexProcessing(
+                operation="explain",
+                input_data=request.latex_code,
+                output_data=explanation,
+                processing_metadata={
+                    "depth": request.depth,
+                    "components_count": len(components),
+                    "streamed": True
+                },
+                user_id=user_id
+            )
+            db.add(processing)
+            db.commit()
+            db.refresh(processing)
+        finally:
+            db.close()
+
+        return {"id": processing.id, "components": components}
+
+    return sse_response(
+        stream_completion(latex_service.stream_explanation(request.latex_code), save)
+    )
+
 @router.post("/generate", response_model=LaTeXGenerateResponse)
 async def generate_latex_document(
     request: LaTeXGenerateRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    latex_service: LaTeXService = Depends(get_latex_service)
 ):
     """Generate LaTeX document from text."""
     try:
@@ -171,7 +237,7 @@ async def generate_latex_document(
             input_data=request.text,
             output_data=result["latex_code"],
             is_valid=result["is_valid"],
-            metadata={
+            processing_metadata={
                 "doc_type": request.doc_type,
                 "include_toc": request.include_toc,
                 "include_bibliography": request.include_bibliography
@@ -217,7 +283,8 @@ async def get_latex_history(
 async def get_latex_preview(
     processing_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    latex_service: LaTeXService = Depends(get_latex_service)
 ):
     """Get LaTeX preview (PDF or image)."""
     processing = db.query(LatexProcessing).filter(
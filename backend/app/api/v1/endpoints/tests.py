@@ -1,9 +1,11 @@
 from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
+from app.core.config import settings
 from app.core.security import get_current_user, require_lecturer, require_student
 from app.models.user import User, UserRole
 from app.models.course import Course, Enrollment
@@ -13,16 +15,22 @@ from app.schemas.test import (
     TestResponse,
     TestGenerateRequest,
     TestGenerateResponse,
+    TestBatchGenerateItem,
+    TestBatchGenerateRequest,
     TestAttemptStart,
     TestAttemptSubmit,
-    TestAttemptResponse
+    TestAttemptResponse,
+    TestAnswerKeyUpdate
 )
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.test_scoring import ScoreResult, answer_key_cache, question_id, rescore_attempts, score_attempt
+from app.schemas.batch import BatchGenerateResponse
+from app.utils.batch import run_batch
 import json
+import time
 
 
 router = APIRouter()
-llm_service = LLMService()
 
 @router.get("/students/tests", response_model=List[TestResponse])
 async def get_student_tests(
@@ -72,7 +80,8 @@ async def generate_test(
     course_id: UUID,
     request: TestGenerateRequest,
     current_user: User = Depends(require_lecturer),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """Generate test questions using AI."""
     course = db.query(Course).filter(
@@ -101,6 +110,86 @@ async def generate_test(
         difficulty_level=request.difficulty
     )
 
+@router.post("/courses/{course_id}/tests/generate/batch", response_model=BatchGenerateResponse)
+async def generate_tests_batch(
+    course_id: UUID,
+    request: TestBatchGenerateRequest,
+    current_user: User = Depends(require_lecturer),
+    db: Session = Depends(get_db),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """Generate several tests concurrently.
+
+    Items run with bounded concurrency and each one is saved as an
+    unpublished test as soon as it finishes, so a failure only affects its
+    own entry in ``results``.
+    """
+    course = db.query(Course).filter(
+        Course.id == course_id,
+        Course.lecturer_id == current_user.id
+    ).first()
+    
+    if not course:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Course not found or unauthorized"
+        )
+    
+    lecturer_id = current_user.id
+
+    async def generate(index: int, item: TestBatchGenerateItem):
+        if item.start_time and item.end_time and item.start_time >= item.end_time:
+            raise ValueError("End time must be after start time")
+
+        test_data = await llm_service.generate_test(
+            item.topic,
+            item.test_type.value,
+            num_questions=item.num_questions,
+            difficulty=item.difficulty,
+            context=item.course_context
+        )
+        if not isinstance(test_data.get("questions"), list) or not test_data["questions"]:
+            raise ValueError("LLM returned no usable questions")
+
+        result = {"topic": item.topic, "data": test_data}
+        if not request.save:
+            return result
+
+        item_db = SessionLocal()
+        try:
+            test = Test(
+                title=item.title or f"AI Generated: {item.topic}",
+                course_id=course_id,
+                lecturer_id=lecturer_id,
+                test_type=item.test_type,
+                duration=item.duration,
+                start_time=item.start_time,
+                end_time=item.end_time,
+                is_published=False,
+                questions=test_data["questions"],
+                answers=test_data.get("answers", {})
+            )
+            item_db.add(test)
+            item_db.commit()
+            result["id"] = test.id
+        finally:
+            item_db.close()
+        return result
+
+    started = time.monotonic()
+    results = await run_batch(request.items, generate, settings.LLM_BATCH_CONCURRENCY)
+    for result in results:
+        result.setdefault("topic", request.items[result["index"]].topic)
+
+    succeeded = sum(1 for r in results if r["status"] == "completed")
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "results": results
+    }
+
 @router.post("/courses/{course_id}/tests", response_model=TestResponse)
 async def create_test(
     course_id: UUID,
@@ -170,6 +259,9 @@ async def publish_test(
     test.is_published = True
     db.commit()
     
+    # Compile the answer key now rather than on the first submission
+    answer_key_cache.get(test)
+    
     return {"message": "Test published successfully"}
 
 @router.get("/courses/{course_id}/tests", response_model=List[TestResponse])
@@ -318,10 +410,11 @@ async def submit_test_attempt(
             detail="Test time has expired"
         )
     
-    score = await calculate_test_score(test, submission.answers)
+    result = await calculate_test_score(test, submission.answers)
     
     attempt.answers = [answer.dict() for answer in submission.answers]
-    attempt.score = score
+    attempt.score = result.score
+    attempt.score_breakdown = result.breakdown
     attempt.submitted_at = now
     attempt.is_completed = True
     
@@ -330,20 +423,82 @@ async def submit_test_attempt(
     
     return attempt
 
-async def calculate_test_score(test: Test, answers: List) -> float:
-    """Calculate score for test attempt."""
-    if not test.questions:
-        return 0.0
+async def calculate_test_score(test: Test, answers: List) -> ScoreResult:
+    """Calculate score for test attempt.
+
+    Answers are scored against the test's compiled answer key, weighted by
+    question points, in a single pass.
+    """
+    return score_attempt(answer_key_cache.get(test), answers)
+
+@router.put("/tests/{test_id}/answer-key")
+async def update_test_answer_key(
+    test_id: UUID,
+    request: TestAnswerKeyUpdate,
+    current_user: User = Depends(require_lecturer),
+    db: Session = Depends(get_db)
+):
+    """Correct answers or points of a test's questions (lecturer only).
+
+    Completed attempts are re-scored against the corrected key unless
+    ``rescore`` is false. Re-scoring runs in the threadpool so a large
+    test does not block the event loop.
+    """
+    test = db.query(Test).filter(
+        Test.id == test_id,
+        Test.lecturer_id == current_user.id
+    ).first()
     
-    total_questions = len(test.questions)
-    correct_answers = 0
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found or unauthorized"
+        )
+    
+    questions = [dict(q) if isinstance(q, dict) else q for q in test.questions or []]
+    ids = {question_id(q, i): q for i, q in enumerate(questions) if isinstance(q, dict)}
+    unknown = sorted((set(request.correct_answers) | set(request.points)) - set(ids))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown question ids: {', '.join(unknown)}"
+        )
+    
+    for qid, answer in request.correct_answers.items():
+        ids[qid]["correct_answer"] = answer
+    for qid, points in request.points.items():
+        ids[qid]["points"] = points
     
-    for answer in answers:
-        question = next((q for q in test.questions if q.get("id") == answer.question_id), None)
-        if question and question.get("correct_answer") == answer.answer:
-            correct_answers += 1
+    test.questions = questions
+    db.commit()
+    db.refresh(test)
+    
+    return {
+        "message": "Answer key updated",
+        "updated_questions": sorted(set(request.correct_answers) | set(request.points)),
+        "rescore": await run_in_threadpool(rescore_attempts, db, test) if request.rescore else None
+    }
+
+@router.post("/tests/{test_id}/rescore")
+async def rescore_test_attempts(
+    test_id: UUID,
+    current_user: User = Depends(require_lecturer),
+    db: Session = Depends(get_db)
+):
+    """Re-score every completed attempt against the current answer key (lecturer only)."""
+    test = db.query(Test).filter(
+        Test.id == test_id,
+        Test.lecturer_id == current_user.id
+    ).first()
+    
+    if not test:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found or unauthorized"
+        )
     
-    return (correct_answers / total_questions) * 100 if total_questions > 0 else 0.0
+    # CPU-bound scoring and a bulk UPDATE; keep them off the event loop
+    return await run_in_threadpool(rescore_attempts, db, test)
 
 @router.get("/tests/{test_id}/attempts", response_model=List[TestAttemptResponse])
 async def get_test_attempts(
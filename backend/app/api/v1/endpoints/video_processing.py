@@ -13,20 +13,21 @@ from app.schemas.video import (
     VideoExplainRequest,
     VideoExplainResponse
 )
-from app.services.video_service import VideoService
+from app.services.video_service import VideoService, get_video_service
 from app.services.file_processor import FileProcessor
+from app.utils.sse import sse_response, stream_completion
 import tempfile
 import os
 
 router = APIRouter()
-video_service = VideoService()
 file_processor = FileProcessor()
 
 @router.post("/youtube/process", response_model=VideoAnalysisResponse)
 async def process_youtube_video(
     request: YouTubeProcessRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    video_service: VideoService = Depends(get_video_service)
 ):
     """Process YouTube video for analysis."""
     try:
@@ -65,7 +66,8 @@ async def process_uploaded_video(
     course_id: Optional[UUID] = Form(None),
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    video_service: VideoService = Depends(get_video_service)
 ):
     """Process uploaded video file."""
     # Validate file type
@@ -137,7 +139,8 @@ async def process_uploaded_video(
 async def explain_video_content(
     request: VideoExplainRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    video_service: VideoService = Depends(get_video_service)
 ):
     """Explain video content based on user question."""
     analysis = db.query(VideoAnalysis).filter(
@@ -174,6 +177,51 @@ async def explain_video_content(
             detail=f"Failed to generate explanation: {str(e)}"
         )
 
+@router.post("/explain/stream")
+async def stream_video_explanation(
+    request: VideoExplainRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+    video_service: VideoService = Depends(get_video_service)
+):
+    """Stream an explanation of video content as server-sent events.
+
+    Emits ``token`` events while the model generates and a final ``done``
+    event referencing the video analysis that was explained.
+    """
+    analysis = db.query(VideoAnalysis).filter(
+        VideoAnalysis.id == request.video_analysis_id,
+        VideoAnalysis.user_id == current_user.id
+    ).first()
+    
+    if not analysis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video analysis not found or unauthorized"
+        )
+    
+    if not analysis.transcript:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No transcript available for this video"
+        )
+    
+    analysis_id = analysis.id
+
+    async def done(explanation: str):
+        return {
+            "video_analysis_id": analysis_id,
+            "confidence_score": 0.85,
+            "length": len(explanation)
+        }
+
+    return sse_response(
+        stream_completion(
+            video_service.stream_explanation(analysis.transcript, request.question),
+            done
+        )
+    )
+
 @router.get("/analyses", response_model=List[VideoAnalysisResponse])
 async def get_video_analyses(
     course_id: Optional[UUID] = None,
@@ -36,8 +36,82 @@ class Settings(BaseSettings):
     GROQ_API_KEY: Optional[str] = os.getenv("GROQ_API_KEY")
     HUGGINGFACE_API_KEY: Optional[str] = os.getenv("HUGGINGFACE_API_KEY")
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
-    LLM_PROVIDER: str = "groq"  # groq, huggingface, openai
-    
+    LLM_PROVIDER: str = "groq"  # groq, huggingface, openai, local, fake, router
+    LLM_TEMPERATURE: float = 0.3
+    OPENAI_MODEL: str = "gpt-4o-mini"
+    HUGGINGFACE_MODEL: str = "meta-llama/Llama-3.1-8B-Instruct"
+
+    # LLM Routing (used when LLM_PROVIDER is "router")
+    LLM_PROVIDERS: str = "groq"  # comma-separated, in preference order
+    LLM_HEDGE_DELAY_MS: int = 2000  # 0 disables hedged requests
+    LLM_ROUTER_MAX_ERROR_RATE: float = 0.5
+    LLM_ROUTER_WINDOW: int = 50
+    LLM_LOCAL_LATENCY_MS: int = 0
+
+    # Fake LLM backend for offline load tests (LLM_PROVIDER="fake")
+    LLM_FAKE_LATENCY_MS: float = 800  # median time to first token
+    LLM_FAKE_LATENCY_SIGMA: float = 0.3  # log-normal spread, 0 for a fixed latency
+    LLM_FAKE_TOKENS_PER_SECOND: float = 250  # 0 returns the full output instantly
+    LLM_FAKE_FAILURE_RATE: float = 0.0
+    LLM_FAKE_SEED: int = 0
+
+    # LLM Response Cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 512
+    LLM_CACHE_TTL_SECONDS: int = 60 * 60 * 24  # 24 hours
+    LLM_CACHE_PATH: Optional[str] = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite3")
+
+    # Near-duplicate topic cache; families opt in by name, empty disables it
+    LLM_SEMANTIC_CACHE_FAMILIES: str = "flashcards,study_plan,course_material"
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.92  # cosine similarity needed to reuse a result
+    LLM_SEMANTIC_CACHE_MAX_ENTRIES: int = 256
+
+    # LLM Admission Control (0 disables a limit)
+    LLM_MAX_CONCURRENCY: int = 8
+    # Shared by every caller: per-question bulk grading makes one request per
+    # question per submission, so at 60 a 30-student, 10-question regrade takes
+    # about 5 minutes. Raise it to match the provider plan's limit.
+    LLM_REQUESTS_PER_MINUTE: int = 60
+    LLM_TOKENS_PER_MINUTE: int = 0
+
+    # Batch generation fan-out per request
+    LLM_BATCH_CONCURRENCY: int = 5
+
+    # Bulk grading jobs
+    GRADING_JOB_CONCURRENCY: int = 8
+    GRADING_JOB_STALE_SECONDS: int = 300  # a running job without a heartbeat this long is resumed
+    GRADING_JOB_HEARTBEAT_SECONDS: float = 30  # well below GRADING_JOB_STALE_SECONDS
+    GRADING_WORKERS: int = 4
+    GRADING_WORKERS_IN_PROCESS: bool = True  # false when running app.services.grading_jobs separately
+    GRADING_POLL_INTERVAL_SECONDS: float = 2.0
+
+    # Near-duplicate submission detection (MinHash + LSH)
+    PLAGIARISM_SHINGLE_SIZE: int = 5  # words per shingle
+    PLAGIARISM_NUM_PERM: int = 128
+    PLAGIARISM_LSH_BANDS: int = 32  # 4 rows per band, candidates from roughly 0.3 Jaccard up
+    PLAGIARISM_THRESHOLD: float = 0.5
+
+    # Grade calibration reports
+    CALIBRATION_OUTLIER_Z: float = 2.0  # |z-score| above which a grade is reported as an outlier
+    CALIBRATION_DRIFT_BATCHES: int = 4  # grading-order batches compared for drift
+
+    # Per (student, course) grading memory of the grading agent
+    GRADING_MEMORY_MAX_SCOPES: int = 1000  # least recently used scopes are evicted beyond this
+    GRADING_MEMORY_WINDOW: int = 5  # graded submissions remembered per scope
+    GRADING_MEMORY_PATH: Optional[str] = os.getenv("GRADING_MEMORY_PATH")  # sqlite file; unset keeps memory in process only
+
+    # Local short-answer grading before the LLM
+    LOCAL_GRADING_ENABLED: bool = True
+    LOCAL_GRADING_MIN_CONFIDENCE: float = 0.85  # less confident answers are escalated to the LLM
+    LOCAL_GRADING_NUMERIC_TOLERANCE: float = 0.01  # relative, unless the question sets `tolerance`
+    LOCAL_GRADING_MAX_FUZZY_WORDS: int = 12  # longer expected answers are not fuzzy matched
+
+    # Compiled test answer keys kept in process
+    TEST_ANSWER_KEY_CACHE_ENTRIES: int = 256
+
+    # Prompt context budget in tokens for tasks without their own budget
+    LLM_CONTEXT_TOKEN_BUDGET: int = 4000
+
     # External APIs
     PRESENTON_API_KEY: Optional[str] = os.getenv("PRESENTON_API_KEY")
     YOUTUBE_API_KEY: Optional[str] = os.getenv("YOUTUBE_API_KEY")
@@ -1,7 +1,11 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.services.llm_telemetry import llm_telemetry, TelemetryMiddleware
+from app.services.grading_jobs import grading_worker_pool
+from app.services.answer_matcher import local_grading_stats
 import logging
 
 # Configure logging
@@ -29,9 +33,22 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+# Tag LLM telemetry with the endpoint that triggered each call
+app.add_middleware(TelemetryMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Grading workers poll the job table; interrupted jobs are picked up again
+@app.on_event("startup")
+async def start_grading_workers():
+    if settings.GRADING_WORKERS_IN_PROCESS:
+        grading_worker_pool.start()
+
+@app.on_event("shutdown")
+async def stop_grading_workers():
+    await grading_worker_pool.stop()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -41,6 +58,14 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(
+        llm_telemetry.render_prometheus() + local_grading_stats.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Enum, Float, Boolean
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, ForeignKey, Enum, Float, Boolean, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from sqlalchemy.orm import relationship
@@ -6,11 +6,13 @@ from sqlalchemy.sql import func
 from app.core.database import Base
 import enum
 
+
 class AssignmentStatus(str, enum.Enum):
     DRAFT = "draft"
     PUBLISHED = "published"
     CLOSED = "closed"
 
+
 class Assignment(Base):
     __tablename__ = "assignments"
     
@@ -33,6 +35,11 @@ class Assignment(Base):
     course = relationship("Course", back_populates="assignments")
     lecturer = relationship("User")
     submissions = relationship("AssignmentSubmission", back_populates="assignment", cascade="all, delete-orphan")
+    rubrics = relationship(
+        "AssignmentRubric", back_populates="assignment", cascade="all, delete-orphan",
+        order_by="AssignmentRubric.version"
+    )
+
 
 class AssignmentSubmission(Base):
     __tablename__ = "assignment_submissions"
@@ -52,12 +59,18 @@ class AssignmentSubmission(Base):
     # Relationships
     assignment = relationship("Assignment", back_populates="submissions")
     student = relationship("User", back_populates="submissions")
+    question_grades = relationship(
+        "QuestionGrade", back_populates="submission", cascade="all, delete-orphan",
+        order_by="QuestionGrade.question_index"
+    )
+
 
 class TestType(str, enum.Enum):
     MULTIPLE_CHOICE = "multiple_choice"
     TEXT_BASED = "text_based"
     MIXED = "mixed"
 
+
 class Test(Base):
     __tablename__ = "tests"
     
@@ -80,6 +93,7 @@ class Test(Base):
     lecturer = relationship("User")
     attempts = relationship("TestAttempt", back_populates="test", cascade="all, delete-orphan")
 
+
 class TestAttempt(Base):
     __tablename__ = "test_attempts"
     
@@ -90,8 +104,100 @@ class TestAttempt(Base):
     submitted_at = Column(DateTime(timezone=True))
     answers = Column(JSON)
     score = Column(Float)
+    score_breakdown = Column(JSON)  # per-question points earned and the answer key version
     is_completed = Column(Boolean, default=False)
     
     # Relationships
     test = relationship("Test", back_populates="attempts")
-    student = relationship("User", back_populates="test_attempts")
\ No newline at end of file
+    student = relationship("User", back_populates="test_attempts")
+
+
+class GradingJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class GradingJob(Base):
+    __tablename__ = "grading_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    assignment_id = Column(UUID(as_uuid=True), ForeignKey("assignments.id"), nullable=False, index=True)
+    submission_id = Column(UUID(as_uuid=True), ForeignKey("assignment_submissions.id"), index=True)  # set for auto-grading on submit
+    requested_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    status = Column(Enum(GradingJobStatus), default=GradingJobStatus.PENDING, nullable=False)
+    regrade = Column(Boolean, default=False)  # also re-grade submissions that already have a score
+    submission_ids = Column(JSON)  # snapshot of the submissions in scope when the job was created
+    question_indices = Column(JSON)  # set when only these questions need re-grading after an edit
+    results = Column(JSON)  # checkpoint: submission id -> score summary or error
+    total_count = Column(Integer, default=0)
+    graded_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    comparative_analysis = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    
+    # Relationships
+    assignment = relationship("Assignment")
+    submission = relationship("AssignmentSubmission")
+    requester = relationship("User")
+
+
+class AssignmentRubric(Base):
+    __tablename__ = "assignment_rubrics"
+    __table_args__ = (UniqueConstraint("assignment_id", "version", name="uq_assignment_rubrics_assignment_version"),)
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    assignment_id = Column(UUID(as_uuid=True), ForeignKey("assignments.id", ondelete="CASCADE"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    source = Column(String, nullable=False, default="default")  # default (derived from the questions) or generated
+    questions_hash = Column(String(64), nullable=False)  # questions and max_score the rubric was built for
+    rubric = Column(JSON, nullable=False)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    assignment = relationship("Assignment", back_populates="rubrics")
+    creator = relationship("User")
+
+
+class QuestionGrade(Base):
+    __tablename__ = "question_grades"
+    __table_args__ = (UniqueConstraint("submission_id", "question_index", name="uq_question_grades_submission_question"),)
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    submission_id = Column(UUID(as_uuid=True), ForeignKey("assignment_submissions.id", ondelete="CASCADE"), nullable=False, index=True)
+    question_index = Column(Integer, nullable=False)
+    question_hash = Column(String(64), nullable=False)  # question content it was graded against, points excluded
+    score = Column(Float, nullable=False)
+    max_score = Column(Float, nullable=False)
+    feedback = Column(Text)
+    strengths = Column(JSON)
+    areas_of_improvement = Column(JSON)
+    graded_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    submission = relationship("AssignmentSubmission", back_populates="question_grades")
+
+
+class GradeMemo(Base):
+    __tablename__ = "grade_memos"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    memo_key = Column(String(64), nullable=False, unique=True, index=True)  # rubric hash + normalized submission hash
+    assignment_id = Column(UUID(as_uuid=True), ForeignKey("assignments.id"), nullable=False, index=True)
+    rubric_hash = Column(String(64), nullable=False)  # questions, rubric and max_score the grade was given under
+    source_submission_id = Column(UUID(as_uuid=True), ForeignKey("assignment_submissions.id", ondelete="SET NULL"))
+    result = Column(JSON, nullable=False)
+    model = Column(String)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True))
+    
+    # Relationships
+    assignment = relationship("Assignment")
+    source_submission = relationship("AssignmentSubmission")
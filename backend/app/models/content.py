@@ -49,4 +49,19 @@ class VideoAnalysis(Base):
     
     # Relationships
     user = relationship("User")
-    course = relationship("Course")
\ No newline at end of file
+    course = relationship("Course")
+
+class LatexProcessing(Base):
+    __tablename__ = "latex_processings"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    operation = Column(String, nullable=False)  # format, solve, explain, generate
+    input_data = Column(Text, nullable=False)
+    output_data = Column(Text)
+    is_valid = Column(Boolean, default=True)
+    processing_metadata = Column("metadata", JSON)  # "metadata" is reserved on declarative models
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    user = relationship("User")
@@ -0,0 +1,63 @@
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, computed_field
+from uuid import UUID
+from datetime import datetime
+from app.models.assessment import GradingJobStatus
+
+class AssignmentGenerateItem(BaseModel):
+    topic: str = Field(..., min_length=3)
+    title: Optional[str] = None
+    difficulty: str = Field("medium", pattern="^(easy|medium|hard)$")
+    question_types: List[str] = ["essay", "short_answer"]
+    num_questions: int = Field(5, ge=1, le=50)
+    due_date: Optional[datetime] = None
+
+class AssignmentBatchGenerateRequest(BaseModel):
+    items: List[AssignmentGenerateItem] = Field(..., min_length=1, max_length=50)
+    save: bool = True
+
+class AssignmentQuestionsUpdate(BaseModel):
+    questions: List[Dict[str, Any]] = Field(..., min_length=1)
+    max_score: Optional[float] = Field(None, gt=0)
+
+class ExemplarComparisonRequest(BaseModel):
+    exemplars: List[str] = Field(..., min_length=1, max_length=20)
+    top_k: int = Field(3, ge=0, le=20)  # divergent submissions explained by the LLM
+
+class GradingJobResponse(BaseModel):
+    id: UUID
+    assignment_id: UUID
+    status: GradingJobStatus
+    regrade: bool
+    question_indices: Optional[List[int]] = None
+    total_count: int
+    graded_count: int
+    failed_count: int
+    comparative_analysis: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        """Fraction of submissions processed, graded or failed."""
+        if not self.total_count:
+            return 1.0
+        return round((self.graded_count + self.failed_count) / self.total_count, 4)
+
+    class Config:
+        from_attributes = True
+
+class AssignmentRubricResponse(BaseModel):
+    id: UUID
+    assignment_id: UUID
+    version: int
+    source: str
+    rubric: Dict[str, Any]
+    created_by: Optional[UUID] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,19 @@
+from typing import Optional, List, Dict, Any
+from pydantic import BaseModel
+from uuid import UUID
+
+class BatchItemResult(BaseModel):
+    index: int
+    topic: str
+    status: str  # completed, failed
+    id: Optional[UUID] = None  # saved record, when persisted
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    elapsed_seconds: float
+
+class BatchGenerateResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    results: List[BatchItemResult]
@@ -27,7 +27,7 @@ class LaTeXResponse(BaseModel):
     input_data: str
     output_data: str
     is_valid: bool
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias="processing_metadata")
     user_id: UUID
     created_at: datetime
     
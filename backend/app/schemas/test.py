@@ -50,12 +50,27 @@ class TestGenerateRequest(BaseModel):
     difficulty: str = Field("medium", pattern="^(easy|medium|hard)$")
     course_context: Optional[str] = None
 
+class TestBatchGenerateItem(TestGenerateRequest):
+    title: Optional[str] = None
+    duration: int = Field(60, ge=5, le=180)  # minutes
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+class TestBatchGenerateRequest(BaseModel):
+    items: List[TestBatchGenerateItem] = Field(..., min_length=1, max_length=50)
+    save: bool = True
+
 class TestGenerateResponse(BaseModel):
     questions: List[Dict[str, Any]]
     answers: Dict[str, Any]
     estimated_duration: int  # minutes
     difficulty_level: str
 
+class TestAnswerKeyUpdate(BaseModel):
+    correct_answers: Dict[str, Any] = Field(default_factory=dict)  # question id -> corrected answer
+    points: Dict[str, float] = Field(default_factory=dict)  # question id -> new points
+    rescore: bool = True
+
 # Test Attempt
 class TestAttemptStart(BaseModel):
     test_id: UUID
@@ -74,6 +89,7 @@ class TestAttemptResponse(BaseModel):
     started_at: datetime
     submitted_at: Optional[datetime] = None
     score: Optional[float] = None
+    score_breakdown: Optional[Dict[str, Any]] = None
     is_completed: bool
     
     class Config:
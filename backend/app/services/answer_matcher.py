@@ -0,0 +1,203 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from app.core.config import settings
+import re
+import threading
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Punctuation, except decimal points/commas and minus signs of numbers
+_NON_WORD = re.compile(r"(?<!\d)[.,]|[.,](?!\d)|-(?!\d)|[^\w\s.,\-]")
+_WHITESPACE = re.compile(r"\s+")
+# Grouped thousands ("10,000.5") before plain or decimal-comma numbers ("4,5")
+_NUMBER = re.compile(r"-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+(?:[.,]\d+)?")
+_THOUSANDS = re.compile(r"^-?\d{1,3}(?:,\d{3})+(?:\.\d+)?$")
+
+# Words that can flip the meaning of an otherwise matching answer
+NEGATIONS = {"not", "no", "never", "isn't", "isnt", "aren't", "arent", "neither", "nor", "except"}
+
+# Words that turn an answer into a list of candidates
+HEDGES = {"or", "either", "maybe", "perhaps", "possibly", "probably"}
+
+# Question types whose answers are never scored locally
+OPEN_ENDED_TYPES = {"essay", "long_answer", "project", "code", "coding"}
+
+def normalize_answer(text: Any) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of an answer."""
+    value = unicodedata.normalize("NFKC", str(text or "")).casefold()
+    value = _NON_WORD.sub(" ", value)
+    return _WHITESPACE.sub(" ", value).strip()
+
+def parse_number(token: str) -> float:
+    """A number token; commas group thousands ("1,000") or mark decimals ("4,5")."""
+    if _THOUSANDS.match(token):
+        return float(token.replace(",", ""))
+    return float(token.replace(",", "."))
+
+def parse_numbers(text: str) -> List[float]:
+    return [parse_number(match) for match in _NUMBER.findall(text)]
+
+def token_sort_ratio(a: str, b: str) -> float:
+    """Similarity of two whole answers, ignoring word order.
+
+    Every word of both answers counts, so an answer listing several
+    candidates scores low against a single expected one.
+    """
+    sorted_a, sorted_b = " ".join(sorted(a.split())), " ".join(sorted(b.split()))
+    if not sorted_a or not sorted_b:
+        return 0.0
+    return SequenceMatcher(None, sorted_a, sorted_b).ratio()
+
+def _qualifiers(words: set, given: str, target: str) -> set:
+    """Words of ``words`` in the answer but not in the expected answer."""
+    return (words & set(given.split())) - set(target.split())
+
+def keyword_coverage(answer: str, keywords: List[str]) -> float:
+    """Share of keywords whose words all appear in the answer (matching word stems)."""
+    words = answer.split()
+    stems = {word[:6] for word in words}
+    covered = 0
+    for keyword in keywords:
+        parts = normalize_answer(keyword).split()
+        if parts and all(part in words or part[:6] in stems for part in parts):
+            covered += 1
+    return covered / len(keywords) if keywords else 0.0
+
+@dataclass
+class LocalGrade:
+    """Fraction of the question's points awarded and how sure the matcher is."""
+    fraction: float
+    confidence: float
+    method: str
+    feedback: str
+
+class AnswerMatcher:
+    """Scores short answers against a question's answer key without the LLM.
+
+    Uses the question's ``expected_answer``/``correct_answer`` and optional
+    ``keywords`` and ``tolerance``. Each check gives a score and a
+    confidence; the most confident one wins, and answers below
+    ``min_confidence`` are left for the LLM. Open-ended questions and
+    questions without a key always go to the LLM.
+    """
+
+    def __init__(self, min_confidence: Optional[float] = None, numeric_tolerance: Optional[float] = None):
+        self.min_confidence = min_confidence if min_confidence is not None else settings.LOCAL_GRADING_MIN_CONFIDENCE
+        self.numeric_tolerance = numeric_tolerance if numeric_tolerance is not None else settings.LOCAL_GRADING_NUMERIC_TOLERANCE
+
+    def grade(self, question: Dict[str, Any], answer: Optional[str]) -> Optional[LocalGrade]:
+        """A confident local grade, or None to escalate to the LLM."""
+        if not settings.LOCAL_GRADING_ENABLED:
+            return None
+        candidate = self.score(question, answer)
+        if candidate is None or candidate.confidence < self.min_confidence:
+            local_grading_stats.record("escalated")
+            return None
+        local_grading_stats.record(candidate.method)
+        return candidate
+
+    def score(self, question: Dict[str, Any], answer: Optional[str]) -> Optional[LocalGrade]:
+        """Best local grade with its confidence, or None when there is no answer key."""
+        if str(question.get("type", "")).lower() in OPEN_ENDED_TYPES:
+            return None
+        expected = question.get("expected_answer", question.get("correct_answer"))
+        keywords = question.get("keywords")
+        if isinstance(expected, list):
+            # A list of expected points is checked as keywords
+            keywords = keywords or expected
+            expected = None
+        keywords = [k for k in keywords or [] if isinstance(k, str) and k.strip()]
+        if expected in (None, "") and not keywords:
+            return None
+
+        given = normalize_answer(answer)
+        if not given:
+            return LocalGrade(0.0, 1.0, "blank", "No answer given.")
+
+        candidates: List[LocalGrade] = []
+        if expected not in (None, ""):
+            target = normalize_answer(expected)
+            if given == target:
+                return LocalGrade(1.0, 1.0, "exact", "Correct.")
+            candidates.append(self._numeric(question, target, given))
+            if len(target.split()) <= settings.LOCAL_GRADING_MAX_FUZZY_WORDS:
+                candidates.append(self._fuzzy(target, given))
+        if keywords:
+            candidates.append(self._keywords(keywords, given))
+
+        candidates = [c for c in candidates if c is not None]
+        return max(candidates, key=lambda c: c.confidence) if candidates else None
+
+    def _numeric(self, question: Dict[str, Any], target: str, given: str) -> Optional[LocalGrade]:
+        expected = parse_numbers(target)
+        if len(expected) != 1 or _NUMBER.sub("", target).strip():
+            return None
+        values = parse_numbers(given)
+        # Several candidate numbers, or a negated or hedged one, is for the LLM to judge
+        if len(values) != 1 or _qualifiers(NEGATIONS | HEDGES, given, target):
+            return LocalGrade(0.0, 0.3, "numeric", "")
+        tolerance = question.get("tolerance")
+        allowed = float(tolerance) if tolerance is not None else abs(expected[0]) * self.numeric_tolerance
+        if abs(values[0] - expected[0]) <= allowed + 1e-9:
+            return LocalGrade(1.0, 0.95, "numeric", "Correct value.")
+        # A bare number that misses is wrong; a number inside prose may be working
+        if len(given.split()) <= 3:
+            return LocalGrade(0.0, 0.9, "numeric", f"Expected {target}.")
+        return LocalGrade(0.0, 0.3, "numeric", "")
+
+    def _fuzzy(self, target: str, given: str) -> LocalGrade:
+        ratio = token_sort_ratio(target, given)
+        if ratio >= 0.9 and not _qualifiers(NEGATIONS | HEDGES, given, target):
+            return LocalGrade(1.0, round(ratio, 3), "fuzzy", "Correct.")
+        return LocalGrade(0.0, round(min(ratio, 1 - ratio), 3), "fuzzy", "")
+
+    def _keywords(self, keywords: List[str], given: str) -> LocalGrade:
+        coverage = keyword_coverage(given, keywords)
+        # Only full coverage is trusted; missing keywords may be paraphrased
+        confidence = 0.9 if coverage == 1.0 else round(0.5 * coverage, 3)
+        return LocalGrade(round(coverage, 4), confidence, "keywords", "Covers all expected points." if coverage == 1.0 else "")
+
+class LocalGradingStats:
+    """Answers resolved locally per method against those escalated to the LLM."""
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] = self._counts.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        escalated = counts.pop("escalated", 0)
+        resolved = sum(counts.values())
+        total = resolved + escalated
+        return {
+            "answers": total,
+            "resolved_locally": resolved,
+            "escalated": escalated,
+            "local_share": round(resolved / total, 4) if total else 0.0,
+            "by_method": counts
+        }
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counts = sorted(self._counts.items())
+        lines = [
+            "# HELP local_grading_answers_total Answers scored by the local matcher, by method, or escalated to the LLM.",
+            "# TYPE local_grading_answers_total counter"
+        ]
+        lines.extend(f'local_grading_answers_total{{outcome="{outcome}"}} {count}' for outcome, count in counts)
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+local_grading_stats = LocalGradingStats()
+answer_matcher = AnswerMatcher()
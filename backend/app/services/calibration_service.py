@@ -0,0 +1,267 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.assessment import Assignment, AssignmentSubmission, QuestionGrade
+import threading
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lower bounds of the percentage bands, highest first
+DISTRIBUTION_BANDS = (("90-100", 90), ("80-89", 80), ("70-79", 70), ("60-69", 60), ("0-59", 0))
+
+def score_distribution(percentages: Sequence[float]) -> Dict[str, int]:
+    """Count scores per percentage band."""
+    values = np.asarray(percentages, dtype=float)
+    edges = np.array([bound for _, bound in reversed(DISTRIBUTION_BANDS)], dtype=float)
+    bands = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, None)
+    counts = np.bincount(bands, minlength=len(edges))
+    return {label: int(count) for (label, _), count in zip(DISTRIBUTION_BANDS, counts[::-1])}
+
+def fairness(scores: Sequence[float]) -> Dict[str, Any]:
+    """Consistency of a set of scores; a lower coefficient of variation is fairer."""
+    values = np.asarray(scores, dtype=float)
+    mean, std = float(values.mean()), float(values.std())
+    cv = std / mean if mean > 0 else 0.0
+    potential_biases = []
+    if std > mean * 0.5:
+        potential_biases.append("High score variance")
+    if np.unique(np.round(values)).size < 3:
+        potential_biases.append("Score clustering - may need finer grading scale")
+    return {
+        "fairness_score": round(max(0.0, 1 - min(cv, 1.0)), 3),
+        "statistics": {
+            "mean": round(mean, 2),
+            "std_dev": round(std, 2),
+            "cv": round(cv, 3),
+            "range": [float(values.min()), float(values.max())]
+        },
+        "potential_biases": potential_biases
+    }
+
+@dataclass
+class _ScopeData:
+    """Graded submissions of one assignment or course, held as arrays."""
+    submission_ids: List[UUID] = field(default_factory=list)
+    positions: Dict[UUID, int] = field(default_factory=dict)
+    percent: np.ndarray = field(default_factory=lambda: np.empty(0))
+    graded_at: np.ndarray = field(default_factory=lambda: np.empty(0))
+    criteria: List[str] = field(default_factory=list)
+    criterion_columns: Dict[str, int] = field(default_factory=dict)
+    criterion_percent: np.ndarray = field(default_factory=lambda: np.empty((0, 0)))  # NaN where not graded
+    count: int = 0
+    watermark: Optional[datetime] = None
+    report: Optional[Dict[str, Any]] = None
+
+    def upsert(self, rows: List[Tuple[UUID, float, Optional[datetime]]]) -> List[int]:
+        """Write (submission id, percent, graded_at) rows, returning their positions."""
+        new_ids = [row[0] for row in rows if row[0] not in self.positions]
+        if new_ids:
+            start = len(self.submission_ids)
+            for offset, submission_id in enumerate(new_ids):
+                self.positions[submission_id] = start + offset
+            self.submission_ids.extend(new_ids)
+            self.percent = np.concatenate([self.percent, np.zeros(len(new_ids))])
+            self.graded_at = np.concatenate([self.graded_at, np.zeros(len(new_ids))])
+            self.criterion_percent = np.vstack([
+                self.criterion_percent,
+                np.full((len(new_ids), self.criterion_percent.shape[1]), np.nan)
+            ])
+        positions = np.array([self.positions[row[0]] for row in rows], dtype=int)
+        self.percent[positions] = [row[1] for row in rows]
+        self.graded_at[positions] = [row[2].timestamp() if row[2] else 0.0 for row in rows]
+        self.criterion_percent[positions] = np.nan  # refilled from the question grades
+        return positions.tolist()
+
+    def set_criteria(self, entries: List[Tuple[UUID, str, float]]) -> None:
+        """Write (submission id, criterion, percent) cells."""
+        new = [name for name in dict.fromkeys(name for _, name, _ in entries) if name not in self.criterion_columns]
+        if new:
+            for name in new:
+                self.criterion_columns[name] = len(self.criteria)
+                self.criteria.append(name)
+            self.criterion_percent = np.hstack([
+                self.criterion_percent,
+                np.full((len(self.submission_ids), len(new)), np.nan)
+            ])
+        if entries:
+            rows = np.array([self.positions[sid] for sid, _, _ in entries], dtype=int)
+            cols = np.array([self.criterion_columns[name] for _, name, _ in entries], dtype=int)
+            self.criterion_percent[rows, cols] = [value for _, _, value in entries]
+
+class CalibrationService:
+    """Grade calibration and fairness statistics per assignment or course.
+
+    Scores are kept as numpy arrays per scope and every statistic is one
+    vectorized pass over them. Reports are cached; each request compares
+    the scope's graded count and latest ``graded_at`` with the cache and
+    only loads submissions graded since, so new grades (including
+    re-grades) are folded in without re-reading the whole cohort.
+    """
+
+    def __init__(self, outlier_z: Optional[float] = None, drift_batches: Optional[int] = None):
+        self.outlier_z = outlier_z or settings.CALIBRATION_OUTLIER_Z
+        self.drift_batches = drift_batches or settings.CALIBRATION_DRIFT_BATCHES
+        self._scopes: Dict[str, _ScopeData] = {}
+        self._lock = threading.Lock()
+
+    def assignment_report(self, db: Session, assignment_id: UUID) -> Dict[str, Any]:
+        return self._report(db, f"assignment:{assignment_id}", AssignmentSubmission.assignment_id == assignment_id)
+
+    def course_report(self, db: Session, course_id: UUID) -> Dict[str, Any]:
+        return self._report(db, f"course:{course_id}", Assignment.course_id == course_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+
+    def _graded(self, db: Session, *columns):
+        return db.query(*columns).join(
+            Assignment, AssignmentSubmission.assignment_id == Assignment.id
+        ).filter(
+            AssignmentSubmission.is_graded.is_(True),
+            AssignmentSubmission.score.isnot(None)
+        )
+
+    def _report(self, db: Session, scope: str, condition) -> Dict[str, Any]:
+        count, latest = self._graded(
+            db, func.count(AssignmentSubmission.id), func.max(AssignmentSubmission.graded_at)
+        ).filter(condition).one()
+
+        with self._lock:
+            data = self._scopes.get(scope)
+            if data is not None and data.report is not None and data.count == count and data.watermark == latest:
+                return data.report
+
+            query = self._graded(
+                db,
+                AssignmentSubmission.id,
+                AssignmentSubmission.score,
+                AssignmentSubmission.graded_at,
+                Assignment.max_score,
+                Assignment.title
+            ).filter(condition)
+            if data is None or count < data.count or data.watermark is None:
+                data = self._scopes[scope] = _ScopeData()  # something was un-graded or removed: reload
+            else:
+                query = query.filter(AssignmentSubmission.graded_at >= data.watermark)
+            rows = query.all()
+
+            positions = data.upsert([
+                (row.id, row.score / row.max_score * 100 if row.max_score else 0.0, row.graded_at)
+                for row in rows
+            ])
+            course_scope = scope.startswith("course:")
+            if course_scope:
+                # Across a course every assignment is one criterion
+                data.set_criteria([(row.id, row.title, data.percent[pos]) for row, pos in zip(rows, positions)])
+            elif rows:
+                grades = db.query(
+                    QuestionGrade.submission_id, QuestionGrade.question_index, QuestionGrade.score, QuestionGrade.max_score
+                ).filter(QuestionGrade.submission_id.in_([row.id for row in rows])).all()
+                data.set_criteria([
+                    (g.submission_id, f"Q{g.question_index + 1}", g.score / g.max_score * 100 if g.max_score else 0.0)
+                    for g in grades
+                ])
+
+            data.count, data.watermark = count, latest
+            data.report = self._build_report(data)
+            data.report.update({"scope": scope, "incremental_rows": len(rows)})
+            logger.debug(f"Calibration report for {scope} refreshed with {len(rows)} rows")
+            return data.report
+
+    def _build_report(self, data: _ScopeData) -> Dict[str, Any]:
+        percent = data.percent
+        n = percent.size
+        report: Dict[str, Any] = {
+            "graded_count": n,
+            "calculated_at": datetime.utcnow().isoformat()
+        }
+        if n == 0:
+            return report
+
+        mean, std = percent.mean(), percent.std()
+        z = (percent - mean) / std if std > 0 else np.zeros(n)
+        outliers = np.flatnonzero(np.abs(z) > self.outlier_z)
+        p10, p25, median, p75, p90 = np.percentile(percent, [10, 25, 50, 75, 90])
+
+        report.update({
+            "distribution": {
+                "mean": round(float(mean), 2),
+                "std_dev": round(float(std), 2),
+                "min": round(float(percent.min()), 2),
+                "max": round(float(percent.max()), 2),
+                "median": round(float(median), 2),
+                "percentiles": {
+                    "p10": round(float(p10), 2), "p25": round(float(p25), 2),
+                    "p75": round(float(p75), 2), "p90": round(float(p90), 2)
+                },
+                "bands": score_distribution(percent)
+            },
+            "fairness": fairness(percent),
+            "outliers": [
+                {
+                    "submission_id": data.submission_ids[i],
+                    "percentage": round(float(percent[i]), 2),
+                    "z_score": round(float(z[i]), 2)
+                }
+                for i in outliers[np.argsort(-np.abs(z[outliers]))]
+            ],
+            "drift": self._drift(percent, data.graded_at),
+            "criteria": self._criteria(data)
+        })
+        return report
+
+    def _drift(self, percent: np.ndarray, graded_at: np.ndarray) -> Dict[str, Any]:
+        """Compare batches in grading order, e.g. early against late graded submissions."""
+        batches = min(self.drift_batches, percent.size // 2)
+        if batches < 2:
+            return {"batches": [], "message": "Insufficient data"}
+
+        ordered = percent[np.argsort(graded_at, kind="stable")]
+        chunks = np.array_split(ordered, batches)
+        means = np.array([chunk.mean() for chunk in chunks])
+        first, last = chunks[0], chunks[-1]
+        pooled = np.sqrt((first.var(ddof=1) + last.var(ddof=1)) / 2) if min(first.size, last.size) > 1 else 0.0
+        effect = float((last.mean() - first.mean()) / pooled) if pooled > 0 else 0.0
+        return {
+            "batches": [
+                {"batch": i + 1, "count": int(chunk.size), "mean": round(float(m), 2)}
+                for i, (chunk, m) in enumerate(zip(chunks, means))
+            ],
+            "early_vs_late": round(float(last.mean() - first.mean()), 2),
+            "effect_size": round(effect, 3),
+            "drift_detected": abs(effect) >= 0.5
+        }
+
+    def _criteria(self, data: _ScopeData) -> List[Dict[str, Any]]:
+        """Spread of each criterion (question, or assignment for a course) across submissions."""
+        matrix = data.criterion_percent
+        if matrix.size == 0:
+            return []
+        graded = ~np.isnan(matrix)
+        counts = graded.sum(axis=0)
+        filled = np.where(graded, matrix, 0.0)
+        means = np.divide(filled.sum(axis=0), counts, out=np.zeros(len(counts)), where=counts > 0)
+        variances = np.divide(
+            (np.where(graded, matrix - means, 0.0) ** 2).sum(axis=0), counts,
+            out=np.zeros(len(counts)), where=counts > 0
+        )
+        return [
+            {
+                "criterion": name,
+                "count": int(counts[i]),
+                "mean": round(float(means[i]), 2),
+                "variance": round(float(variances[i]), 2),
+                "std_dev": round(float(np.sqrt(variances[i])), 2)
+            }
+            for i, name in enumerate(data.criteria)
+            if counts[i] > 0
+        ]
+
+calibration_service = CalibrationService()
@@ -0,0 +1,112 @@
+from typing import Any, Dict, Optional
+from uuid import UUID
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.database import SessionLocal
+from app.models.assessment import GradeMemo
+import hashlib
+import re
+import unicodedata
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_submission(content: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a submission."""
+    text = unicodedata.normalize("NFKC", content or "")
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+def memo_key(rubric_digest: str, content: Optional[str]) -> str:
+    content_digest = hashlib.sha256(normalize_submission(content).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{rubric_digest}:{content_digest}".encode("utf-8")).hexdigest()
+
+class GradeMemoStore:
+    """Grades remembered by rubric and normalized submission text.
+
+    Identical answers to the same assignment (resubmits, copied text, short
+    answers) reuse the first grade instead of calling the LLM again. A memo
+    only matches while the assignment's questions, rubric and max_score are
+    unchanged; storing under a new rubric drops the assignment's older memos.
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """The memoized grade with its provenance, or None."""
+        db = self.session_factory()
+        try:
+            memo = db.query(GradeMemo).filter(GradeMemo.memo_key == key).first()
+            if memo is None:
+                return None
+            memo.hit_count = (memo.hit_count or 0) + 1
+            memo.last_hit_at = datetime.utcnow()
+            db.commit()
+            return {
+                **memo.result,
+                "provenance": {
+                    "source": "memo",
+                    "memo_id": str(memo.id),
+                    "source_submission_id": str(memo.source_submission_id) if memo.source_submission_id else None,
+                    "graded_at": memo.created_at.isoformat() if memo.created_at else None,
+                    "model": memo.model,
+                    "hits": memo.hit_count
+                }
+            }
+        except SQLAlchemyError as e:
+            logger.warning(f"Grade memo lookup failed: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def store(
+        self,
+        key: str,
+        rubric_digest: str,
+        assignment_id: UUID,
+        source_submission_id: Optional[UUID],
+        result: Dict[str, Any],
+        model: Optional[str] = None
+    ) -> None:
+        """Remember a fresh grade, replacing any memo under the same key."""
+        db = self.session_factory()
+        try:
+            # Memos graded under earlier questions or max_score can never match again
+            db.query(GradeMemo).filter(
+                GradeMemo.assignment_id == assignment_id,
+                GradeMemo.rubric_hash != rubric_digest
+            ).delete(synchronize_session=False)
+
+            memo = db.query(GradeMemo).filter(GradeMemo.memo_key == key).first()
+            if memo is None:
+                memo = GradeMemo(memo_key=key, assignment_id=assignment_id, hit_count=0)
+                db.add(memo)
+            memo.rubric_hash = rubric_digest
+            memo.source_submission_id = source_submission_id if isinstance(source_submission_id, UUID) else None
+            memo.result = {k: v for k, v in result.items() if k != "provenance"}
+            memo.model = model
+            memo.created_at = datetime.utcnow()
+            db.commit()
+        except SQLAlchemyError as e:
+            # A concurrent grade of the same answer may have stored it first
+            logger.warning(f"Grade memo store failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def invalidate(self, assignment_id: UUID) -> int:
+        """Drop every memo of an assignment."""
+        db = self.session_factory()
+        try:
+            deleted = db.query(GradeMemo).filter(
+                GradeMemo.assignment_id == assignment_id
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+grade_memo = GradeMemoStore()
@@ -0,0 +1,506 @@
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.assessment import Assignment, AssignmentSubmission, GradingJob, GradingJobStatus, QuestionGrade
+from app.services.grading_service import GradingService, get_grading_service
+from app.services.llm_admission import Priority
+from app.services.rubric_service import rubric_service
+from app.utils.batch import run_batch
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (GradingJobStatus.PENDING, GradingJobStatus.RUNNING)
+
+class GradingJobRunner:
+    """Runs grading jobs from the ``grading_jobs`` table.
+
+    A job covers either one freshly submitted submission or a bulk grade of
+    an assignment. Submissions are graded with bounded concurrency and every
+    score is committed as soon as it arrives, together with a checkpoint
+    entry on the job. A job that stops part-way (crash, restart, provider
+    outage) resumes from its checkpoint and only grades what is left; the
+    comparative analysis runs once over the complete result set at the end.
+    """
+
+    def __init__(
+        self,
+        grading_service: Optional[GradingService] = None,
+        concurrency: Optional[int] = None,
+        session_factory=SessionLocal
+    ):
+        self._grading_service = grading_service
+        self.concurrency = concurrency or settings.GRADING_JOB_CONCURRENCY
+        self.session_factory = session_factory
+
+    @property
+    def grading_service(self) -> GradingService:
+        if self._grading_service is None:
+            self._grading_service = get_grading_service()
+        return self._grading_service
+
+    def create_job(
+        self,
+        db: Session,
+        assignment: Assignment,
+        requested_by: UUID,
+        regrade: bool = False,
+        question_indices: Optional[List[int]] = None
+    ) -> GradingJob:
+        """Snapshot the submissions to grade and persist a pending job.
+
+        With ``question_indices`` the job re-grades already graded
+        submissions after a question edit, calling the LLM only for
+        questions whose content changed. Only submissions with stored
+        per-question grades are included; those graded by hand or before
+        per-question grading keep their score until fully re-graded.
+        """
+        query = db.query(AssignmentSubmission.id).filter(
+            AssignmentSubmission.assignment_id == assignment.id,
+            AssignmentSubmission.content.isnot(None),
+            AssignmentSubmission.content != ""
+        )
+        if question_indices is not None:
+            query = query.filter(
+                AssignmentSubmission.is_graded.is_(True),
+                AssignmentSubmission.question_grades.any()
+            )
+        elif not regrade:
+            query = query.filter(or_(AssignmentSubmission.is_graded.is_(False), AssignmentSubmission.is_graded.is_(None)))
+        submission_ids = [str(row.id) for row in query.order_by(AssignmentSubmission.submitted_at).all()]
+
+        job = GradingJob(
+            assignment_id=assignment.id,
+            requested_by=requested_by,
+            status=GradingJobStatus.PENDING,
+            regrade=regrade,
+            submission_ids=submission_ids,
+            question_indices=question_indices,
+            results={},
+            total_count=len(submission_ids),
+            graded_count=0,
+            failed_count=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    def enqueue_submission(self, db: Session, submission: AssignmentSubmission) -> GradingJob:
+        """Queue auto-grading for a single new submission."""
+        job = GradingJob(
+            assignment_id=submission.assignment_id,
+            submission_id=submission.id,
+            requested_by=submission.student_id,
+            status=GradingJobStatus.PENDING,
+            regrade=False,
+            submission_ids=[str(submission.id)],
+            results={},
+            total_count=1,
+            graded_count=0,
+            failed_count=0
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def is_stale(job: GradingJob) -> bool:
+        """A running job whose heartbeat stopped, e.g. because its worker died."""
+        if job.status != GradingJobStatus.RUNNING:
+            return False
+        heartbeat = job.heartbeat_at or job.started_at
+        if heartbeat is None:
+            return True
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.GRADING_JOB_STALE_SECONDS)
+        return heartbeat.replace(tzinfo=None) < cutoff
+
+    def claim_next(self) -> Optional[UUID]:
+        """Atomically take the next runnable job, single submissions first.
+
+        The conditional UPDATE makes the claim safe when several workers or
+        processes poll the same table: only one of them changes the row.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.GRADING_JOB_STALE_SECONDS)
+        runnable = or_(
+            GradingJob.status == GradingJobStatus.PENDING,
+            and_(
+                GradingJob.status == GradingJobStatus.RUNNING,
+                or_(GradingJob.heartbeat_at.is_(None), GradingJob.heartbeat_at < cutoff)
+            )
+        )
+        db = self.session_factory()
+        try:
+            candidates = db.query(GradingJob.id).filter(runnable).order_by(
+                GradingJob.submission_id.is_(None),
+                GradingJob.created_at
+            ).limit(5).all()
+            for (job_id,) in candidates:
+                claimed = db.query(GradingJob).filter(GradingJob.id == job_id, runnable).update(
+                    {
+                        GradingJob.status: GradingJobStatus.RUNNING,
+                        GradingJob.heartbeat_at: datetime.utcnow()
+                    },
+                    synchronize_session=False
+                )
+                db.commit()
+                if claimed:
+                    return job_id
+            return None
+        finally:
+            db.close()
+
+    async def run(self, job_id: UUID) -> None:
+        """Grade everything the job's checkpoint does not cover yet."""
+        db = self.session_factory()
+        heartbeat: Optional[asyncio.Task] = None
+        try:
+            job = db.query(GradingJob).filter(GradingJob.id == job_id).first()
+            if job is None or job.status == GradingJobStatus.COMPLETED:
+                return
+
+            # Submissions that failed on an earlier run get another attempt
+            results = dict(job.results or {})
+            retry = [sid for sid, entry in results.items() if entry.get("status") == "failed"]
+            for sid in retry:
+                del results[sid]
+            job.results = results
+            job.failed_count = max((job.failed_count or 0) - len(retry), 0)
+
+            job.status = GradingJobStatus.RUNNING
+            job.started_at = job.started_at or datetime.utcnow()
+            job.heartbeat_at = datetime.utcnow()
+            job.error = None
+            db.commit()
+
+            # Keeps the claim alive while a slow grade runs, so no other worker reclaims the job
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+
+            # Resolved once per job; every submission is graded against this version
+            rubric = await self._rubric(job.assignment_id)
+
+            # Loaded after the commit above and never committed again in this
+            # session, so the objects stay usable while grading.
+            assignment = db.query(Assignment).filter(Assignment.id == job.assignment_id).first()
+            done = set((job.results or {}).keys())
+            pending_ids = [UUID(sid) for sid in job.submission_ids or [] if sid not in done]
+            submissions = db.query(AssignmentSubmission).filter(
+                AssignmentSubmission.id.in_(pending_ids)
+            ).all() if pending_ids else []
+            if done:
+                logger.info(f"Resuming grading job {job_id}: {len(done)} done, {len(submissions)} left")
+
+            regrade = bool(job.regrade)
+            # A student waiting on their own grade outranks bulk re-grading
+            priority = Priority.INTERACTIVE if job.submission_id else Priority.BULK
+            work = [(submission.id, submission.content) for submission in submissions]
+            existing = self._question_grades(db, pending_ids) if job.question_indices is not None else None
+
+            async def grade(index: int, item: tuple) -> Dict[str, Any]:
+                submission_id, content = item
+                if existing is not None:
+                    if not existing.get(submission_id):
+                        # Graded by hand since the job was created; a partial re-grade would overwrite it
+                        self._skip(job_id, submission_id, "No per-question grades to update")
+                        return {"submission_id": submission_id, "status": "skipped"}
+                    result = await self.grading_service.regrade_questions(
+                        assignment,
+                        content,
+                        submission_id,
+                        existing.get(submission_id, {}),
+                        priority=priority,
+                        rubric=rubric
+                    )
+                else:
+                    result = await self.grading_service.grade_submission(
+                        assignment,
+                        content,
+                        submission_id,
+                        use_cache=not regrade,
+                        priority=priority,
+                        rubric=rubric
+                    )
+                self._checkpoint(job_id, submission_id, result)
+                return {"submission_id": submission_id}
+
+            outcomes = await run_batch(work, grade, self.concurrency)
+            # Workers that raised (e.g. in _checkpoint) left no checkpoint entry
+            self._record_failures(job_id, [
+                (work[outcome["index"]][0], outcome.get("error"))
+                for outcome in outcomes
+                if outcome["status"] == "failed"
+            ])
+            await self._finish(job_id)
+        except Exception as e:
+            logger.error(f"Grading job {job_id} failed: {e}")
+            self._fail(job_id, str(e))
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+                await asyncio.gather(heartbeat, return_exceptions=True)
+            db.close()
+
+    async def _heartbeat(self, job_id: UUID) -> None:
+        """Refresh the job's heartbeat until cancelled."""
+        while True:
+            await asyncio.sleep(settings.GRADING_JOB_HEARTBEAT_SECONDS)
+            db = self.session_factory()
+            try:
+                db.query(GradingJob).filter(
+                    GradingJob.id == job_id,
+                    GradingJob.status == GradingJobStatus.RUNNING
+                ).update({GradingJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                logger.warning(f"Heartbeat for grading job {job_id} failed: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+    def _record_failures(self, job_id: UUID, failures: List[tuple]) -> None:
+        """Checkpoint submissions whose grading raised as failed."""
+        if not failures:
+            return
+        db = self.session_factory()
+        try:
+            job = db.query(GradingJob).filter(GradingJob.id == job_id).first()
+            results = dict(job.results or {})
+            for submission_id, error in failures:
+                if str(submission_id) in results:
+                    continue
+                results[str(submission_id)] = {"status": "failed", "error": error}
+                job.failed_count = (job.failed_count or 0) + 1
+            job.results = results
+            db.commit()
+        finally:
+            db.close()
+
+    def _skip(self, job_id: UUID, submission_id: UUID, reason: str) -> None:
+        """Checkpoint a submission the job leaves untouched."""
+        db = self.session_factory()
+        try:
+            job = db.query(GradingJob).filter(GradingJob.id == job_id).first()
+            results = dict(job.results or {})
+            results.setdefault(str(submission_id), {"status": "skipped", "reason": reason})
+            job.results = results
+            db.commit()
+        finally:
+            db.close()
+
+    def _checkpoint(self, job_id: UUID, submission_id: UUID, result: Dict[str, Any]) -> None:
+        """Persist one grade and record it in the job's checkpoint."""
+        # The grading service returns a fallback with an "N/A" letter when the LLM call failed
+        failed = result.get("grade_letter") == "N/A"
+        db = self.session_factory()
+        try:
+            job = db.query(GradingJob).filter(GradingJob.id == job_id).first()
+            if str(submission_id) in (job.results or {}):
+                return  # already checkpointed by an earlier run of this job
+            if not failed:
+                submission = db.query(AssignmentSubmission).filter(
+                    AssignmentSubmission.id == submission_id
+                ).first()
+                if submission is not None:
+                    submission.score = result["score"]
+                    submission.feedback = result["feedback"]
+                    submission.ai_feedback = result["ai_feedback"]
+                    submission.is_graded = True
+                    submission.graded_at = datetime.utcnow()
+                    if "questions" in result:
+                        self._save_question_grades(db, submission_id, result["questions"])
+
+            results = dict(job.results or {})
+            if failed:
+                results[str(submission_id)] = {"status": "failed", "error": result.get("ai_feedback")}
+                job.failed_count = (job.failed_count or 0) + 1
+            else:
+                results[str(submission_id)] = {
+                    "status": "graded",
+                    "score": result["score"],
+                    "grade_letter": result.get("grade_letter"),
+                    "source": result.get("provenance", {}).get("source")
+                }
+                job.graded_count = (job.graded_count or 0) + 1
+            job.results = results
+            job.heartbeat_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    async def _rubric(self, assignment_id: UUID) -> Dict[str, Any]:
+        """The assignment's current stored rubric, created if needed."""
+        db = self.session_factory()
+        try:
+            assignment = db.query(Assignment).filter(Assignment.id == assignment_id).first()
+            return (await rubric_service.current(db, assignment)).rubric
+        finally:
+            db.close()
+
+    @staticmethod
+    def _question_grades(db: Session, submission_ids: List[UUID]) -> Dict[UUID, Dict[int, Dict[str, Any]]]:
+        """Stored per-question grades by submission and question index."""
+        grades: Dict[UUID, Dict[int, Dict[str, Any]]] = {}
+        if not submission_ids:
+            return grades
+        rows = db.query(QuestionGrade).filter(QuestionGrade.submission_id.in_(submission_ids)).all()
+        for row in rows:
+            grades.setdefault(row.submission_id, {})[row.question_index] = {
+                "question_hash": row.question_hash,
+                "score": row.score,
+                "max_score": row.max_score,
+                "feedback": row.feedback,
+                "strengths": row.strengths or [],
+                "areas_of_improvement": row.areas_of_improvement or []
+            }
+        return grades
+
+    @staticmethod
+    def _save_question_grades(db: Session, submission_id: UUID, questions: List[Dict[str, Any]]) -> None:
+        """Replace a submission's per-question grades."""
+        rows = {
+            row.question_index: row
+            for row in db.query(QuestionGrade).filter(QuestionGrade.submission_id == submission_id).all()
+        }
+        for question in questions:
+            row = rows.pop(question["index"], None)
+            if row is None:
+                row = QuestionGrade(submission_id=submission_id, question_index=question["index"])
+                db.add(row)
+            row.question_hash = question["question_hash"]
+            row.score = question["score"]
+            row.max_score = question["max_score"]
+            row.feedback = question.get("feedback")
+            row.strengths = question.get("strengths")
+            row.areas_of_improvement = question.get("areas_of_improvement")
+            if question.get("regraded", True):
+                row.graded_at = datetime.utcnow()
+        # Questions removed from the assignment since the last grade
+        for row in rows.values():
+            db.delete(row)
+
+    async def _finish(self, job_id: UUID) -> None:
+        """Run the comparative pass over every graded submission and close the job."""
+        db = self.session_factory()
+        try:
+            job = db.query(GradingJob).filter(GradingJob.id == job_id).first()
+            graded = [
+                {"submission_id": sid, "score": entry["score"]}
+                for sid, entry in (job.results or {}).items()
+                if entry.get("status") == "graded"
+            ]
+            if len(graded) > 1:
+                job.comparative_analysis = await self.grading_service.analyze_comparative_results(graded)
+            job.status = GradingJobStatus.COMPLETED
+            job.finished_at = datetime.utcnow()
+            job.heartbeat_at = job.finished_at
+            db.commit()
+            logger.info(
+                f"Grading job {job_id} completed: {job.graded_count} graded, {job.failed_count} failed"
+            )
+        finally:
+            db.close()
+
+    def _fail(self, job_id: UUID, error: str) -> None:
+        db = self.session_factory()
+        try:
+            job = db.query(GradingJob).filter(GradingJob.id == job_id).first()
+            if job is not None:
+                job.status = GradingJobStatus.FAILED
+                job.error = error
+                job.finished_at = datetime.utcnow()
+                db.commit()
+        finally:
+            db.close()
+
+class GradingWorkerPool:
+    """Workers that poll the job table and run grading jobs.
+
+    Runs inside the API process by default; set
+    ``GRADING_WORKERS_IN_PROCESS=false`` and start ``python -m
+    app.services.grading_jobs`` to grade in a separate process instead.
+    Enqueuing in the same process wakes an idle worker immediately.
+    """
+
+    def __init__(
+        self,
+        runner: GradingJobRunner,
+        workers: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.runner = runner
+        self.workers = workers or settings.GRADING_WORKERS
+        self.poll_interval = settings.GRADING_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._busy = 0
+        self._processed = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._work(i)) for i in range(self.workers)]
+        logger.info(f"Started {self.workers} grading workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake an idle worker after a job was enqueued in this process."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "busy": self._busy,
+            "processed": self._processed
+        }
+
+    async def run_forever(self) -> None:
+        self.start()
+        await asyncio.gather(*self._tasks)
+
+    async def _work(self, worker_id: int) -> None:
+        while True:
+            try:
+                job_id = self.runner.claim_next()
+            except Exception as e:
+                logger.error(f"Grading worker {worker_id} could not poll for jobs: {e}")
+                job_id = None
+
+            if job_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._busy += 1
+            try:
+                await self.runner.run(job_id)
+                self._processed += 1
+            finally:
+                self._busy -= 1
+
+grading_job_runner = GradingJobRunner()
+grading_worker_pool = GradingWorkerPool(grading_job_runner)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(grading_worker_pool.run_forever())
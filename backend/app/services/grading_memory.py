@@ -0,0 +1,143 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+from datetime import datetime
+from app.core.config import settings
+from app.utils.sqlite_kv import SqliteKV
+import json
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+Scope = Tuple[str, str]
+
+class GradingMemory:
+    """Recent grading history per (student, course), bounded in size.
+
+    Each scope keeps only its last ``window`` graded submissions as short
+    summaries, and at most ``max_scopes`` scopes stay in process with the
+    least recently used evicted first, so memory stays flat however many
+    submissions a worker grades. With ``db_path`` set, scopes are written
+    through to sqlite and reloaded after eviction or a restart.
+    """
+
+    # Longest text kept per summary field
+    MAX_TEXT = 200
+
+    def __init__(self, max_scopes: int = 1000, window: int = 5, db_path: Optional[str] = None):
+        self.max_scopes = max_scopes
+        self.window = window
+        self._scopes: "OrderedDict[Scope, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = SqliteKV(db_path, "grading_memory_scopes", "Grading memory")
+        self._stats = {"hits": 0, "loads": 0, "misses": 0, "evictions": 0, "writes": 0}
+
+    @staticmethod
+    def scope(student_id: Any, course_id: Any) -> Scope:
+        return (str(student_id), str(course_id))
+
+    def history(self, student_id: Any, course_id: Any) -> List[Dict[str, Any]]:
+        """The scope's recent entries, oldest first."""
+        key = self.scope(student_id, course_id)
+        with self._lock:
+            entries = self._scopes.get(key)
+            if entries is not None:
+                self._scopes.move_to_end(key)
+                self._stats["hits"] += 1
+                return list(entries)
+
+        stored = self._disk_get(key)
+        with self._lock:
+            if key in self._scopes:
+                return list(self._scopes[key])
+            self._stats["loads" if stored else "misses"] += 1
+            if not stored:
+                return []
+            return list(self._remember(key, deque(stored, maxlen=self.window)))
+
+    def add(
+        self,
+        student_id: Any,
+        course_id: Any,
+        assignment: str,
+        score: Optional[float],
+        max_score: Optional[float],
+        strengths: Optional[List[str]] = None,
+        weaknesses: Optional[List[str]] = None
+    ) -> None:
+        """Append a graded submission's summary, dropping the oldest beyond the window."""
+        entry = {
+            "assignment": str(assignment)[:self.MAX_TEXT],
+            "score": score,
+            "max_score": max_score,
+            "strengths": [str(s)[:self.MAX_TEXT] for s in (strengths or [])[:3]],
+            "weaknesses": [str(w)[:self.MAX_TEXT] for w in (weaknesses or [])[:3]],
+            "graded_at": datetime.utcnow().isoformat()
+        }
+        key = self.scope(student_id, course_id)
+        self.history(student_id, course_id)  # loads a persisted scope before appending
+        with self._lock:
+            entries = self._scopes.get(key)
+            if entries is None:
+                entries = self._remember(key, deque(maxlen=self.window))
+            entries.append(entry)
+            snapshot = list(entries)
+            self._stats["writes"] += 1
+        self._disk_set(key, snapshot)
+
+    def render(self, student_id: Any, course_id: Any) -> str:
+        """The scope's history as compact prompt text."""
+        lines = []
+        for entry in self.history(student_id, course_id):
+            score = f"{entry['score']}/{entry['max_score']}" if entry.get("score") is not None else "ungraded"
+            line = f"- {entry['assignment']}: {score}"
+            if entry.get("strengths"):
+                line += f"; strengths: {', '.join(entry['strengths'])}"
+            if entry.get("weaknesses"):
+                line += f"; to improve: {', '.join(entry['weaknesses'])}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        """Drop every scope."""
+        with self._lock:
+            self._scopes.clear()
+        self._disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["scopes"] = len(self._scopes)
+        stats.update({"max_scopes": self.max_scopes, "window": self.window, "persisted": self._disk.enabled})
+        return stats
+
+    def _remember(self, key: Scope, entries: deque) -> deque:
+        self._scopes[key] = entries
+        self._scopes.move_to_end(key)
+        while len(self._scopes) > self.max_scopes:
+            self._scopes.popitem(last=False)
+            self._stats["evictions"] += 1
+        return entries
+
+    @staticmethod
+    def _disk_key(key: Scope) -> str:
+        return ":".join(key)
+
+    def _disk_get(self, key: Scope) -> List[Dict[str, Any]]:
+        row = self._disk.get(self._disk_key(key))
+        if not row:
+            return []
+        try:
+            return json.loads(row[0])
+        except ValueError as e:
+            logger.warning(f"Grading memory read failed: {e}")
+            return []
+
+    def _disk_set(self, key: Scope, entries: List[Dict[str, Any]]) -> None:
+        self._disk.set(self._disk_key(key), json.dumps(entries, default=str))
+
+grading_memory = GradingMemory(
+    max_scopes=settings.GRADING_MEMORY_MAX_SCOPES,
+    window=settings.GRADING_MEMORY_WINDOW,
+    db_path=settings.GRADING_MEMORY_PATH
+)
@@ -1,7 +1,17 @@
 from typing import Dict, Any, List, Optional
-from app.services.llm_service import LLMService
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.llm_admission import Priority
+from app.services.grade_memo import grade_memo, memo_key
+from app.services.answer_matcher import answer_matcher
+from app.utils.token_budget import fit_text
+from app.utils.batch import run_batch
+from app.core.config import settings
 from app.models.assessment import Assignment, AssignmentSubmission
+from functools import lru_cache
+import asyncio
+import hashlib
 import json
+import re
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,29 +19,66 @@ logger = logging.getLogger(__name__)
 class GradingService:
     """Service for AI-powered assignment grading."""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self.llm_service = llm_service or get_llm_service()
     
     async def grade_submission(
         self,
         assignment: Assignment,
         submission_content: str,
-        submission_id: int
+        submission_id: int,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        rubric: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Grade assignment submission using AI."""
+        """Grade assignment submission using AI.
+
+        Answers already graded under the same questions and rubric are
+        served from the grade memo, tagged with their provenance;
+        ``use_cache=False`` always grades afresh and refreshes the memo.
+        Without a ``rubric`` the assignment's current stored version is
+        looked up; callers grading many submissions should resolve it once.
+        """
         try:
-            rubric = self._create_grading_rubric(assignment)
+            rubric = rubric or await self._resolve_rubric(assignment)
             
-            grade_result = await self.llm_service.grade_assignment(
-                assignment=assignment.questions,
-                submission=submission_content,
-                rubric=rubric
-            )
+            # Stored rubrics carry a fingerprint of their version; only those are memoized
+            rubric_digest = rubric.get("fingerprint")
+            memoizable = assignment.id is not None and rubric_digest is not None
+            if memoizable:
+                key = memo_key(rubric_digest, submission_content)
+                if use_cache:
+                    memoized = grade_memo.lookup(key)
+                    if memoized is not None:
+                        logger.info(f"Graded submission {submission_id} from memo: {memoized['score']}/{assignment.max_score}")
+                        return memoized
             
-            processed_result = self._process_grade_result(
-                grade_result,
-                assignment.max_score
-            )
+            if self._has_question_list(assignment):
+                processed_result = grade_result = await self.grade_questions(
+                    assignment, submission_content, use_cache=use_cache, priority=priority,
+                    rubric=rubric
+                )
+            else:
+                grade_result = await self.llm_service.grade_assignment(
+                    assignment=assignment.questions,
+                    submission=submission_content,
+                    rubric=rubric,
+                    use_cache=use_cache,
+                    priority=priority
+                )
+                
+                processed_result = self._process_grade_result(
+                    grade_result,
+                    assignment.max_score
+                )
+            
+            # Raw-text fallbacks are guesses and are not worth remembering
+            if memoizable and isinstance(grade_result, dict):
+                grade_memo.store(
+                    key, rubric_digest, assignment.id, submission_id, processed_result,
+                    model=self.llm_service.model_id
+                )
+            processed_result["provenance"] = {"source": "llm", "model": self.llm_service.model_id}
             
             logger.info(f"Graded submission {submission_id}: {processed_result['score']}/{assignment.max_score}")
             
@@ -41,29 +88,141 @@ class GradingService:
             logger.error(f"Grading failed for submission {submission_id}: {e}")
             return self._create_fallback_grade(assignment)
     
+    async def grade_questions(
+        self,
+        assignment: Assignment,
+        submission_content: str,
+        existing: Optional[Dict[int, Dict[str, Any]]] = None,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        rubric: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Grade each question separately and add the scores up.
+
+        ``existing`` maps question index to an earlier per-question grade.
+        Those whose question is unchanged are reused, rescaled if the points
+        moved, even when the question now sits at another index; only new or
+        edited questions are graded. Answers the local
+        matcher scores confidently never reach the LLM; the rest are graded
+        against the criteria of ``rubric``.
+        """
+        rubric = rubric or {}
+        criteria = rubric_criteria(rubric)
+        questions = assignment.questions
+        points = question_points(questions, assignment.max_score)
+        answers = split_answers(submission_content, len(questions))
+        questions = [q if isinstance(q, dict) else {"question": str(q)} for q in questions]
+        digests = [question_hash(question) for question in questions]
+        existing = existing or {}
+        # Inserting, deleting or reordering questions moves grades to a new index
+        carried = match_questions({i: grade["question_hash"] for i, grade in existing.items()}, digests)
+        
+        async def grade_one(index: int) -> Dict[str, Any]:
+            question = questions[index]
+            digest = digests[index]
+            prior = existing[carried[index]] if index in carried else None
+            if prior:
+                scale = points[index] / prior["max_score"] if prior["max_score"] else 0
+                return {**prior, "index": index, "score": round(prior["score"] * scale, 2), "max_score": points[index], "regraded": False}
+            
+            answer = answers[index] if answers else submission_content
+            # Answers with a key are scored locally when the match is unambiguous
+            local = answer_matcher.grade(question, answer) if answers or len(questions) == 1 else None
+            if local is not None:
+                return {
+                    "index": index,
+                    "question_hash": digest,
+                    "score": round(local.fraction * points[index], 2),
+                    "max_score": points[index],
+                    "feedback": local.feedback,
+                    "strengths": [],
+                    "areas_of_improvement": [],
+                    "regraded": True,
+                    "graded_by": f"local:{local.method}"
+                }
+            
+            raw = await self.llm_service.grade_question(
+                index + 1,
+                question,
+                fit_text("grading_question", answer),
+                points[index],
+                use_cache=use_cache,
+                priority=priority,
+                criteria=criteria,
+                rubric_version=rubric.get("version")
+            )
+            if not isinstance(raw, dict) or "score" not in raw:
+                raise ValueError(f"Unusable grade for question {index + 1}")
+            return {
+                "index": index,
+                "question_hash": digest,
+                "score": max(0.0, min(float(raw["score"]), points[index])),
+                "max_score": points[index],
+                "feedback": raw.get("feedback", ""),
+                "strengths": list(raw.get("strengths") or []),
+                "areas_of_improvement": list(raw.get("areas_of_improvement") or []),
+                "regraded": True,
+                "graded_by": "llm"
+            }
+        
+        graded = await asyncio.gather(*[grade_one(i) for i in range(len(questions))])
+        return self._combine_question_grades(graded, assignment.max_score)
+    
+    async def regrade_questions(
+        self,
+        assignment: Assignment,
+        submission_content: str,
+        submission_id: Any,
+        existing: Dict[int, Dict[str, Any]],
+        priority: Priority = Priority.BULK,
+        rubric: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Re-grade only the questions edited since ``existing`` was graded."""
+        try:
+            result = await self.grade_questions(
+                assignment, submission_content, existing=existing, priority=priority,
+                rubric=rubric
+            )
+            result["provenance"] = {"source": "llm", "model": self.llm_service.model_id}
+            regraded = sum(1 for q in result["questions"] if q["regraded"])
+            logger.info(f"Re-graded {regraded} question(s) of submission {submission_id}: {result['score']}/{assignment.max_score}")
+            return result
+        except Exception as e:
+            logger.error(f"Question re-grade failed for submission {submission_id}: {e}")
+            return self._create_fallback_grade(assignment)
+    
     async def grade_multiple_submissions(
         self,
         assignment: Assignment,
-        submissions: List[AssignmentSubmission]
+        submissions: List[AssignmentSubmission],
+        concurrency: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """Grade multiple submissions with comparative analysis."""
-        results = []
+        """Grade multiple submissions concurrently, then compare them."""
+        rubric = await self._resolve_rubric(assignment)
         
-        for submission in submissions:
-            if submission.content:
-                grade_result = await self.grade_submission(
-                    assignment,
-                    submission.content,
-                    submission.id
-                )
-                results.append({
-                    "submission_id": submission.id,
-                    "student_id": submission.student_id,
-                    **grade_result
-                })
+        async def grade(index: int, submission: AssignmentSubmission) -> Dict[str, Any]:
+            grade_result = await self.grade_submission(
+                assignment,
+                submission.content,
+                submission.id,
+                priority=Priority.BULK,
+                rubric=rubric
+            )
+            return {
+                "submission_id": submission.id,
+                "student_id": submission.student_id,
+                **grade_result
+            }
+        
+        graded = await run_batch(
+            [s for s in submissions if s.content],
+            grade,
+            concurrency or settings.GRADING_JOB_CONCURRENCY
+        )
+        results = [r for r in graded if r["status"] == "completed"]
         
         if len(results) > 1:
-            comparative_analysis = await self._analyze_comparative_results(results)
+            comparative_analysis = await self.analyze_comparative_results(results)
             for result in results:
                 result["comparative_analysis"] = comparative_analysis.get(
                     str(result["submission_id"]), {}
@@ -82,7 +241,7 @@ class GradingService:
         Generate detailed feedback for this assignment submission:
         
         Assignment: {assignment.title}
-        Submission: {submission_content[:2000]}
+        Submission: {fit_text("grading_detailed_feedback", submission_content)}
         Score: {score}/{assignment.max_score}
         
         Provide:
@@ -94,13 +253,21 @@ class GradingService:
         6. Learning resources recommendations
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
+        detailed_feedback = await self.llm_service.invoke_text(
+            prompt, template_id="grading_detailed_feedback", priority=Priority.INTERACTIVE
+        )
         
         return {
-            "detailed_feedback": response.content,
+            "detailed_feedback": detailed_feedback,
             "score_breakdown": self._create_score_breakdown(score, assignment.max_score)
         }
     
+    @staticmethod
+    async def _resolve_rubric(assignment: Assignment) -> Dict[str, Any]:
+        # rubric_service builds its default rubrics with this service
+        from app.services.rubric_service import rubric_service
+        return await rubric_service.resolve(assignment)
+    
     def _create_grading_rubric(self, assignment: Assignment) -> Dict[str, Any]:
         """Create grading rubric based on assignment."""
         if assignment.questions and isinstance(assignment.questions, list):
@@ -154,6 +321,36 @@ class GradingService:
             }
         }
     
+    @staticmethod
+    def _has_question_list(assignment: Assignment) -> bool:
+        return isinstance(assignment.questions, list) and len(assignment.questions) > 0
+    
+    def _combine_question_grades(
+        self,
+        graded: List[Dict[str, Any]],
+        max_score: float
+    ) -> Dict[str, Any]:
+        """Total per-question grades into a submission grade, without another LLM call."""
+        score = round(sum(q["score"] for q in graded), 2)
+        local = sum(1 for q in graded if str(q.get("graded_by", "")).startswith("local"))
+        
+        def merged(key: str) -> List[str]:
+            return list(dict.fromkeys(item for q in graded for item in q.get(key) or []))
+        
+        return {
+            "score": score,
+            "feedback": "\n\n".join(f"Q{q['index'] + 1}: {q.get('feedback', '')}" for q in graded),
+            "ai_feedback": f"Graded per question ({len(graded)} questions, {local} scored against the answer key).",
+            "breakdown": [
+                {"criterion": f"Q{q['index'] + 1}", "score": q["score"], "max_score": q["max_score"]}
+                for q in graded
+            ],
+            "areas_of_improvement": merged("areas_of_improvement"),
+            "strengths": merged("strengths"),
+            "grade_letter": self._calculate_grade_letter(score, max_score),
+            "questions": graded
+        }
+    
     def _process_grade_result(
         self,
         grade_result: Dict[str, Any],
@@ -272,7 +469,7 @@ class GradingService:
         else:
             return "Unsatisfactory"
     
-    async def _analyze_comparative_results(
+    async def analyze_comparative_results(
         self,
         results: List[Dict[str, Any]]
     ) -> Dict[str, Dict[str, Any]]:
@@ -318,4 +515,72 @@ class GradingService:
         elif difference_percent > -20:
             return "Below average"
         else:
-            return "Significantly below average"
\ No newline at end of file
+            return "Significantly below average"
+
+_ANSWER_MARKER = re.compile(r"^\s*(?:q(?:uestion)?\s*)?(\d{1,3})\s*[.):-]", re.IGNORECASE | re.MULTILINE)
+
+def question_hash(question: Any) -> str:
+    """Hash of a question's content; points are excluded so re-weighting is not an edit."""
+    if isinstance(question, dict):
+        question = {k: v for k, v in question.items() if k != "points"}
+    payload = json.dumps(question, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def match_questions(old_hashes: Dict[int, str], new_hashes: List[str]) -> Dict[int, int]:
+    """Map each new question index to the old index of the same question.
+
+    A question keeps its own index when it did not move; otherwise it is
+    paired with the first unclaimed old question with the same hash.
+    Questions with no match are new or edited and are left out.
+    """
+    matched = {i: i for i, digest in enumerate(new_hashes) if old_hashes.get(i) == digest}
+    unclaimed: Dict[str, List[int]] = {}
+    for old_index in sorted(old_hashes):
+        if old_index not in matched:
+            unclaimed.setdefault(old_hashes[old_index], []).append(old_index)
+    for i, digest in enumerate(new_hashes):
+        if i not in matched and unclaimed.get(digest):
+            matched[i] = unclaimed[digest].pop(0)
+    return matched
+
+def question_points(questions: List[Any], max_score: Optional[float]) -> List[float]:
+    """Points per question, scaled so they add up to the assignment's max_score."""
+    max_score = max_score if max_score is not None else 100.0
+    raw = []
+    for question in questions:
+        points = question.get("points") if isinstance(question, dict) else None
+        raw.append(float(points) if isinstance(points, (int, float)) and points > 0 else 1.0)
+    total = sum(raw)
+    return [round(p / total * max_score, 4) for p in raw]
+
+def rubric_criteria(rubric: Dict[str, Any]) -> str:
+    """A rubric's criteria as prompt text, one line per criterion with its weight and levels."""
+    lines = []
+    for criterion in rubric.get("criteria") or []:
+        if not isinstance(criterion, dict):
+            continue
+        line = f"- {criterion.get('criterion', 'Criterion')} ({criterion.get('weight', '?')}%): {criterion.get('description', '')}"
+        levels = criterion.get("levels")
+        if isinstance(levels, dict) and levels:
+            line += "; levels: " + "; ".join(f"{name}: {text}" for name, text in levels.items())
+        lines.append(line)
+    return "\n".join(lines)
+
+def split_answers(content: Optional[str], count: int) -> Optional[List[str]]:
+    """Split a submission on "1.", "Q2)", "Question 3:" markers, or None if it is not numbered 1..count."""
+    if not content:
+        return None
+    starts = {}
+    for match in _ANSWER_MARKER.finditer(content):
+        number = int(match.group(1))
+        if number == len(starts) + 1 and number <= count:
+            starts[number] = match.start()
+    if len(starts) != count:
+        return None
+    bounds = [starts[n] for n in range(1, count + 1)] + [len(content)]
+    return [content[bounds[i]:bounds[i + 1]].strip() for i in range(count)]
+
+@lru_cache(maxsize=None)
+def get_grading_service() -> GradingService:
+    """Shared GradingService instance; usable as a FastAPI dependency."""
+    return GradingService()
@@ -1,9 +1,11 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
 import subprocess
 import tempfile
 import os
 from pathlib import Path
-from app.services.llm_service import LLMService
+from functools import lru_cache
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.llm_admission import Priority
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,8 +13,8 @@ logger = logging.getLogger(__name__)
 class LaTeXService:
     """Service for LaTeX processing and manipulation"""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self.llm_service = llm_service or get_llm_service()
     
     async def format_latex(self, latex_code: str) -> Dict[str, Any]:
         """Format and clean LaTeX code"""
@@ -32,8 +34,9 @@ class LaTeXService:
         Return only the formatted LaTeX code.
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
-        formatted = response.content
+        formatted = await self.llm_service.invoke_text(
+            prompt, template_id="latex_format", priority=Priority.INTERACTIVE
+        )
         
         # Validate with actual LaTeX compilation
         is_valid = await self._validate_latex(formatted)
@@ -47,7 +50,45 @@ class LaTeXService:
     
     async def solve_latex_problem(self, problem: str) -> Dict[str, Any]:
         """Solve LaTeX-related problems or equations"""
-        prompt = f"""
+        content = await self.llm_service.invoke_text(
+            self._solve_prompt(problem), template_id="latex_solve", priority=Priority.INTERACTIVE
+        )
+        
+        # Extract LaTeX code from response
+        latex_solution = self._extract_latex_from_text(content)
+        
+        return {
+            "solution": latex_solution,
+            "explanation": content,
+            "problem": problem
+        }
+    
+    def stream_solution(self, problem: str) -> AsyncIterator[str]:
+        """Stream the solution to a LaTeX problem as it is generated"""
+        return self.llm_service.stream_text(
+            self._solve_prompt(problem), template_id="latex_solve", priority=Priority.INTERACTIVE
+        )
+    
+    async def explain_latex(self, latex_code: str) -> Dict[str, Any]:
+        """Explain LaTeX code and its components"""
+        explanation = await self.llm_service.invoke_text(
+            self._explain_prompt(latex_code), template_id="latex_explain", priority=Priority.INTERACTIVE
+        )
+        
+        return {
+            "explanation": explanation,
+            "original_code": latex_code,
+            "components": await self._extract_components(latex_code)
+        }
+    
+    def stream_explanation(self, latex_code: str) -> AsyncIterator[str]:
+        """Stream an explanation of LaTeX code as it is generated"""
+        return self.llm_service.stream_text(
+            self._explain_prompt(latex_code), template_id="latex_explain", priority=Priority.INTERACTIVE
+        )
+    
+    def _solve_prompt(self, problem: str) -> str:
+        return f"""
         Solve this LaTeX problem or generate LaTeX code:
         
         Problem: {problem}
@@ -58,21 +99,9 @@ class LaTeXService:
         3. Alternative approaches if applicable
         4. Common pitfalls to avoid
         """
-        
-        response = await self.llm_service.llm.ainvoke(prompt)
-        
-        # Extract LaTeX code from response
-        latex_solution = self._extract_latex_from_text(response.content)
-        
-        return {
-            "solution": latex_solution,
-            "explanation": response.content,
-            "problem": problem
-        }
     
-    async def explain_latex(self, latex_code: str) -> Dict[str, Any]:
-        """Explain LaTeX code and its components"""
-        prompt = f"""
+    def _explain_prompt(self, latex_code: str) -> str:
+        return f"""
         Explain this LaTeX code in detail:
         
         {latex_code}
@@ -84,14 +113,6 @@ class LaTeXService:
         4. Potential improvements
         5. Related LaTeX concepts
         """
-        
-        response = await self.llm_service.llm.ainvoke(prompt)
-        
-        return {
-            "explanation": response.content,
-            "original_code": latex_code,
-            "components": await self._extract_components(latex_code)
-        }
     
     async def generate_latex_from_text(self, text: str, doc_type: str = "article") -> Dict[str, Any]:
         """Generate LaTeX document from plain text"""
@@ -109,8 +130,9 @@ class LaTeXService:
         6. Clean, compilable code
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
-        latex_code = response.content
+        latex_code = await self.llm_service.invoke_text(
+            prompt, template_id="latex_generate", priority=Priority.INTERACTIVE
+        )
         
         # Validate compilation
         is_valid = await self._validate_latex(latex_code)
@@ -213,4 +235,9 @@ class LaTeXService:
         env_pattern = r'\\begin\{([^}]+)\}'
         components["environments"] = re.findall(env_pattern, latex_code)
         
-        return components
\ No newline at end of file
+        return components
+
+@lru_cache(maxsize=None)
+def get_latex_service() -> LaTeXService:
+    """Shared LaTeXService instance; usable as a FastAPI dependency."""
+    return LaTeXService()
@@ -0,0 +1,201 @@
+from typing import Dict, Any, List, Optional, AsyncIterator
+from contextlib import asynccontextmanager
+from app.core.config import settings
+import asyncio
+import enum
+import heapq
+import itertools
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class Priority(enum.IntEnum):
+    """Admission priority classes; lower values are served first."""
+    INTERACTIVE = 0  # explanations, grading, student-facing requests
+    STANDARD = 1
+    BULK = 2  # course material, assignment and test generation
+
+class TokenBucket:
+    """Continuously refilled token bucket sized per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available, without taking them.
+
+        Requests larger than the bucket are clamped to its capacity so they
+        can still be admitted once the bucket is full.
+        """
+        if not self.enabled:
+            return 0.0
+
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+class AdmissionController:
+    """Global admission control for outbound LLM calls.
+
+    Bounds concurrency, paces requests and tokens per minute, and admits
+    the highest-priority waiter first. A caller is only admitted once both
+    a slot and rate budget are free, so nobody holds a slot while being
+    throttled and a paced bulk request never delays an interactive one.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._active = 0
+        self._waiters: List[tuple] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {
+            priority.name.lower(): {
+                "admitted": 0,
+                "total_wait": 0.0,
+                "max_wait": 0.0
+            }
+            for priority in Priority
+        }
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        priority: Priority = Priority.STANDARD,
+        tokens: int = 0
+    ) -> AsyncIterator[float]:
+        """Hold a concurrency slot for the duration of an LLM call.
+
+        Yields the number of seconds the caller spent queued.
+        """
+        enqueued_at = time.monotonic()
+        await self._acquire(priority, tokens)
+        try:
+            waited = time.monotonic() - enqueued_at
+            self._record(priority, waited)
+            yield waited
+        finally:
+            self._release()
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Number of callers waiting for a slot, per priority class."""
+        depth = {priority.name.lower(): 0 for priority in Priority}
+        for priority, _, future, _ in self._waiters:
+            if not future.done():
+                depth[Priority(priority).name.lower()] += 1
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, in-flight count and wait time metrics."""
+        per_priority = {}
+        for name, stats in self._stats.items():
+            admitted = stats["admitted"]
+            per_priority[name] = {
+                "admitted": admitted,
+                "avg_wait_seconds": round(stats["total_wait"] / admitted, 4) if admitted else 0.0,
+                "max_wait_seconds": round(stats["max_wait"], 4)
+            }
+
+        return {
+            "in_flight": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth(),
+            "priorities": per_priority
+        }
+
+    async def _acquire(self, priority: Priority, tokens: int) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future, tokens))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before cancellation.
+                self._release()
+            else:
+                # Let whoever queued behind a cancelled head move up.
+                self._dispatch()
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit waiters in priority order while slots and rate budget allow."""
+        while self._waiters:
+            _, _, future, tokens = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._active >= self.max_concurrency:
+                return
+
+            delay = max(
+                self.request_bucket.wait_time(1),
+                self.token_bucket.wait_time(tokens)
+            )
+            if delay > 0:
+                self._wake_after(delay)
+                return
+
+            heapq.heappop(self._waiters)
+            self.request_bucket.take(1)
+            self.token_bucket.take(tokens)
+            self._active += 1
+            future.set_result(None)
+
+    def _wake_after(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None and self._timer_loop is loop and not self._timer.cancelled():
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._on_timer)
+        self._timer_loop = loop
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _record(self, priority: Priority, waited: float) -> None:
+        stats = self._stats[priority.name.lower()]
+        stats["admitted"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        if waited > 1:
+            logger.info(f"LLM call ({priority.name.lower()}) waited {waited:.2f}s for admission")
+
+llm_admission = AdmissionController(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE
+)
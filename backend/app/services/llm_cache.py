@@ -0,0 +1,136 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+from app.core.config import settings
+from app.utils.sqlite_kv import SqliteKV
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    """Two-tier cache for raw LLM completions.
+
+    An in-process LRU with TTL sits in front of a sqlite store so cached
+    answers survive restarts and are shared between uvicorn workers. The
+    sqlite tier runs in a worker thread, off the event loop; if it cannot
+    be opened (e.g. a read-only filesystem) only the memory tier is used.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: int = 86400,
+        db_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = SqliteKV(db_path, "llm_cache", "LLM cache")
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "bypassed": 0
+        }
+
+    @staticmethod
+    def make_key(
+        template_id: str,
+        variables: Dict[str, Any],
+        model: str,
+        temperature: float
+    ) -> str:
+        """Build a content-addressed key for a prompt invocation."""
+        payload = json.dumps(
+            {
+                "template": template_id,
+                "variables": variables,
+                "model": model,
+                "temperature": temperature
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached completion or None on miss/expiry."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._entries[key]
+
+        value = await asyncio.to_thread(self._disk_get, key, now) if self._disk.enabled else None
+        if value is not None:
+            value, stored_at = value
+            with self._lock:
+                self._remember(key, value, stored_at)
+                self._stats["disk_hits"] += 1
+            return value
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        """Store a completion in both tiers."""
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, value, stored_at)
+            self._stats["writes"] += 1
+        if self._disk.enabled:
+            await asyncio.to_thread(self._disk.set, key, value, stored_at)
+
+    def record_bypass(self) -> None:
+        """Count a call that explicitly opted out of caching."""
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+        self._disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._entries)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hits"] = hits
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remember(self, key: str, value: str, stored_at: float) -> None:
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, key: str, now: float) -> Optional[tuple]:
+        row = self._disk.get(key)
+        if row and now - row[1] > self.ttl_seconds:
+            self._disk.delete(key)
+            return None
+        return row
+
+llm_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    db_path=settings.LLM_CACHE_PATH
+)
@@ -0,0 +1,56 @@
+from typing import Dict, Any, Awaitable, Callable, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class RequestCoalescer:
+    """Single-flight coalescing for identical in-flight LLM requests.
+
+    The first caller for a key starts the work; concurrent callers with the
+    same key await the same task instead of issuing their own request.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "leaders": 0,
+            "coalesced": 0
+        }
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """Run ``factory`` once per key among concurrent callers."""
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self._stats["coalesced"] += 1
+            logger.debug(f"Coalesced LLM request {key[:12]}")
+        else:
+            task = loop.create_task(factory())
+            self._inflight[key] = task
+            self._stats["leaders"] += 1
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+
+        # Shield the shared task so one caller disconnecting does not
+        # cancel the request for everybody else waiting on it.
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        """Number of distinct requests currently running."""
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return leader/follower counters."""
+        return {**self._stats, "in_flight": self.in_flight()}
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieve the exception so a task nobody awaited does not warn.
+            logger.debug(f"Coalesced LLM request {key[:12]} failed: {task.exception()}")
+
+llm_coalescer = RequestCoalescer()
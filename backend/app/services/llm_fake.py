@@ -0,0 +1,391 @@
+from typing import Any, Callable, List, Optional, AsyncIterator, Iterator, Tuple
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+from app.utils.token_budget import count_tokens
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+def _field(prompt: str, label: str, default: str = "") -> str:
+    match = re.search(rf"^\s*{label}[ \t]*:[ \t]*(.+)$", prompt, re.IGNORECASE | re.MULTILINE)
+    return match.group(1).strip() if match else default
+
+def _number(prompt: str, label: str, default: int) -> int:
+    match = re.search(rf"^\s*{label}[ \t]*:[ \t]*(\d+)", prompt, re.IGNORECASE | re.MULTILINE)
+    return int(match.group(1)) if match else default
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+def _course_material(prompt: str) -> str:
+    topic = _field(prompt, "Topic", "the topic")
+    sections = ["Introduction", "Key Concepts", "Detailed Explanations", "Examples",
+                "Applications", "Summary", "Further Reading Suggestions"]
+    body = [f"# {topic}\n"]
+    for i, section in enumerate(sections, 1):
+        body.append(
+            f"## {i}. {section}\n\n"
+            f"This section covers {section.lower()} for {topic}. It explains the core ideas "
+            f"step by step, links them to earlier material and closes with a short recap.\n"
+        )
+    return "\n".join(body)
+
+def _assignment(prompt: str) -> str:
+    topic = _field(prompt, "Topic", "the topic")
+    count = _number(prompt, "Number of Questions", 5)
+    return json.dumps({
+        "title": f"Assignment: {topic}",
+        "description": f"Practice assignment on {topic}.",
+        "instructions": "Answer all questions. Show your reasoning.",
+        "questions": [
+            {
+                "question": f"Question {i} about {topic}: explain a key idea and give an example.",
+                "type": "essay" if i % 2 else "short_answer",
+                "points": 10,
+                "rubric": "Accuracy 50%, depth 30%, clarity 20%"
+            }
+            for i in range(1, count + 1)
+        ]
+    })
+
+def _assignment_structure(prompt: str) -> str:
+    topic = _field(prompt, "Create an assignment on topic", "the topic")
+    count = _number(prompt, "Number of questions", 5)
+    return json.dumps({
+        "title": f"Assignment: {topic}",
+        "instructions": "Answer all questions. Show your reasoning.",
+        "questions": [
+            {
+                "question": f"Question {i} about {topic}",
+                "question_type": "essay",
+                "points": 10,
+                "difficulty": _field(prompt, "Difficulty", "medium"),
+                "expected_answer_length": "200-300 words"
+            }
+            for i in range(1, count + 1)
+        ],
+        "total_points": count * 10,
+        "estimated_time": count * 15,
+        "learning_objectives": [f"Understand {topic}", f"Apply {topic} to new problems"]
+    })
+
+def _test(prompt: str) -> str:
+    topic = _field(prompt, "Topic", "the topic")
+    test_type = _field(prompt, "Test Type", "multiple_choice").lower()
+    count = _number(prompt, "Number of Questions", 10)
+    questions = []
+    for i in range(1, count + 1):
+        if "text" in test_type:
+            questions.append({
+                "question": f"Explain concept {i} of {topic}.",
+                "type": "text_based",
+                "expected_answer": f"A correct answer defines concept {i} and gives an example.",
+                "points": 5
+            })
+        else:
+            options = [f"Option {letter} for question {i}" for letter in "ABCD"]
+            questions.append({
+                "question": f"Which statement about {topic} is correct? ({i})",
+                "type": "multiple_choice",
+                "options": options,
+                "correct_answer": options[i % 4],
+                "points": 1
+            })
+    return json.dumps({"questions": questions, "answers": {}, "estimated_duration": count * 2})
+
+def _flashcards(prompt: str) -> str:
+    topic = _field(prompt, "Topic", "the topic")
+    count = _number(prompt, "Number of Flashcards", 10)
+    return json.dumps({"flashcards": [
+        {
+            "front": f"What is concept {i} of {topic}?",
+            "back": f"Concept {i} of {topic}, explained in one sentence.",
+            "category": topic,
+            "difficulty": "beginner"
+        }
+        for i in range(1, count + 1)
+    ]})
+
+def _flashcard_set(prompt: str) -> str:
+    topic = _field(prompt, "Create flashcards for topic", "the topic")
+    count = _number(prompt, "Number of flashcards", 10)
+    return json.dumps({
+        "topic": topic,
+        "flashcards": [
+            {
+                "front": f"What is concept {i} of {topic}?",
+                "back": f"Concept {i} of {topic}, explained in one sentence.",
+                "category": topic,
+                "difficulty": _field(prompt, "Level", "beginner"),
+                "tags": [topic.lower()]
+            }
+            for i in range(1, count + 1)
+        ],
+        "study_plan": {"sessions_per_week": 3, "cards_per_session": min(count, 10)},
+        "estimated_study_time": count * 2
+    })
+
+def _study_plan(prompt: str) -> str:
+    topic = _field(prompt, "Create a study plan for", "the topic")
+    weeks = _number(prompt, "Weeks", 4)
+    return json.dumps({
+        "topic": topic,
+        "sessions": [{"week": w, "focus": f"{topic} part {w}", "hours": 3} for w in range(1, weeks + 1)],
+        "total_duration": weeks * 3,
+        "resources": [f"Introductory notes on {topic}"],
+        "milestones": [f"Complete part {w}" for w in range(1, weeks + 1)]
+    })
+
+def _course_structure(prompt: str) -> str:
+    topic = _field(prompt, "Generate a course structure for", "the topic")
+    weeks = _number(prompt, "Duration", 8)
+    return json.dumps({
+        "title": topic,
+        "modules": [f"{topic}: module {w}" for w in range(1, weeks + 1)],
+        "learning_objectives": [f"Explain the foundations of {topic}"],
+        "prerequisites": ["None"],
+        "duration_hours": weeks * 3
+    })
+
+def _module_content(prompt: str) -> str:
+    title = _field(prompt, "Generate content for module", "Module")
+    return json.dumps({
+        "module_title": title,
+        "lessons": [{"title": f"{title} lesson {i}", "content": f"Lesson {i} content."} for i in range(1, 4)],
+        "activities": ["Group discussion"],
+        "assessments": ["Short quiz"],
+        "resources": ["Lecture notes"]
+    })
+
+def _rubric(prompt: str) -> str:
+    count = _number(prompt, "Number of criteria", 4)
+    return json.dumps({"criteria": [
+        {
+            "criterion": f"Criterion {i}",
+            "description": f"Quality of criterion {i}",
+            "weight": round(100 / count),
+            "levels": {"excellent": "Fully meets", "good": "Mostly meets", "poor": "Does not meet"}
+        }
+        for i in range(1, count + 1)
+    ]})
+
+def _grading(prompt: str) -> str:
+    match = re.search(r"out of (\d+)", prompt)
+    max_score = int(match.group(1)) if match else 100
+    submission = _field(prompt, "Student Submission")
+    # Deterministic per submission, spread over 55-95% of the maximum
+    score = round(max_score * (0.55 + (_digest(submission) % 41) / 100), 1)
+    return json.dumps({
+        "overall_score": score,
+        "breakdown": [
+            {"criterion": "Content", "score": round(score * 0.6, 1), "max_score": max_score * 0.6},
+            {"criterion": "Clarity", "score": round(score * 0.4, 1), "max_score": max_score * 0.4}
+        ],
+        "detailed_feedback": "Solid understanding with room for more depth.",
+        "ai_feedback": "Simulated grading feedback.",
+        "areas_of_improvement": ["Add more supporting examples"],
+        "strengths": ["Clear structure"]
+    })
+
+def _grading_question(prompt: str) -> str:
+    match = re.search(r"out of ([\d.]+) points", prompt)
+    max_score = float(match.group(1)) if match else 10
+    score = round(max_score * (0.5 + (_digest(prompt) % 51) / 100), 1)
+    return json.dumps({
+        "score": score,
+        "feedback": "Correct idea; explain the reasoning more fully.",
+        "strengths": ["Addresses the question"],
+        "areas_of_improvement": ["Add a worked example"]
+    })
+
+def _grading_fused(prompt: str) -> str:
+    match = re.search(r"out of (\d+)", prompt)
+    max_score = int(match.group(1)) if match else 100
+    quality = 5 + _digest(prompt) % 5
+    return json.dumps({
+        "score": round(max_score * quality / 10, 1),
+        "feedback": "Solid understanding with room for more depth.",
+        "strengths": ["Clear structure"],
+        "areas_of_improvement": ["Add more supporting examples"],
+        "quality_scores": {
+            "completeness": quality, "relevance": min(quality + 1, 10), "depth": max(quality - 1, 0),
+            "originality": quality, "structure": quality
+        },
+        "critical_thinking": {
+            "score": quality,
+            "strengths": ["Good use of evidence"],
+            "weaknesses": ["Limited counterarguments"],
+            "examples": "The second paragraph links the claim to evidence."
+        },
+        "personalized_feedback": "Strengths: clear structure. Areas to Improve: depth. Specific Actions: add an example per claim. Encouragement: keep going!",
+        "improvement_suggestions": [
+            "Support each main claim with a concrete example from the readings.",
+            "Address at least one counterargument before concluding."
+        ]
+    })
+
+def _key_points(prompt: str) -> str:
+    return json.dumps([
+        {"timestamp_estimate": f"{m:02d}:00", "point": f"Key point {i}", "importance": "medium"}
+        for i, m in enumerate((0, 3, 7, 12), 1)
+    ])
+
+def _generic(prompt: str) -> str:
+    first_line = next((line.strip() for line in prompt.splitlines() if line.strip()), "the request")
+    return (
+        f"Simulated response to: {first_line[:120]}\n\n"
+        "1. Overview of the main idea.\n"
+        "2. Supporting details and an example.\n"
+        "3. Suggested next steps."
+    )
+
+# Checked in order; the first matching marker decides the prompt family
+PROMPT_FAMILIES: List[Tuple[str, str, Callable[[str], str]]] = [
+    ("grading_fused", "evaluate every aspect of this submission", _grading_fused),
+    ("grading_rubric", "grade the following assignment submission", _grading),
+    ("grading_question", "grade one question of an assignment submission", _grading_question),
+    ("test", "generate a test", _test),
+    ("assignment_structure", "create an assignment on topic", _assignment_structure),
+    ("assignment", "generate an assignment", _assignment),
+    ("rubric", "create a grading rubric", _rubric),
+    ("flashcard_set", "create flashcards for topic", _flashcard_set),
+    ("flashcards", "generate flashcards", _flashcards),
+    ("study_plan", "create a study plan", _study_plan),
+    ("course_structure", "generate a course structure", _course_structure),
+    ("module_content", "generate content for module", _module_content),
+    ("course_material", "course material generator", _course_material),
+    ("key_points", "extract key points", _key_points)
+]
+
+def fake_completion(prompt: str) -> Tuple[str, str]:
+    """Return (family, canned completion) for a rendered prompt."""
+    lowered = prompt.lower()
+    for family, marker, build in PROMPT_FAMILIES:
+        if marker in lowered:
+            return family, build(prompt)
+    return "generic", _generic(prompt)
+
+class _SimulatedFailure(Exception):
+    def __init__(self, family: str, after: float):
+        super().__init__(f"Fake provider simulated failure ({family})")
+        self.after = after
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline backend for load tests and profiling.
+
+    Answers every prompt family with schema-valid canned output. Time to
+    first token follows a log-normal distribution around ``latency_ms``,
+    output is produced at ``tokens_per_second`` and calls fail with
+    probability ``failure_rate``; all randomness comes from ``seed``.
+    """
+
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.3
+    tokens_per_second: float = 250.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    chunk_tokens: int = 8
+
+    _rng: random.Random = PrivateAttr()
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _plan(self, messages: List[BaseMessage]) -> Tuple[str, float, float]:
+        """Pick the completion, time to first token and per-token delay."""
+        family, text = fake_completion(_prompt_text(messages))
+        with self._lock:
+            failed = self._rng.random() < self.failure_rate
+            jitter = self._rng.gauss(0, self.latency_sigma) if self.latency_sigma > 0 else 0.0
+        first_token = self.latency_ms / 1000 * math.exp(jitter)
+        if failed:
+            raise _SimulatedFailure(family, first_token)
+        per_token = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return text, first_token, per_token
+
+    def _chunks(self, text: str) -> List[str]:
+        words = re.findall(r"\S+\s*", text)
+        size = max(1, self.chunk_tokens)
+        return ["".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        try:
+            text, first_token, per_token = self._plan(messages)
+        except _SimulatedFailure as failure:
+            time.sleep(failure.after)
+            raise RuntimeError(str(failure))
+        time.sleep(first_token + count_tokens(text) * per_token)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        try:
+            text, first_token, per_token = self._plan(messages)
+        except _SimulatedFailure as failure:
+            await asyncio.sleep(failure.after)
+            raise RuntimeError(str(failure))
+        await asyncio.sleep(first_token + count_tokens(text) * per_token)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        try:
+            text, first_token, per_token = self._plan(messages)
+        except _SimulatedFailure as failure:
+            time.sleep(failure.after)
+            raise RuntimeError(str(failure))
+        time.sleep(first_token)
+        for chunk in self._chunks(text):
+            time.sleep(count_tokens(chunk) * per_token)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        try:
+            text, first_token, per_token = self._plan(messages)
+        except _SimulatedFailure as failure:
+            await asyncio.sleep(failure.after)
+            raise RuntimeError(str(failure))
+        await asyncio.sleep(first_token)
+        for chunk in self._chunks(text):
+            await asyncio.sleep(count_tokens(chunk) * per_token)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
@@ -0,0 +1,145 @@
+from typing import Any, List, Optional, AsyncIterator, Iterator
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from app.core.config import settings
+import asyncio
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LocalChatModel(BaseChatModel):
+    """Offline stand-in provider.
+
+    Answers with a fixed response (or an echo of the last message) after a
+    configurable latency and can fail at random, so routing, hedging and
+    failover can be exercised without network access.
+    """
+
+    response: Optional[str] = None
+    latency: float = 0.0
+    error_rate: float = 0.0
+    chunk_size: int = 16
+
+    @property
+    def _llm_type(self) -> str:
+        return "local"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        if random.random() < self.error_rate:
+            raise RuntimeError("Local provider simulated failure")
+        if self.response is not None:
+            return self.response
+        return str(messages[-1].content) if messages else ""
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        text = self._reply(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        text = self._reply(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        text = self._reply(messages)
+        for i in range(0, len(text), self.chunk_size):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + self.chunk_size]))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        text = self._reply(messages)
+        for i in range(0, len(text), self.chunk_size):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[i:i + self.chunk_size]))
+
+def provider_model(provider: str) -> str:
+    """Default model id for a provider when routing across several."""
+    return {
+        "groq": settings.LLM_MODEL,
+        "openai": settings.OPENAI_MODEL,
+        "huggingface": settings.HUGGINGFACE_MODEL,
+        "local": "local",
+        "fake": "fake"
+    }.get(provider, settings.LLM_MODEL)
+
+def build_chat_model(provider: str, model: str, temperature: float) -> BaseChatModel:
+    """Initialize a chat model client for one provider.
+
+    OpenAI and Hugging Face support is optional and needs
+    ``langchain-openai`` / ``langchain-huggingface`` installed.
+    """
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        if not settings.GROQ_API_KEY:
+            raise ValueError("GROQ_API_KEY not configured")
+        return ChatGroq(
+            api_key=settings.GROQ_API_KEY,
+            model=model,
+            temperature=temperature
+        )
+    elif provider == "openai":
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY not configured")
+        try:
+            from langchain_openai import ChatOpenAI
+        except ImportError:
+            raise ValueError("langchain-openai is not installed")
+        return ChatOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            model=model,
+            temperature=temperature
+        )
+    elif provider == "huggingface":
+        if not settings.HUGGINGFACE_API_KEY:
+            raise ValueError("HUGGINGFACE_API_KEY not configured")
+        try:
+            from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+        except ImportError:
+            raise ValueError("langchain-huggingface is not installed")
+        endpoint = HuggingFaceEndpoint(
+            repo_id=model,
+            huggingfacehub_api_token=settings.HUGGINGFACE_API_KEY,
+            temperature=max(temperature, 0.01)  # the endpoint rejects 0
+        )
+        return ChatHuggingFace(llm=endpoint)
+    elif provider == "local":
+        return LocalChatModel(latency=settings.LLM_LOCAL_LATENCY_MS / 1000)
+    elif provider == "fake":
+        from app.services.llm_fake import FakeChatModel
+        return FakeChatModel(
+            latency_ms=settings.LLM_FAKE_LATENCY_MS,
+            latency_sigma=settings.LLM_FAKE_LATENCY_SIGMA,
+            tokens_per_second=settings.LLM_FAKE_TOKENS_PER_SECOND,
+            failure_rate=settings.LLM_FAKE_FAILURE_RATE,
+            seed=settings.LLM_FAKE_SEED
+        )
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
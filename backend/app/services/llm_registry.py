@@ -0,0 +1,90 @@
+from typing import Dict, Any, Optional, Tuple
+from app.core.config import settings
+from app.services.llm_providers import build_chat_model, provider_model
+from app.services.llm_router import RoutedChatModel
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LLMProviderRegistry:
+    """Process-wide registry of chat model clients.
+
+    Clients are built lazily on first use and shared per
+    (provider, model, temperature) so every service reuses the same
+    HTTP connection pool.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str, float], Any] = {}
+        self._lock = threading.Lock()
+
+    def get_client(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None
+    ):
+        """Return the shared client for a provider/model/temperature."""
+        key = (
+            provider or settings.LLM_PROVIDER,
+            model or settings.LLM_MODEL,
+            settings.LLM_TEMPERATURE if temperature is None else temperature
+        )
+
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._build_client(*key)
+                    self._clients[key] = client
+                    logger.info(f"Initialized LLM client {key[0]}:{key[1]} (temperature={key[2]})")
+        return client
+
+    def clients(self) -> Dict[str, str]:
+        """Describe the clients built so far."""
+        return {
+            f"{provider}:{model}@{temperature}": type(client).__name__
+            for (provider, model, temperature), client in self._clients.items()
+        }
+
+    def routing_stats(self) -> Dict[str, Any]:
+        """Latency/error stats of every routed client built so far."""
+        return {
+            f"{model}@{temperature}": client.stats()
+            for (provider, model, temperature), client in list(self._clients.items())
+            if isinstance(client, RoutedChatModel)
+        }
+
+    def reset(self) -> None:
+        """Drop every cached client; the next call rebuilds them."""
+        with self._lock:
+            self._clients.clear()
+
+    def _build_client(self, provider: str, model: str, temperature: float):
+        """Initialize LLM based on configuration"""
+        if provider == "router":
+            return self._build_router(temperature)
+        return build_chat_model(provider, model, temperature)
+
+    def _build_router(self, temperature: float) -> RoutedChatModel:
+        """Route across every configured provider that can be initialized."""
+        backends = {}
+        for name in [p.strip() for p in settings.LLM_PROVIDERS.split(",") if p.strip()]:
+            try:
+                backends[name] = build_chat_model(name, provider_model(name), temperature)
+            except ValueError as e:
+                logger.warning(f"Skipping LLM provider {name}: {e}")
+
+        if not backends:
+            raise ValueError("No usable providers in LLM_PROVIDERS")
+
+        return RoutedChatModel(
+            backends=backends,
+            hedge_delay=settings.LLM_HEDGE_DELAY_MS / 1000,
+            max_error_rate=settings.LLM_ROUTER_MAX_ERROR_RATE,
+            window=settings.LLM_ROUTER_WINDOW
+        )
+
+llm_registry = LLMProviderRegistry()
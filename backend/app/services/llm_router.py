@@ -0,0 +1,264 @@
+from typing import Any, Dict, List, Optional, AsyncIterator, Iterator, Tuple
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_latency_critical: ContextVar[bool] = ContextVar("llm_latency_critical", default=False)
+
+@contextmanager
+def latency_critical(enabled: bool = True):
+    """Mark LLM calls made inside the block as eligible for hedging."""
+    token = _latency_critical.set(enabled)
+    try:
+        yield
+    finally:
+        _latency_critical.reset(token)
+
+class BackendStats:
+    """Rolling latency and error window for one backend."""
+
+    def __init__(self, window: int = 50):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.calls = 0
+        self.failures = 0
+        self.hedge_wins = 0
+        self.last_failure_at = 0.0
+
+    def record_success(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+        self.calls += 1
+
+    def record_failure(self) -> None:
+        self.outcomes.append(False)
+        self.calls += 1
+        self.failures += 1
+        self.last_failure_at = time.monotonic()
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "hedge_wins": self.hedge_wins,
+            "error_rate": round(self.error_rate, 4),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model that routes each call to the fastest healthy backend.
+
+    Backends are ranked by rolling p50 latency, with any backend whose
+    recent error rate exceeds ``max_error_rate`` moved to the back until
+    ``cooldown`` seconds pass without a new failure. Failed
+    calls fail over to the next backend. Calls made inside
+    ``latency_critical()`` also send a hedged duplicate to the runner-up
+    after ``hedge_delay`` seconds and keep whichever answers first.
+    """
+
+    backends: Dict[str, Any]
+    hedge_delay: float = 2.0
+    max_error_rate: float = 0.5
+    window: int = 50
+    cooldown: float = 30.0
+
+    _stats: Dict[str, BackendStats] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._stats = {name: BackendStats(self.window) for name in self.backends}
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    def ranked_backends(self) -> List[str]:
+        """Backends in the order they will be tried."""
+        order = list(self.backends)
+
+        def score(name: str) -> Tuple[bool, float, int]:
+            stats = self._stats[name]
+            unhealthy = (
+                stats.error_rate > self.max_error_rate
+                and time.monotonic() - stats.last_failure_at < self.cooldown
+            )
+            # Untried backends sort first so every backend gets measured
+            p50 = stats.percentile(0.5)
+            return (unhealthy, p50 if p50 is not None else 0.0, order.index(name))
+
+        return sorted(order, key=score)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-backend latency percentiles, error rates and routing order."""
+        return {
+            "order": self.ranked_backends(),
+            "hedge_delay_ms": int(self.hedge_delay * 1000),
+            "backends": {name: stats.snapshot() for name, stats in self._stats.items()}
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        last_error: Optional[Exception] = None
+        for name in self.ranked_backends():
+            started = time.monotonic()
+            try:
+                result = self.backends[name]._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                self._stats[name].record_failure()
+                logger.warning(f"LLM backend {name} failed, failing over: {e}")
+                last_error = e
+                continue
+            self._stats[name].record_success(time.monotonic() - started)
+            return result
+        raise last_error or RuntimeError("No LLM backends configured")
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        order = self.ranked_backends()
+        if _latency_critical.get() and len(order) > 1 and self.hedge_delay > 0:
+            return await self._hedged(order, messages, stop, **kwargs)
+        return await self._failover(order, messages, stop, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        last_error: Optional[Exception] = None
+        for name in self.ranked_backends():
+            started = time.monotonic()
+            emitted = False
+            try:
+                async for chunk in self.backends[name]._astream(messages, stop=stop, **kwargs):
+                    emitted = True
+                    yield chunk
+            except Exception as e:
+                self._stats[name].record_failure()
+                if emitted:
+                    # Part of the answer already reached the client
+                    raise
+                logger.warning(f"LLM backend {name} failed before streaming, failing over: {e}")
+                last_error = e
+                continue
+            self._stats[name].record_success(time.monotonic() - started)
+            return
+        raise last_error or RuntimeError("No LLM backends configured")
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        name = self.ranked_backends()[0]
+        yield from self.backends[name]._stream(messages, stop=stop, **kwargs)
+
+    async def _call(
+        self,
+        name: str,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]],
+        **kwargs: Any
+    ) -> ChatResult:
+        started = time.monotonic()
+        try:
+            result = await self.backends[name]._agenerate(messages, stop=stop, **kwargs)
+        except asyncio.CancelledError:
+            # A losing hedge is neither a success nor a failure
+            raise
+        except Exception:
+            self._stats[name].record_failure()
+            raise
+        self._stats[name].record_success(time.monotonic() - started)
+        return result
+
+    async def _failover(
+        self,
+        order: List[str],
+        messages: List[BaseMessage],
+        stop: Optional[List[str]],
+        last_error: Optional[Exception] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        for name in order:
+            try:
+                return await self._call(name, messages, stop, **kwargs)
+            except Exception as e:
+                logger.warning(f"LLM backend {name} failed, failing over: {e}")
+                last_error = e
+        raise last_error or RuntimeError("No LLM backends configured")
+
+    async def _hedged(
+        self,
+        order: List[str],
+        messages: List[BaseMessage],
+        stop: Optional[List[str]],
+        **kwargs: Any
+    ) -> ChatResult:
+        primary_name, hedge_name = order[0], order[1]
+        primary = asyncio.ensure_future(self._call(primary_name, messages, stop, **kwargs))
+        tasks = {primary: primary_name}
+        last_error: Optional[Exception] = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+            if done:
+                if primary.exception() is None:
+                    return primary.result()
+                logger.warning(f"LLM backend {primary_name} failed, failing over: {primary.exception()}")
+                return await self._failover(order[1:], messages, stop, primary.exception(), **kwargs)
+
+            logger.debug(f"LLM backend {primary_name} slower than {self.hedge_delay}s, hedging to {hedge_name}")
+            tasks[asyncio.ensure_future(self._call(hedge_name, messages, stop, **kwargs))] = hedge_name
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if tasks[task] == hedge_name:
+                            self._stats[hedge_name].hedge_wins += 1
+                        return task.result()
+                    logger.warning(f"LLM backend {tasks[task]} failed during hedge: {task.exception()}")
+                    last_error = task.exception()
+        finally:
+            # Also covers the caller being cancelled mid-wait
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        return await self._failover(order[2:], messages, stop, last_error, **kwargs)
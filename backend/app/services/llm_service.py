@@ -1,30 +1,65 @@
-from typing import List, Dict, Any, Optional
-from langchain_groq import ChatGroq
+from typing import List, Dict, Any, Optional, Awaitable, Callable, AsyncIterator
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.exceptions import OutputParserException
 from langchain_core.documents import Document
 from app.core.config import settings
+from app.services.llm_cache import llm_cache
+from app.services.llm_coalescer import llm_coalescer
+from app.services.llm_admission import llm_admission, Priority
+from app.services.llm_registry import llm_registry
+from app.services.llm_router import latency_critical
+from app.services.semantic_cache import semantic_cache
+from app.services.llm_telemetry import llm_telemetry, tracked
+from app.utils.token_budget import count_tokens, fit_text
+from app.utils.json_repair import RepairingJsonOutputParser
+from functools import lru_cache
+import json
+import re
 import logging
 
 logger = logging.getLogger(__name__)
 
 class LLMService:
-    def __init__(self):
-        self.llm = self._initialize_llm()
-        self.prompts = self._initialize_prompts()
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        llm: Optional[Any] = None
+    ):
+        self.provider = provider or settings.LLM_PROVIDER
+        self.model = model or settings.LLM_MODEL
+        self.temperature = settings.LLM_TEMPERATURE if temperature is None else temperature
+        self.cache = llm_cache
+        self.coalescer = llm_coalescer
+        self.admission = llm_admission
+        self.semantic_cache = semantic_cache
+        self._llm = llm
+        self._prompts = None
     
-    def _initialize_llm(self):
-        """Initialize LLM based on configuration"""
-        if settings.LLM_PROVIDER == "groq":
-            if not settings.GROQ_API_KEY:
-                raise ValueError("GROQ_API_KEY not configured")
-            return ChatGroq(
-                api_key=settings.GROQ_API_KEY,
-                model=settings.LLM_MODEL,
-                temperature=0.3
-            )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {settings.LLM_PROVIDER}")
+    @property
+    def llm(self):
+        """Chat model client, resolved lazily from the shared registry."""
+        if self._llm is None:
+            self._llm = llm_registry.get_client(self.provider, self.model, self.temperature)
+        return self._llm
+    
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+    
+    @property
+    def model_id(self) -> str:
+        """Provider-qualified model name used in cache keys."""
+        return f"{self.provider}:{self.model}"
+    
+    @property
+    def prompts(self) -> Dict[str, ChatPromptTemplate]:
+        """Prompt templates, built on first use."""
+        if self._prompts is None:
+            self._prompts = self._initialize_prompts()
+        return self._prompts
     
     def _initialize_prompts(self):
         """Initialize prompt templates"""
@@ -104,24 +139,353 @@ class LLMService:
                 3. Detailed feedback
                 4. Areas of improvement
                 5. Strengths"""
+            ),
+            "grading_question": ChatPromptTemplate.from_template(
+                """Grade one question of an assignment submission:
+                
+                Question {number}: {question}
+                Question Details: {details}
+                Rubric Criteria:
+                {criteria}
+                Student Answer: {answer}
+                
+                Grade only the answer to this question, out of {max_score} points,
+                applying the rubric criteria that bear on it.
+                Return JSON with keys: `score` (number), `feedback` (string),
+                `strengths` (array of strings), `areas_of_improvement` (array of strings)."""
             )
         }
     
+    async def _complete(
+        self,
+        template_id: str,
+        prompt: ChatPromptTemplate,
+        variables: Dict[str, Any],
+        parser: Optional[Any] = None,
+        use_cache: bool = True,
+        priority: Priority = Priority.STANDARD,
+        semantic: Optional[str] = None
+    ) -> Any:
+        """Invoke a prompt template through the response cache."""
+        chain = prompt | self.llm
+        return await self._run(
+            template_id,
+            variables,
+            lambda: chain.ainvoke(variables),
+            parser=parser,
+            use_cache=use_cache,
+            priority=priority,
+            semantic=semantic
+        )
+    
+    async def invoke_text(
+        self,
+        prompt: str,
+        template_id: str = "raw",
+        use_cache: bool = True,
+        priority: Priority = Priority.STANDARD,
+        parser: Optional[Any] = None
+    ) -> Any:
+        """Send a pre-rendered prompt to the LLM and return the completion text.
+
+        With a ``parser`` the parsed completion is returned instead, and
+        completions that fail to parse are never cached.
+        """
+        return await self._run(
+            template_id,
+            {"prompt": prompt},
+            lambda: self.llm.ainvoke(prompt),
+            parser=parser,
+            use_cache=use_cache,
+            priority=priority
+        )
+    
+    async def execute(
+        self,
+        template_id: str,
+        variables: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+        priority: Priority = Priority.STANDARD,
+        semantic: Optional[str] = None
+    ) -> Any:
+        """Run an arbitrary LLM-backed call with single-flight coalescing.
+
+        Used by the LangChain chains so identical concurrent requests share
+        one provider call and pass through admission control. Chains whose
+        ``semantic`` family has opted in reuse results for near-duplicate
+        topics.
+        """
+        with llm_telemetry.track(self._family(template_id)) as record:
+            record.attempts += 1
+            key = self.cache.make_key(template_id, variables, self.model_id, self.temperature)
+            semantic_scope = self._semantic_scope(semantic, template_id, variables, True)
+            if semantic_scope:
+                cached = self.semantic_cache.lookup(semantic, *semantic_scope)
+                if cached is not None:
+                    record.cache_outcome("semantic_hit")
+                    return cached
+
+            async def admitted_call() -> Any:
+                async with self.admission.admit(priority, self._estimate_tokens(variables)) as waited:
+                    record.queue_wait += waited
+                    with latency_critical(priority == Priority.INTERACTIVE):
+                        try:
+                            result = await call()
+                        except OutputParserException:
+                            record.parse_failures += 1
+                            raise
+                        finally:
+                            record.provider_calls += 1
+                self._record_usage(record, variables, result, result)
+                if semantic_scope:
+                    self.semantic_cache.store(semantic, *semantic_scope, result)
+                return result
+
+            calls_before = record.provider_calls
+            result = await self.coalescer.run(key, admitted_call)
+            record.cache_outcome("miss" if record.provider_calls > calls_before else "coalesced")
+            return result
+    
+    async def stream_text(
+        self,
+        prompt: str,
+        template_id: str = "raw",
+        use_cache: bool = True,
+        priority: Priority = Priority.STANDARD
+    ) -> AsyncIterator[str]:
+        """Stream the completion for a pre-rendered prompt as it is generated."""
+        async for chunk in self._stream(
+            template_id,
+            {"prompt": prompt},
+            lambda: self.llm.astream(prompt),
+            use_cache=use_cache,
+            priority=priority
+        ):
+            yield chunk
+    
+    async def _stream(
+        self,
+        template_id: str,
+        variables: Dict[str, Any],
+        stream: Callable[[], AsyncIterator[Any]],
+        use_cache: bool = True,
+        priority: Priority = Priority.STANDARD,
+        semantic: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield completion chunks, serving cached completions in one piece.
+
+        The admission slot is held until the stream is exhausted, and the
+        assembled text is cached once the provider finishes so the blocking
+        endpoints can reuse it.
+        """
+        caching = use_cache and settings.LLM_CACHE_ENABLED
+        key = self.cache.make_key(template_id, variables, self.model_id, self.temperature)
+        # Not ``track``: a context variable cannot be held across yields
+        record = llm_telemetry.begin(self._family(template_id))
+        record.attempts += 1
+        failed = False
+
+        try:
+            if caching:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    logger.debug(f"LLM cache hit for {template_id} (stream)")
+                    record.cache_outcome("hit")
+                    yield cached
+                    return
+            else:
+                self.cache.record_bypass()
+                record.cache_outcome("bypass")
+
+            semantic_scope = self._semantic_scope(semantic, template_id, variables, caching)
+            if semantic_scope:
+                cached = self.semantic_cache.lookup(semantic, *semantic_scope)
+                if cached is not None:
+                    record.cache_outcome("semantic_hit")
+                    yield cached
+                    return
+
+            record.cache_outcome("miss")
+            parts = []
+            async with self.admission.admit(priority, self._estimate_tokens(variables)) as waited:
+                record.queue_wait += waited
+                record.provider_calls += 1
+                async for chunk in stream():
+                    text = getattr(chunk, "content", chunk)
+                    if text:
+                        parts.append(text)
+                        yield text
+
+            self._record_usage(record, variables, None, "".join(parts))
+            if caching and parts:
+                await self.cache.set(key, "".join(parts))
+                if semantic_scope:
+                    self.semantic_cache.store(semantic, *semantic_scope, "".join(parts))
+        except Exception:
+            failed = True
+            raise
+        finally:
+            llm_telemetry.finish(record, failed)
+    
+    async def _run(
+        self,
+        template_id: str,
+        variables: Dict[str, Any],
+        call: Callable[[], Awaitable[Any]],
+        parser: Optional[Any] = None,
+        use_cache: bool = True,
+        priority: Priority = Priority.STANDARD,
+        semantic: Optional[str] = None
+    ) -> Any:
+        """Resolve a completion from the cache or a coalesced provider call.
+
+        Completions are cached as raw text keyed on the template id, the
+        rendered variables, the model and the temperature. When a parser is
+        given, only completions that parse successfully are stored. On an
+        exact miss, an opted-in ``semantic`` family falls back to the
+        near-duplicate topic cache.
+        """
+        with llm_telemetry.track(self._family(template_id)) as record:
+            record.attempts += 1
+            caching = use_cache and settings.LLM_CACHE_ENABLED
+            key = self.cache.make_key(template_id, variables, self.model_id, self.temperature)
+
+            if caching:
+                cached = await self.cache.get(key)
+                if cached is not None:
+                    logger.debug(f"LLM cache hit for {template_id}")
+                    record.cache_outcome("hit")
+                    return self._parse(record, parser, cached)
+            else:
+                self.cache.record_bypass()
+                record.cache_outcome("bypass")
+
+            semantic_scope = self._semantic_scope(semantic, template_id, variables, caching)
+            if semantic_scope:
+                cached = self.semantic_cache.lookup(semantic, *semantic_scope)
+                if cached is not None:
+                    record.cache_outcome("semantic_hit")
+                    return self._parse(record, parser, cached)
+
+            async def fetch() -> str:
+                async with self.admission.admit(priority, self._estimate_tokens(variables)) as waited:
+                    record.queue_wait += waited
+                    # Interactive calls may be hedged across providers by the router
+                    with latency_critical(priority == Priority.INTERACTIVE):
+                        try:
+                            response = await call()
+                        finally:
+                            record.provider_calls += 1
+                text = getattr(response, "content", response)
+                self._record_usage(record, variables, response, text)
+                if caching:
+                    if parser:
+                        self._parse(record, parser, text)
+                    await self.cache.set(key, text)
+                    if semantic_scope:
+                        self.semantic_cache.store(semantic, *semantic_scope, text)
+                return text
+
+            calls_before = record.provider_calls
+            text = await self.coalescer.run(key, fetch)
+            record.cache_outcome("miss" if record.provider_calls > calls_before else "coalesced")
+            return self._parse(record, parser, text)
+    
+    @staticmethod
+    def _family(template_id: str) -> str:
+        """Prompt family for telemetry; variants such as ``test_generator:mcq`` share one."""
+        return template_id.split(":", 1)[0]
+    
+    @staticmethod
+    def _parse(record: Any, parser: Optional[Any], text: str) -> Any:
+        if parser is None:
+            return text
+        try:
+            return parser.parse(text)
+        except OutputParserException:
+            record.parse_failures += 1
+            raise
+    
+    @staticmethod
+    def _record_usage(record: Any, variables: Dict[str, Any], response: Any, output: Any) -> None:
+        """Add provider-reported token usage, or a local count when it is missing."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            record.input_tokens += usage.get("input_tokens", 0)
+            record.output_tokens += usage.get("output_tokens", 0)
+            return
+        record.input_tokens += count_tokens(json.dumps(variables, default=str))
+        record.output_tokens += count_tokens(output if isinstance(output, str) else str(output))
+    
+    def _semantic_scope(
+        self,
+        family: Optional[str],
+        template_id: str,
+        variables: Dict[str, Any],
+        caching: bool
+    ) -> Optional[tuple]:
+        """Scope key and topic for the semantic cache, or None when it does not apply."""
+        if not caching or not self.semantic_cache.enabled_for(family) or "topic" not in variables:
+            return None
+        return self.semantic_cache.make_scope(template_id, variables, self.model_id, self.temperature)
+    
+    def _estimate_tokens(self, variables: Dict[str, Any]) -> int:
+        """Rough prompt size used to pace the tokens-per-minute bucket."""
+        return len(json.dumps(variables, default=str)) // 4
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Return response cache and coalescing counters."""
+        return {**self.cache.stats(), "coalescing": self.coalescer.stats()}
+    
+    def admission_stats(self) -> Dict[str, Any]:
+        """Return admission queue depth and wait time metrics."""
+        return self.admission.stats()
+    
     async def generate_course_material(self, topic: str, **kwargs) -> Dict[str, Any]:
         """Generate course material from topic"""
-        prompt = self.prompts["course_material"]
-        chain = prompt | self.llm
-        response = await chain.ainvoke({
+        use_cache = kwargs.pop("use_cache", True)
+        content = await self._complete(
+            "course_material",
+            self.prompts["course_material"],
+            self._course_material_variables(topic, kwargs),
+            use_cache=use_cache,
+            priority=Priority.BULK,
+            semantic="course_material"
+        )
+        return {"content": content, "metadata": kwargs}
+    
+    async def stream_course_material(self, topic: str, **kwargs) -> AsyncIterator[str]:
+        """Stream course material for a topic chunk by chunk"""
+        use_cache = kwargs.pop("use_cache", True)
+        variables = self._course_material_variables(topic, kwargs)
+        chain = self.prompts["course_material"] | self.llm
+        async for chunk in self._stream(
+            "course_material",
+            variables,
+            lambda: chain.astream(variables),
+            use_cache=use_cache,
+            priority=Priority.INTERACTIVE,
+            semantic="course_material"
+        ):
+            yield chunk
+    
+    def _course_material_variables(self, topic: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "topic": topic,
-            "level": kwargs.get("level", "undergraduate"),
-            "audience": kwargs.get("audience", "college students"),
-            "instructions": kwargs.get("instructions", "")
-        })
-        return {"content": response.content, "metadata": kwargs}
+            "level": options.get("level", "undergraduate"),
+            "audience": options.get("audience", "college students"),
+            "instructions": options.get("instructions", "")
+        }
     
+    @tracked("assignment_generator")
     async def generate_assignment(self, topic: str, **kwargs) -> Dict[str, Any]:
-        """Generate assignment questions"""
-        parser = JsonOutputParser()
+        """Generate assignment questions.
+
+        The first completion is repaired locally; a stricter prompt is only
+        sent when no usable JSON can be recovered from it.
+        """
+        use_cache = kwargs.pop("use_cache", True)
+        parser = RepairingJsonOutputParser(required_key="questions")
 
         try:
             format_instructions = parser.get_format_instructions()
@@ -143,7 +507,6 @@ class LLMService:
 
         prompt_text = base_prompt + "\n" + format_instructions
         prompt = ChatPromptTemplate.from_template(prompt_text)
-        chain = prompt | self.llm | parser
 
         invoke_kwargs = {
             "topic": topic,
@@ -154,40 +517,53 @@ class LLMService:
         }
 
         try:
-            result = await chain.ainvoke(invoke_kwargs)
-            return result
-        except Exception as e:
-            logger.warning(f"Assignment generation parser failed, retrying with stricter JSON-only instructions: {e}")
-
-            # Retry with an explicit JSON-only instruction
-            strict_instructions = (
-                "YOU MUST RETURN A SINGLE, VALID JSON OBJECT AND NOTHING ELSE. "
-                "The JSON must contain: `title` (string), `description` (string), `instructions` (string), "
-                "and `questions` (an array). Each question must be an object with `question` (string) and may include "
-                "`type`, `options` (array), `points` (number) and `rubric` (string). Do not include any markdown, explanation, or extra text."
+            return await self._complete(
+                "assignment_generator", prompt, invoke_kwargs, parser=parser,
+                use_cache=use_cache, priority=Priority.BULK
             )
+        except OutputParserException as e:
+            logger.warning(f"Assignment output unusable after repair, retrying with stricter JSON-only instructions: {e}")
+        except Exception as e:
+            logger.error(f"Assignment generation failed: {e}")
+            return {"questions": [], "instructions": ""}
 
-            prompt_text2 = base_prompt + "\n" + strict_instructions
-            prompt2 = ChatPromptTemplate.from_template(prompt_text2)
-            chain2 = prompt2 | self.llm | parser
+        # Retry with an explicit JSON-only instruction
+        strict_instructions = (
+            "YOU MUST RETURN A SINGLE, VALID JSON OBJECT AND NOTHING ELSE. "
+            "The JSON must contain: `title` (string), `description` (string), `instructions` (string), "
+            "and `questions` (an array). Each question must be an object with `question` (string) and may include "
+            "`type`, `options` (array), `points` (number) and `rubric` (string). Do not include any markdown, explanation, or extra text."
+        )
 
-            try:
-                result = await chain2.ainvoke(invoke_kwargs)
-                return result
-            except Exception as e2:
-                logger.error(f"Assignment generation failed after retry: {e2}")
-                # Final fallback: return raw text from the LLM so frontend can still show something
-                try:
-                    response = await self.llm.ainvoke(f"Generate assignment questions about {topic}")
-                    return {"questions": response.content, "instructions": "Answer all questions"}
-                except Exception as final_e:
-                    logger.error(f"Final fallback generation failed: {final_e}")
-                    # Return an empty structure rather than raise so callers can handle gracefully
-                    return {"questions": [], "instructions": ""}
+        prompt_text2 = base_prompt + "\n" + strict_instructions
+        prompt2 = ChatPromptTemplate.from_template(prompt_text2)
+
+        try:
+            return await self._complete(
+                "assignment_generator_strict", prompt2, invoke_kwargs, parser=parser,
+                use_cache=use_cache, priority=Priority.BULK
+            )
+        except OutputParserException as e2:
+            logger.error(f"Assignment generation failed after retry: {e2}")
+            # Return the raw text so the frontend can still show something
+            return {"questions": e2.llm_output or "", "instructions": "Answer all questions"}
+        except Exception as e2:
+            logger.error(f"Assignment generation failed after retry: {e2}")
+            # Return an empty structure rather than raise so callers can handle gracefully
+            return {"questions": [], "instructions": ""}
     
+    @tracked("test_generator")
     async def generate_test(self, topic: str, test_type: str, **kwargs) -> Dict[str, Any]:
-        """Generate test questions and answers"""
-        parser = JsonOutputParser()
+        """Generate test questions and answers.
+
+        An optional ``context`` (course material or syllabus notes) is
+        trimmed to its token budget and the questions are grounded in it.
+        The first completion is repaired locally (fences, unbalanced braces,
+        trailing commas, ``test``/``data``/``result`` wrappers); a stricter
+        prompt is only sent when no questions can be recovered from it.
+        """
+        use_cache = kwargs.pop("use_cache", True)
+        parser = RepairingJsonOutputParser(required_key="questions")
 
         try:
             format_instructions = parser.get_format_instructions()
@@ -203,6 +579,12 @@ class LLMService:
             "Number of Questions: {num_questions}\n"
             "Difficulty: {difficulty}\n\n"
         )
+        context = (kwargs.get("context") or "").strip()
+        if context:
+            base_prompt += (
+                "Course Context:\n{context}\n\n"
+                "Base the questions on this course context and stay within what it covers.\n\n"
+            )
 
         tt = (test_type or "").lower()
         if "text" in tt:
@@ -224,7 +606,6 @@ class LLMService:
 
         prompt_text = base_prompt + "\n" + type_instructions + "\n" + format_instructions
         prompt = ChatPromptTemplate.from_template(prompt_text)
-        chain = prompt | self.llm | parser
 
         invoke_kwargs = {
             "topic": topic,
@@ -232,153 +613,173 @@ class LLMService:
             "num_questions": kwargs.get("num_questions", 10),
             "difficulty": kwargs.get("difficulty", "medium")
         }
+        if context:
+            invoke_kwargs["context"] = fit_text("test_generator_context", context)
 
         try:
-            result = await chain.ainvoke(invoke_kwargs)
-
-            # Normalize possible wrapper shapes so we can reliably find `questions`.
-            if isinstance(result, dict):
-                if "questions" not in result:
-                    if "test" in result and isinstance(result["test"], dict):
-                        test_obj = result.pop("test")
-                        # move questions/answers/estimated_duration up if present
-                        if "questions" in test_obj:
-                            result["questions"] = test_obj.pop("questions")
-                        if "answers" in test_obj and "answers" not in result:
-                            result["answers"] = test_obj.pop("answers")
-                        if "estimated_duration" in test_obj and "estimated_duration" not in result:
-                            result["estimated_duration"] = test_obj.pop("estimated_duration")
-                        # if there are other useful keys, merge them
-                        for k, v in test_obj.items():
-                            if k not in result:
-                                result[k] = v
-
-                for wrapper in ("data", "result"):
-                    if wrapper in result and isinstance(result[wrapper], dict):
-                        inner = result.pop(wrapper)
-                        if "questions" in inner and "questions" not in result:
-                            result["questions"] = inner.get("questions")
-                        if "answers" in inner and "answers" not in result:
-                            result["answers"] = inner.get("answers")
-
-            # Enforce/coerce question format to requested test_type as a safety net.
-            try:
-                req_tt = (test_type or "").lower()
-                if isinstance(result, dict) and "questions" in result and isinstance(result["questions"], list):
-                    for q in result["questions"]:
-                        if not isinstance(q, dict):
-                            continue
-
-                        if "text" in req_tt:
-                            if "options" in q:
-                                correct = q.pop("correct_answer", None)
-                                opts = q.pop("options", None)
-                                if correct is None and isinstance(opts, list) and len(opts) > 0:
-                                    correct = opts[0]
-                                if correct is not None:
-                                    q["expected_answer"] = correct
-                            q["type"] = "text_based"
-                        # Ensure multiple choice has required fields
-                        elif "multi" in req_tt or "choice" in req_tt:
-                            if "options" not in q and "correct_answer" in q:
-                                q["options"] = [q.get("correct_answer")]
-                            q["type"] = "multiple_choice"
-            except Exception:
-                logger.exception("Failed during post-processing/coercion of questions based on test_type")
-
-            try:
-                qs = result.get("questions") if isinstance(result, dict) else None
-            except Exception:
-                qs = None
-
-            if qs is None or (isinstance(qs, list) and len(qs) == 0):
-                logger.warning("LLM returned empty 'questions' array after normalization; retrying with strict instructions")
-                raise Exception("Empty questions from LLM")
-
-            return result
-        except Exception as e:
-            try:
-                raw_prompt_filled = base_prompt.format(**invoke_kwargs) + "\n" + format_instructions
-                raw_resp = await self.llm.ainvoke(raw_prompt_filled)
-                raw_text = getattr(raw_resp, "content", raw_resp)
-                logger.info(f"Raw LLM response (initial attempt): {raw_text}")
-            except Exception:
-                logger.exception("Failed to retrieve raw LLM response for initial attempt")
-
-            logger.warning(f"Test generation parser failed or empty result, retrying with strict JSON-only instructions: {e}")
-
-            strict_instructions = (
-                "YOU MUST RETURN A SINGLE, VALID JSON OBJECT AND NOTHING ELSE. "
-                "Do NOT include any preamble, introduction, or explanatory text — ONLY the JSON. "
-                "The JSON must contain: `questions` (an array). Each question must be an object with `question` (string) and may include `type`, `options` (array), `points` (number), and `rubric` (string). Do not include markdown or extra text."
+            result = await self._complete(
+                f"test_generator:{tt}", prompt, invoke_kwargs, parser=parser,
+                use_cache=use_cache, priority=Priority.BULK
             )
+            return self._coerce_test_questions(result, tt)
+        except OutputParserException as e:
+            logger.warning(f"Test output unusable after repair, retrying with strict JSON-only instructions: {e}")
+            logger.debug(f"Raw LLM response (initial attempt): {e.llm_output}")
+        except Exception as e:
+            logger.error(f"Test generation failed: {e}")
+            return {"questions": [], "answers": {}, "estimated_duration": 0}
 
-            prompt_text2 = base_prompt + "\n" + strict_instructions
-            prompt2 = ChatPromptTemplate.from_template(prompt_text2)
-            chain2 = prompt2 | self.llm | parser
+        strict_instructions = (
+            "YOU MUST RETURN A SINGLE, VALID JSON OBJECT AND NOTHING ELSE. "
+            "Do NOT include any preamble, introduction, or explanatory text — ONLY the JSON. "
+            "The JSON must contain: `questions` (an array). Each question must be an object with `question` (string) and may include `type`, `options` (array), `points` (number), and `rubric` (string). Do not include markdown or extra text."
+        )
 
-            try:
-                result = await chain2.ainvoke(invoke_kwargs)
-                return result
-            except Exception as e2:
-                # Capture raw response for strict retry too
-                try:
-                    raw_prompt_filled2 = base_prompt.format(**invoke_kwargs) + "\n" + strict_instructions
-                    raw_resp2 = await self.llm.ainvoke(raw_prompt_filled2)
-                    raw_text2 = getattr(raw_resp2, "content", raw_resp2)
-                    logger.info(f"Raw LLM response (strict retry): {raw_text2}")
-                except Exception:
-                    logger.exception("Failed to retrieve raw LLM response for strict retry")
-
-                logger.warning(f"Strict JSON retry failed, falling back to plain text parsing: {e2}")
-                # Final fallback: ask the LLM for plain text and heuristically parse numbered questions
-                try:
-                    raw_prompt = f"Generate {invoke_kwargs['num_questions']} {test_type} questions about {topic}. Return a simple numbered list of questions with optional expected answer points and a short rubric after each question. Do not include any introductory line."
-                    response = await self.llm.ainvoke(raw_prompt)
-                    text = getattr(response, "content", response)
-                    import re
-
-                    parts = re.split(r"\n\s*(?=\d+[\.\)])", str(text))
-                    questions = []
-                    for p in parts:
-                        p = p.strip()
-                        if not p:
-                            continue
-                        qtext = re.sub(r"^\d+[\.)]\s*", "", p).strip()
-                        questions.append({"question": qtext})
-
-                    return {
-                        "questions": questions,
-                        "answers": {},
-                        "estimated_duration": invoke_kwargs.get("num_questions", 10) * 2,
-                    }
-                except Exception as final_e:
-                    logger.error(f"Final fallback generation failed: {final_e}")
-                    return {"questions": [], "answers": {}, "estimated_duration": 0}
+        prompt_text2 = base_prompt + "\n" + strict_instructions
+        prompt2 = ChatPromptTemplate.from_template(prompt_text2)
+
+        try:
+            result = await self._complete(
+                "test_generator_strict", prompt2, invoke_kwargs, parser=parser,
+                use_cache=use_cache, priority=Priority.BULK
+            )
+            return self._coerce_test_questions(result, tt)
+        except OutputParserException as e2:
+            logger.warning(f"Strict JSON retry unusable, parsing numbered questions from the raw text: {e2}")
+            logger.debug(f"Raw LLM response (strict retry): {e2.llm_output}")
+            questions = self._parse_numbered_questions(e2.llm_output or "")
+            return {
+                "questions": questions,
+                "answers": {},
+                "estimated_duration": invoke_kwargs.get("num_questions", 10) * 2 if questions else 0,
+            }
+        except Exception as e2:
+            logger.error(f"Test generation failed after retry: {e2}")
+            return {"questions": [], "answers": {}, "estimated_duration": 0}
+    
+    def _coerce_test_questions(self, result: Dict[str, Any], test_type: str) -> Dict[str, Any]:
+        """Enforce the requested question format as a safety net."""
+        try:
+            for q in result.get("questions") or []:
+                if not isinstance(q, dict):
+                    continue
+
+                if "text" in test_type:
+                    if "options" in q:
+                        correct = q.pop("correct_answer", None)
+                        opts = q.pop("options", None)
+                        if correct is None and isinstance(opts, list) and len(opts) > 0:
+                            correct = opts[0]
+                        if correct is not None:
+                            q["expected_answer"] = correct
+                    q["type"] = "text_based"
+                # Ensure multiple choice has required fields
+                elif "multi" in test_type or "choice" in test_type:
+                    if "options" not in q and "correct_answer" in q:
+                        q["options"] = [q.get("correct_answer")]
+                    q["type"] = "multiple_choice"
+        except Exception:
+            logger.exception("Failed during post-processing/coercion of questions based on test_type")
+        return result
+    
+    def _parse_numbered_questions(self, text: str) -> List[Dict[str, Any]]:
+        """Heuristically split a numbered plain-text list into questions."""
+        parts = re.split(r"\n\s*(?=\d+[\.\)])", str(text))
+        questions = []
+        for p in parts:
+            p = p.strip()
+            if not p or not re.match(r"^\d+[\.)]", p):
+                continue
+            qtext = re.sub(r"^\d+[\.)]\s*", "", p).strip()
+            questions.append({"question": qtext})
+        return questions
     
-    async def generate_flashcards(self, topic: str, num_flashcards: int = 10) -> List[Dict[str, str]]:
+    async def generate_flashcards(
+        self,
+        topic: str,
+        num_flashcards: int = 10,
+        use_cache: bool = True
+    ) -> List[Dict[str, str]]:
         """Generate flashcards for self-study"""
-        prompt = self.prompts["flashcard_generator"]
-        parser = JsonOutputParser()
-        chain = prompt | self.llm | parser
-        
-        result = await chain.ainvoke({
-            "topic": topic,
-            "num_flashcards": num_flashcards,
-            "level": "beginner"
-        })
+        result = await self._complete(
+            "flashcard_generator",
+            self.prompts["flashcard_generator"],
+            {
+                "topic": topic,
+                "num_flashcards": num_flashcards,
+                "level": "beginner"
+            },
+            parser=JsonOutputParser(),
+            use_cache=use_cache,
+            priority=Priority.INTERACTIVE,
+            semantic="flashcards"
+        )
         return result.get("flashcards", [])
     
-    async def grade_assignment(self, assignment: Dict, submission: str, rubric: Dict) -> Dict[str, Any]:
-        """Grade assignment using AI"""
-        prompt = self.prompts["grading_rubric"]
-        parser = JsonOutputParser()
-        chain = prompt | self.llm | parser
-        
-        result = await chain.ainvoke({
-            "assignment": assignment,
-            "submission": submission,
-            "rubric": rubric,
-            "max_score": assignment.get("max_score", 100)
-        })
-        return result
\ No newline at end of file
+    async def grade_assignment(
+        self,
+        assignment: Dict,
+        submission: str,
+        rubric: Dict,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> Dict[str, Any]:
+        """Grade assignment using AI.
+
+        Pass ``use_cache=False`` to force a fresh grade from the provider.
+        """
+        result = await self._complete(
+            "grading_rubric",
+            self.prompts["grading_rubric"],
+            {
+                "assignment": assignment,
+                "submission": submission,
+                "rubric": rubric,
+                # GradingService passes the question list; the rubric carries the max score
+                "max_score": assignment.get("max_score", 100) if isinstance(assignment, dict) else rubric.get("max_score", 100)
+            },
+            parser=JsonOutputParser(),
+            use_cache=use_cache,
+            priority=priority
+        )
+        return result
+    
+    async def grade_question(
+        self,
+        number: int,
+        question: Dict[str, Any],
+        answer: str,
+        max_score: float,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        criteria: str = "",
+        rubric_version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Grade the answer to a single assignment question.
+
+        ``criteria`` is the assignment rubric rendered as text. The
+        ``rubric_version`` is not part of the prompt; it keys the response
+        cache so a new rubric version is never served older grades.
+        """
+        details = {k: v for k, v in question.items() if k not in ("question", "points")}
+        return await self._complete(
+            "grading_question",
+            self.prompts["grading_question"],
+            {
+                "number": number,
+                "question": question.get("question", ""),
+                "details": details,
+                "answer": answer,
+                "max_score": round(max_score, 2),
+                "criteria": criteria or "None given",
+                "rubric_version": rubric_version
+            },
+            parser=JsonOutputParser(),
+            use_cache=use_cache,
+            priority=priority
+        )
+
+@lru_cache(maxsize=None)
+def get_llm_service() -> LLMService:
+    """Shared LLMService instance; usable as a FastAPI dependency."""
+    return LLMService()
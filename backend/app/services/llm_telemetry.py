@@ -0,0 +1,257 @@
+from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import bisect
+import functools
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_endpoint: ContextVar[str] = ContextVar("llm_endpoint", default="background")
+_current: ContextVar[Optional["CallRecord"]] = ContextVar("llm_call_record", default=None)
+
+# UUIDs and numeric ids collapse to a placeholder so endpoints stay low-cardinality
+_ID_SEGMENT = re.compile(r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)(?=/|$)")
+
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CACHE_OUTCOMES = ("hit", "semantic_hit", "miss", "coalesced", "bypass")
+
+def endpoint_label(method: str, path: str) -> str:
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+def current_endpoint() -> str:
+    return _endpoint.get()
+
+@dataclass
+class CallRecord:
+    """Telemetry for one logical LLM operation, including its retries."""
+    family: str
+    endpoint: str
+    started: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    provider_calls: int = 0
+    queue_wait: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    parse_failures: int = 0
+    cache: Optional[str] = None
+
+    def cache_outcome(self, outcome: str) -> None:
+        # The first attempt decides whether the operation was served from cache
+        if self.cache is None:
+            self.cache = outcome
+
+class _Series:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.duration_sum = 0.0
+        self.duration_buckets = [0] * len(DURATION_BUCKETS)
+        self.queue_wait_sum = 0.0
+        self.provider_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.retries = 0
+        self.parse_failures = 0
+        self.cache = {outcome: 0 for outcome in CACHE_OUTCOMES}
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.count,
+            "errors": self.errors,
+            "avg_wall_seconds": round(self.duration_sum / self.count, 4) if self.count else 0.0,
+            "p95_wall_seconds": self._quantile(0.95),
+            "avg_queue_wait_seconds": round(self.queue_wait_sum / self.count, 4) if self.count else 0.0,
+            "provider_calls": self.provider_calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "retries": self.retries,
+            "parse_failures": self.parse_failures,
+            "cache": dict(self.cache)
+        }
+
+    def _quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding the q-th call."""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, cumulative in zip(DURATION_BUCKETS, self.duration_buckets):
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+class LLMTelemetry:
+    """Per prompt family and endpoint metrics for LLM operations.
+
+    Every LLMService call opens a CallRecord; nested calls (strict-prompt
+    retries, repair fallbacks) join the record of the operation that started
+    them, so a retried generation is counted once with ``retries`` set.
+    """
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def endpoint(self, label: str):
+        """Tag LLM calls made inside the block with an endpoint label."""
+        token = _endpoint.set(label)
+        try:
+            yield
+        finally:
+            _endpoint.reset(token)
+
+    @contextmanager
+    def track(self, family: str):
+        """Record an operation, or join the one already in progress."""
+        record = _current.get()
+        if record is not None:
+            yield record
+            return
+
+        record = self.begin(family)
+        token = _current.set(record)
+        failed = False
+        try:
+            yield record
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            _current.reset(token)
+            self.finish(record, failed)
+
+    def begin(self, family: str) -> CallRecord:
+        """Start a record outside of ``track``, e.g. for a streamed response."""
+        return _current.get() or CallRecord(family=family, endpoint=_endpoint.get())
+
+    def finish(self, record: CallRecord, failed: bool = False) -> None:
+        """Aggregate a finished record into its series."""
+        if record is _current.get():
+            return  # joined a running operation; its owner finishes it
+
+        elapsed = time.monotonic() - record.started
+        with self._lock:
+            series = self._series.setdefault((record.family, record.endpoint), _Series())
+            series.count += 1
+            series.errors += int(failed)
+            series.duration_sum += elapsed
+            for i in range(bisect.bisect_left(DURATION_BUCKETS, elapsed), len(DURATION_BUCKETS)):
+                series.duration_buckets[i] += 1
+            series.queue_wait_sum += record.queue_wait
+            series.provider_calls += record.provider_calls
+            series.input_tokens += record.input_tokens
+            series.output_tokens += record.output_tokens
+            series.retries += max(record.attempts - 1, 0)
+            series.parse_failures += record.parse_failures
+            series.cache[record.cache or "miss"] += 1
+
+        if record.attempts > 1 or record.parse_failures:
+            logger.info(
+                f"LLM {record.family} ({record.endpoint}) took {elapsed:.2f}s "
+                f"with {record.attempts - 1} retries and {record.parse_failures} parse failures"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Nested family -> endpoint snapshot for the admin endpoint."""
+        with self._lock:
+            families: Dict[str, Dict[str, Any]] = {}
+            for (family, endpoint), series in sorted(self._series.items()):
+                families.setdefault(family, {})[endpoint] = series.snapshot()
+            return families
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._series.items())
+            lines: List[str] = []
+
+            def metric(name: str, kind: str, help_text: str) -> None:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            metric("llm_requests_total", "counter", "LLM operations by prompt family, endpoint and cache outcome.")
+            for (family, endpoint), series in items:
+                for outcome, count in series.cache.items():
+                    lines.append(f"llm_requests_total{{{_labels(family, endpoint, cache=outcome)}}} {count}")
+
+            metric("llm_request_errors_total", "counter", "LLM operations that raised.")
+            for (family, endpoint), series in items:
+                lines.append(f"llm_request_errors_total{{{_labels(family, endpoint)}}} {series.errors}")
+
+            metric("llm_request_duration_seconds", "histogram", "Wall time of LLM operations, including retries.")
+            for (family, endpoint), series in items:
+                labels = _labels(family, endpoint)
+                for bound, cumulative in zip(DURATION_BUCKETS, series.duration_buckets):
+                    lines.append(f"llm_request_duration_seconds_bucket{{{labels},le=\"{bound}\"}} {cumulative}")
+                lines.append(f"llm_request_duration_seconds_bucket{{{labels},le=\"+Inf\"}} {series.count}")
+                lines.append(f"llm_request_duration_seconds_sum{{{labels}}} {series.duration_sum:.6f}")
+                lines.append(f"llm_request_duration_seconds_count{{{labels}}} {series.count}")
+
+            metric("llm_queue_wait_seconds_total", "counter", "Time spent waiting for LLM admission.")
+            for (family, endpoint), series in items:
+                lines.append(f"llm_queue_wait_seconds_total{{{_labels(family, endpoint)}}} {series.queue_wait_sum:.6f}")
+
+            metric("llm_provider_calls_total", "counter", "Calls that reached an LLM provider.")
+            for (family, endpoint), series in items:
+                lines.append(f"llm_provider_calls_total{{{_labels(family, endpoint)}}} {series.provider_calls}")
+
+            metric("llm_tokens_total", "counter", "Prompt and completion tokens sent to providers.")
+            for (family, endpoint), series in items:
+                lines.append(f"llm_tokens_total{{{_labels(family, endpoint, direction='input')}}} {series.input_tokens}")
+                lines.append(f"llm_tokens_total{{{_labels(family, endpoint, direction='output')}}} {series.output_tokens}")
+
+            metric("llm_retries_total", "counter", "Extra attempts made after an unusable completion.")
+            for (family, endpoint), series in items:
+                lines.append(f"llm_retries_total{{{_labels(family, endpoint)}}} {series.retries}")
+
+            metric("llm_parse_failures_total", "counter", "Completions the output parser rejected.")
+            for (family, endpoint), series in items:
+                lines.append(f"llm_parse_failures_total{{{_labels(family, endpoint)}}} {series.parse_failures}")
+
+        return "\n".join(lines) + "\n"
+
+def _labels(family: str, endpoint: str, **extra: str) -> str:
+    pairs = {"family": family, "endpoint": endpoint, **extra}
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in pairs.items())
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class TelemetryMiddleware:
+    """ASGI middleware tagging LLM calls with the request's method and path.
+
+    Implemented as plain ASGI so the tag also covers streaming response
+    bodies, which run after the route handler returns.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with llm_telemetry.endpoint(endpoint_label(scope["method"], scope["path"])):
+            await self.app(scope, receive, send)
+
+llm_telemetry = LLMTelemetry()
+
+def tracked(family: str):
+    """Decorator recording an async method as one operation of ``family``."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with llm_telemetry.track(family):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
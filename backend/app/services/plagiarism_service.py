@@ -0,0 +1,244 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from collections import defaultdict
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.assessment import AssignmentSubmission
+from functools import lru_cache
+import hashlib
+import re
+import threading
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WORD_PATTERN = re.compile(r"\w+")
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """Hashed word n-grams of normalized text; short texts become one shingle."""
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if not words:
+        return set()
+    if len(words) < size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest(), "little")
+        for gram in grams
+    }
+
+class MinHasher:
+    """Fixed family of hash permutations producing MinHash signatures."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingle_hashes: Iterable[int]) -> np.ndarray:
+        values = np.fromiter(shingle_hashes, dtype=np.uint64)
+        if values.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        # (a * x + b) mod p over every shingle and permutation at once
+        permuted = (np.outer(values, self.a) + self.b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+def estimate_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    return float(np.mean(first == second))
+
+class AssignmentIndex:
+    """LSH index over the MinHash signatures of one assignment's submissions.
+
+    Signatures are split into ``bands`` bands; submissions sharing any band
+    bucket become candidates, so a lookup only touches colliding entries
+    instead of the whole cohort.
+    """
+
+    def __init__(self, hasher: MinHasher, bands: int):
+        self.hasher = hasher
+        self.bands = bands
+        self.rows = hasher.num_perm // bands
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.buckets: List[Dict[bytes, Set[str]]] = [defaultdict(set) for _ in range(bands)]
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: str, text: str) -> np.ndarray:
+        if key in self.signatures:
+            self.remove(key)
+        signature = self.hasher.signature(shingles(text, settings.PLAGIARISM_SHINGLE_SIZE))
+        self.signatures[key] = signature
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self.buckets[band][band_key].add(key)
+        return signature
+
+    def remove(self, key: str) -> None:
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in enumerate(self._band_keys(signature)):
+            bucket = self.buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band][band_key]
+
+    def candidates(self, signature: np.ndarray, exclude: Optional[str] = None) -> Set[str]:
+        found: Set[str] = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            found.update(self.buckets[band].get(band_key, ()))
+        found.discard(exclude)
+        return found
+
+    def query(self, key: str, threshold: float) -> List[Tuple[str, float]]:
+        """Near-duplicates of an indexed submission, most similar first."""
+        signature = self.signatures.get(key)
+        if signature is None:
+            return []
+        matches = []
+        for other in self.candidates(signature, exclude=key):
+            similarity = estimate_jaccard(signature, self.signatures[other])
+            if similarity >= threshold:
+                matches.append((other, similarity))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+    def pairs(self, threshold: float) -> List[Tuple[str, str, float]]:
+        """Every candidate pair above the threshold, from shared band buckets only."""
+        seen: Set[Tuple[str, str]] = set()
+        pairs = []
+        for band in self.buckets:
+            for bucket in band.values():
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket)
+                for i, first in enumerate(members):
+                    for second in members[i + 1:]:
+                        if (first, second) in seen:
+                            continue
+                        seen.add((first, second))
+                        similarity = estimate_jaccard(self.signatures[first], self.signatures[second])
+                        if similarity >= threshold:
+                            pairs.append((first, second, similarity))
+        return sorted(pairs, key=lambda p: p[2], reverse=True)
+
+class PlagiarismService:
+    """Near-duplicate detection across the submissions of each assignment.
+
+    Indexes live in memory and are filled incrementally as submissions are
+    stored. Every lookup first syncs the index with the database, so
+    submissions indexed by another worker process (or before a restart)
+    are picked up by loading only the missing rows.
+    """
+
+    def __init__(
+        self,
+        num_perm: Optional[int] = None,
+        bands: Optional[int] = None,
+        threshold: Optional[float] = None
+    ):
+        self.hasher = MinHasher(num_perm or settings.PLAGIARISM_NUM_PERM)
+        self.bands = bands or settings.PLAGIARISM_LSH_BANDS
+        self.threshold = settings.PLAGIARISM_THRESHOLD if threshold is None else threshold
+        self._indexes: Dict[str, AssignmentIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, assignment_id: UUID) -> AssignmentIndex:
+        with self._lock:
+            index = self._indexes.get(str(assignment_id))
+            if index is None:
+                index = self._indexes[str(assignment_id)] = AssignmentIndex(self.hasher, self.bands)
+            return index
+
+    def index_submission(self, assignment_id: UUID, submission_id: UUID, content: Optional[str]) -> None:
+        """Add or replace one submission in its assignment's index."""
+        if not content:
+            return
+        index = self._index(assignment_id)
+        with self._lock:
+            index.add(str(submission_id), content)
+
+    def sync(self, db: Session, assignment_id: UUID) -> AssignmentIndex:
+        """Index any stored submissions the in-memory index has not seen."""
+        index = self._index(assignment_id)
+        stored = {
+            str(row.id) for row in db.query(AssignmentSubmission.id).filter(
+                AssignmentSubmission.assignment_id == assignment_id,
+                AssignmentSubmission.content.isnot(None)
+            ).all()
+        }
+        missing = [UUID(sid) for sid in stored - set(index.signatures)]
+        if missing:
+            rows = db.query(AssignmentSubmission.id, AssignmentSubmission.content).filter(
+                AssignmentSubmission.id.in_(missing)
+            ).all()
+            with self._lock:
+                for row in rows:
+                    if row.content:
+                        index.add(str(row.id), row.content)
+            logger.debug(f"Indexed {len(rows)} submissions for assignment {assignment_id}")
+        with self._lock:
+            for stale in set(index.signatures) - stored:
+                index.remove(stale)
+        return index
+
+    def similar_submissions(
+        self,
+        db: Session,
+        assignment_id: UUID,
+        submission_id: UUID,
+        threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Near-duplicates of one submission with estimated Jaccard similarity."""
+        index = self.sync(db, assignment_id)
+        with self._lock:
+            matches = index.query(str(submission_id), self.threshold if threshold is None else threshold)
+        return [
+            {"submission_id": UUID(other), "estimated_jaccard": round(similarity, 3)}
+            for other, similarity in matches
+        ]
+
+    def assignment_report(
+        self,
+        db: Session,
+        assignment_id: UUID,
+        threshold: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """All candidate near-duplicate pairs for an assignment."""
+        threshold = self.threshold if threshold is None else threshold
+        index = self.sync(db, assignment_id)
+        with self._lock:
+            pairs = index.pairs(threshold)
+            indexed = len(index.signatures)
+
+        flagged = {sid for first, second, _ in pairs for sid in (first, second)}
+        return {
+            "assignment_id": assignment_id,
+            "threshold": threshold,
+            "submissions_indexed": indexed,
+            "flagged_submissions": len(flagged),
+            "pairs": [
+                {
+                    "submission_a": UUID(first),
+                    "submission_b": UUID(second),
+                    "estimated_jaccard": round(similarity, 3)
+                }
+                for first, second, similarity in pairs
+            ]
+        }
+
+    def text_overlap(self, text: str, sources: List[str]) -> List[float]:
+        """Estimated Jaccard similarity between a text and each source text."""
+        size = settings.PLAGIARISM_SHINGLE_SIZE
+        signature = self.hasher.signature(shingles(text, size))
+        return [estimate_jaccard(signature, self.hasher.signature(shingles(source, size))) for source in sources]
+
+@lru_cache(maxsize=None)
+def get_plagiarism_service() -> PlagiarismService:
+    """Shared PlagiarismService instance; usable as a FastAPI dependency."""
+    return PlagiarismService()
@@ -0,0 +1,134 @@
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.assessment import Assignment, AssignmentRubric
+from app.services.grading_service import GradingService, get_grading_service
+from app.ai.chains.assignment_chain import RubricChain
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def questions_hash(assignment: Assignment) -> str:
+    """Hash of what a rubric is built from: the questions and max_score."""
+    payload = json.dumps({"questions": assignment.questions, "max_score": assignment.max_score}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class RubricService:
+    """Versioned rubrics stored per assignment.
+
+    A rubric is built once per version of an assignment's questions and
+    reused by every grading call. Editing the questions or max_score makes
+    the next lookup store a new version; lecturers can also generate a new
+    version with the LLM. The stored rubric carries its version and a
+    fingerprint that grading uses in its cache keys.
+    """
+
+    def __init__(self, grading_service: Optional[GradingService] = None, session_factory=SessionLocal):
+        self._grading_service = grading_service
+        self.session_factory = session_factory
+
+    @property
+    def grading_service(self) -> GradingService:
+        if self._grading_service is None:
+            self._grading_service = get_grading_service()
+        return self._grading_service
+
+    def latest(self, db: Session, assignment_id: UUID) -> Optional[AssignmentRubric]:
+        return db.query(AssignmentRubric).filter(
+            AssignmentRubric.assignment_id == assignment_id
+        ).order_by(AssignmentRubric.version.desc()).first()
+
+    def versions(self, db: Session, assignment_id: UUID) -> List[AssignmentRubric]:
+        return db.query(AssignmentRubric).filter(
+            AssignmentRubric.assignment_id == assignment_id
+        ).order_by(AssignmentRubric.version).all()
+
+    async def current(self, db: Session, assignment: Assignment) -> AssignmentRubric:
+        """The rubric for the assignment as it is now, stored on first use.
+
+        Assignments with a question list get per-question criteria without
+        an LLM call; free-form assignments have criteria generated once.
+        """
+        digest = questions_hash(assignment)
+        rubric = self.latest(db, assignment.id)
+        if rubric is not None and rubric.questions_hash == digest:
+            return rubric
+
+        if isinstance(assignment.questions, list) and assignment.questions:
+            return self._store(db, assignment, digest, self.grading_service._create_grading_rubric(assignment), "default")
+        return await self.generate(db, assignment)
+
+    async def resolve(self, assignment: Any) -> Dict[str, Any]:
+        """The rubric to grade ``assignment`` with, for callers without a session.
+
+        Stored assignments (anything with an ``id``) get their current
+        stored version; unsaved ones, which cannot have a stored rubric,
+        get the default criteria without a fingerprint.
+        """
+        if getattr(assignment, "id", None) is not None:
+            db = self.session_factory()
+            try:
+                stored = db.query(Assignment).filter(Assignment.id == assignment.id).first()
+                if stored is not None:
+                    return (await self.current(db, stored)).rubric
+            finally:
+                db.close()
+        return self.grading_service._create_grading_rubric(assignment)
+
+    async def generate(self, db: Session, assignment: Assignment, created_by: Optional[UUID] = None, num_criteria: int = 4) -> AssignmentRubric:
+        """Store a new rubric version with LLM-generated criteria."""
+        content = self.grading_service._create_grading_rubric(assignment)
+        generated = await RubricChain().generate_rubric(
+            assignment.title,
+            assignment.description or json.dumps(assignment.questions, default=str)[:2000],
+            num_criteria
+        )
+        source = "default"
+        if "rubric" in generated:
+            content["criteria"] = [
+                {**criterion, "max_score": round(criterion["weight"] / 100 * (assignment.max_score or 100), 2)}
+                for criterion in generated["rubric"]["criteria"]
+            ]
+            source = "generated"
+        else:
+            logger.warning(f"Rubric generation failed for assignment {assignment.id}, using default criteria: {generated.get('error')}")
+        return self._store(db, assignment, questions_hash(assignment), content, source, created_by)
+
+    def _store(
+        self,
+        db: Session,
+        assignment: Assignment,
+        digest: str,
+        content: Dict[str, Any],
+        source: str,
+        created_by: Optional[UUID] = None
+    ) -> AssignmentRubric:
+        version = (db.query(func.max(AssignmentRubric.version)).filter(
+            AssignmentRubric.assignment_id == assignment.id
+        ).scalar() or 0) + 1
+        fingerprint = hashlib.sha256(f"{assignment.id}:{version}:{digest}".encode("utf-8")).hexdigest()
+        rubric = AssignmentRubric(
+            assignment_id=assignment.id,
+            version=version,
+            source=source,
+            questions_hash=digest,
+            rubric={**json.loads(json.dumps(content, default=str)), "version": version, "fingerprint": fingerprint},
+            created_by=created_by
+        )
+        db.add(rubric)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another worker stored this version first; use theirs
+            db.rollback()
+            return self.latest(db, assignment.id)
+        db.refresh(rubric)
+        logger.info(f"Stored rubric v{version} ({source}) for assignment {assignment.id}")
+        return rubric
+
+rubric_service = RubricService()
@@ -0,0 +1,228 @@
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from app.core.config import settings
+import numpy as np
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Words keep trailing "+"/"#" and a leading dot, so c, c++, c# and .net stay distinct
+_WORD_PATTERN = re.compile(r"(?:(?<![a-z0-9])\.)?[a-z0-9]+[+#]*")
+
+_STOPWORDS = frozenset({
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "about",
+    "into", "from", "by", "at", "as", "is", "are", "be", "its", "it", "this", "that",
+    "how", "what", "why", "do", "does", "my", "your", "our", "some", "all"
+})
+
+# Words that pad a topic without changing what gets generated
+_FILLER = frozenset({
+    "intro", "introduction", "introductory", "basic", "basics", "fundamental",
+    "fundamentals", "overview", "primer", "essentials", "essential", "guide",
+    "beginner", "beginners", "101", "understanding", "learn", "learning",
+    "lesson", "lessons", "topic", "notes", "crash", "course", "quick", "simple"
+})
+
+def normalize(text: str) -> List[str]:
+    """Lowercase, tokenize and drop stopwords/filler; light plural folding.
+
+    Words stay in their original order, which ``embed`` uses for bigrams.
+    """
+    words = _WORD_PATTERN.findall((text or "").lower())
+    kept = [w for w in words if w not in _STOPWORDS and w not in _FILLER]
+    if not kept:
+        # A topic made only of filler still has to be told apart from others
+        kept = words
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in kept]
+
+def _hashed(features: List[str], dim: int) -> np.ndarray:
+    vec = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[digest % dim] += 1.0 if (digest >> 63) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+def embed(text: str, dim: int = 1024) -> np.ndarray:
+    """Unit-length hashing-vectorizer embedding of normalized text.
+
+    Word features carry most of the weight; bigrams of adjacent words tell
+    "java to python" from "python to java", and character trigrams inside
+    each word add tolerance for inflections and small spelling differences.
+    """
+    words = normalize(text)
+    grams = []
+    for word in words:
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    bigrams = [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    vec = (
+        0.6 * _hashed([f"w:{w}" for w in set(words)], dim)
+        + 0.25 * _hashed(bigrams, dim)
+        + 0.15 * _hashed([f"c:{g}" for g in set(grams)], dim)
+    )
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+class _ScopeIndex:
+    """Embeddings and values for requests that differ only in their topic."""
+
+    def __init__(self, dim: int):
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.entries: List[Tuple[str, Any, float]] = []  # (text, value, stored_at)
+
+class SemanticCache:
+    """Near-duplicate cache for generation requests.
+
+    Requests are grouped into scopes by everything except their free-text
+    topic (template, model, temperature, level, counts, ...), so only the
+    topic is compared. Within a scope the nearest cached topic by cosine
+    similarity is served when it clears ``threshold``. Each generation
+    family has to opt in through ``families``.
+    """
+
+    def __init__(
+        self,
+        families: str = "",
+        threshold: float = 0.92,
+        max_entries: int = 256,
+        ttl_seconds: int = 86400,
+        dim: int = 1024
+    ):
+        self.families = {f.strip() for f in families.split(",") if f.strip()}
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.dim = dim
+        self._scopes: "OrderedDict[str, _ScopeIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def enabled_for(self, family: Optional[str]) -> bool:
+        return bool(family) and family in self.families and self.threshold <= 1.0
+
+    @staticmethod
+    def make_scope(
+        template_id: str,
+        variables: Dict[str, Any],
+        model: str,
+        temperature: float,
+        text_field: str = "topic"
+    ) -> Tuple[str, str]:
+        """Split variables into a scope key and the text compared semantically."""
+        payload = json.dumps(
+            {
+                "template": template_id,
+                "variables": {k: v for k, v in variables.items() if k != text_field},
+                "model": model,
+                "temperature": temperature
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest(), str(variables.get(text_field, ""))
+
+    def lookup(self, family: str, scope: str, text: str) -> Optional[Any]:
+        """Return a copy of the closest cached value above the threshold."""
+        query = embed(text, self.dim)
+        now = time.time()
+        with self._lock:
+            stats = self._family_stats(family)
+            index = self._scopes.get(scope)
+            if index is not None:
+                self._expire(index, now)
+            if index is None or not index.entries:
+                stats["misses"] += 1
+                return None
+
+            similarities = index.vectors @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                stats["misses"] += 1
+                return None
+
+            matched_text, value, _ = index.entries[best]
+            stats["hits"] += 1
+            stats["similarity_total"] += similarity
+            self._scopes.move_to_end(scope)
+
+        logger.debug(f"Semantic cache hit for {family}: {text!r} ~ {matched_text!r} ({similarity:.3f})")
+        return copy.deepcopy(value)
+
+    def store(self, family: str, scope: str, text: str, value: Any) -> None:
+        """Add a generated value to the scope's index."""
+        vector = embed(text, self.dim)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None:
+                index = self._scopes[scope] = _ScopeIndex(self.dim)
+            self._scopes.move_to_end(scope)
+
+            # Replace an exact re-generation rather than growing the index
+            if index.entries:
+                similarities = index.vectors @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= 0.9999:
+                    index.entries[best] = (text, copy.deepcopy(value), time.time())
+                    self._family_stats(family)["stores"] += 1
+                    return
+
+            index.vectors = np.vstack([index.vectors, vector[None, :]])
+            index.entries.append((text, copy.deepcopy(value), time.time()))
+            if len(index.entries) > self.max_entries:
+                index.vectors = index.vectors[1:]
+                index.entries.pop(0)
+            self._family_stats(family)["stores"] += 1
+
+            # Bound the number of scopes as well as their size
+            while len(self._scopes) > self.max_entries:
+                self._scopes.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._scopes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per family."""
+        with self._lock:
+            families = {}
+            for family, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                families[family] = {
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "stores": stats["stores"],
+                    "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+                    "mean_hit_similarity": round(stats["similarity_total"] / stats["hits"], 4) if stats["hits"] else None
+                }
+            return {
+                "enabled_families": sorted(self.families),
+                "threshold": self.threshold,
+                "scopes": len(self._scopes),
+                "entries": sum(len(index.entries) for index in self._scopes.values()),
+                "families": families
+            }
+
+    def _family_stats(self, family: str) -> Dict[str, Any]:
+        return self._stats.setdefault(family, {"hits": 0, "misses": 0, "stores": 0, "similarity_total": 0.0})
+
+    def _expire(self, index: _ScopeIndex, now: float) -> None:
+        keep = [i for i, (_, _, stored_at) in enumerate(index.entries) if now - stored_at <= self.ttl_seconds]
+        if len(keep) != len(index.entries):
+            index.vectors = index.vectors[keep]
+            index.entries = [index.entries[i] for i in keep]
+
+semantic_cache = SemanticCache(
+    families=settings.LLM_SEMANTIC_CACHE_FAMILIES if settings.LLM_CACHE_ENABLED else "",
+    threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD,
+    max_entries=settings.LLM_SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+)
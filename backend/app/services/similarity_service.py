@@ -0,0 +1,84 @@
+from typing import Any, Dict, List, Optional, Sequence
+from collections import Counter
+from dataclasses import dataclass
+import re
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall((text or "").lower())
+
+def tfidf_matrix(documents: Sequence[str], vocabulary: Optional[Dict[str, int]] = None) -> np.ndarray:
+    """L2-normalized TF-IDF rows (sublinear tf, smoothed idf) for the documents.
+
+    Pass ``vocabulary`` to project documents onto an existing term space.
+    """
+    counts = [Counter(tokenize(doc)) for doc in documents]
+    if vocabulary is None:
+        vocabulary = {term: i for i, term in enumerate(sorted(set().union(*counts)))} if counts else {}
+
+    matrix = np.zeros((len(documents), len(vocabulary)), dtype=np.float32)
+    for row, doc_counts in enumerate(counts):
+        for term, count in doc_counts.items():
+            col = vocabulary.get(term)
+            if col is not None:
+                matrix[row, col] = count
+    if not vocabulary:
+        return matrix
+
+    np.log1p(matrix, out=matrix)
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+@dataclass
+class CohortSimilarity:
+    """Cosine similarities between every submission and every exemplar."""
+    submission_ids: List[Any]
+    matrix: np.ndarray  # submissions x exemplars
+
+    @property
+    def best_match(self) -> np.ndarray:
+        return self.matrix.argmax(axis=1)
+
+    @property
+    def best_similarity(self) -> np.ndarray:
+        return self.matrix.max(axis=1)
+
+    def most_divergent(self, top_k: int) -> List[int]:
+        """Row indices of the submissions furthest from every exemplar."""
+        if top_k <= 0 or not len(self.submission_ids):
+            return []
+        return [int(i) for i in np.argsort(self.best_similarity, kind="stable")[:top_k]]
+
+    def summary(self, index: int) -> Dict[str, Any]:
+        similarities = self.matrix[index]
+        ranking = np.argsort(-similarities, kind="stable")
+        return {
+            "submission_id": self.submission_ids[index],
+            "exemplar_similarities": [
+                {"exemplar_id": int(e) + 1, "similarity_score": round(float(similarities[e]), 3)}
+                for e in ranking
+            ],
+            "best_exemplar_id": int(ranking[0]) + 1,
+            "average_similarity": round(float(similarities.mean()), 3)
+        }
+
+def cohort_similarity(submissions: Dict[Any, str], exemplars: Sequence[str]) -> CohortSimilarity:
+    """Score a whole cohort against the exemplars in one matrix product.
+
+    Submissions and exemplars share one TF-IDF space so idf reflects the
+    assignment's own vocabulary.
+    """
+    ids = list(submissions)
+    texts = [submissions[sid] for sid in ids] + list(exemplars)
+    vectors = tfidf_matrix(texts)
+    matrix = vectors[:len(ids)] @ vectors[len(ids):].T
+    return CohortSimilarity(submission_ids=ids, matrix=np.clip(matrix, 0.0, 1.0))
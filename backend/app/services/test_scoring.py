@@ -0,0 +1,363 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from app.core.config import settings
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models.assessment import Test, TestAttempt
+from app.services.answer_matcher import HEDGES, NEGATIONS, answer_matcher, normalize_answer, parse_number, parse_numbers
+from app.services.calibration_service import score_distribution
+import hashlib
+import json
+import re
+import threading
+import time
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+_NUMERIC = re.compile(r"^\s*(-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+(?:[.,]\d+)?)\s*$")
+_OPTION_LABEL = re.compile(r"^\s*([a-z])\s*[.):]\s*", re.IGNORECASE)
+
+@dataclass(frozen=True)
+class KeyEntry:
+    """How one question is scored.
+
+    ``mode`` is ``exact`` (any of ``accepted``), ``multi_select`` (the set of
+    ``accepted`` choices, with partial credit), ``numeric`` (``value`` within
+    ``tolerance``) or ``text`` (scored by the local answer matcher).
+    """
+    question_id: str
+    mode: str
+    points: float
+    accepted: frozenset = frozenset()
+    aliases: Dict[str, str] = field(default_factory=dict)  # option text or letter to option letter
+    value: Optional[float] = None
+    tolerance: float = 0.0
+    question: Optional[Dict[str, Any]] = None
+
+@dataclass
+class AnswerKey:
+    test_id: str
+    version: str
+    entries: Dict[str, KeyEntry] = field(default_factory=dict)
+    total_points: float = 0.0
+
+@dataclass
+class ScoreResult:
+    score: float  # percentage of total points
+    earned: float
+    breakdown: Dict[str, Any]
+
+def answer_key_version(test: Test) -> str:
+    """Hash of everything the key is compiled from."""
+    payload = json.dumps({"questions": test.questions, "answers": test.answers}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def question_id(question: Dict[str, Any], index: int) -> str:
+    """A question's id, or its position for questions without one."""
+    return str(question.get("id", index))
+
+def _choices(answer: Any) -> List[str]:
+    if isinstance(answer, (list, tuple, set)):
+        return [normalize_answer(a) for a in answer if normalize_answer(a)]
+    return [part for part in (normalize_answer(p) for p in str(answer or "").split(",")) if part]
+
+def option_aliases(options: List[Any]) -> Dict[str, str]:
+    """Map each option's letter, text and labelled text to its letter."""
+    aliases: Dict[str, str] = {}
+    for position, option in enumerate(options):
+        text = str(option)
+        label_match = _OPTION_LABEL.match(text)
+        label = (label_match.group(1) if label_match else chr(ord("a") + position % 26)).casefold()
+        for alias in (normalize_answer(_OPTION_LABEL.sub("", text, count=1)), normalize_answer(text), label):
+            aliases.setdefault(alias, label)
+    return aliases
+
+def compile_entry(question: Dict[str, Any], index: int, answers: Dict[str, Any]) -> KeyEntry:
+    qid = question_id(question, index)
+    try:
+        points = float(question.get("points", 1) or 0)
+    except (TypeError, ValueError):
+        points = 1.0
+    correct = question.get("correct_answer")
+    if correct is None:
+        correct = answers.get(qid, answers.get(str(index)))
+    options = question.get("options") if isinstance(question.get("options"), list) else []
+    aliases = option_aliases(options) if options else {}
+    qtype = str(question.get("type", "")).lower()
+
+    if isinstance(correct, (list, tuple, set)) or (correct is not None and qtype in ("multi_select", "multiple_select", "checkbox")):
+        accepted = frozenset(aliases.get(choice, choice) for choice in _choices(correct))
+        return KeyEntry(qid, "multi_select", points, accepted=accepted, aliases=aliases)
+
+    if correct is not None and not options and not isinstance(correct, bool) and (
+        isinstance(correct, (int, float)) or _NUMERIC.match(str(correct))
+    ):
+        value = float(correct) if isinstance(correct, (int, float)) else parse_number(str(correct).strip())
+        tolerance = question.get("tolerance")
+        allowed = float(tolerance) if tolerance is not None else abs(value) * settings.LOCAL_GRADING_NUMERIC_TOLERANCE
+        return KeyEntry(qid, "numeric", points, value=value, tolerance=allowed)
+
+    if correct is not None and (options or qtype == "multiple_choice" or len(normalize_answer(correct).split()) <= 3):
+        target = normalize_answer(correct)
+        return KeyEntry(qid, "exact", points, accepted=frozenset({aliases.get(target, target)}), aliases=aliases)
+
+    expected = question.get("expected_answer", correct)
+    return KeyEntry(qid, "text", points, question={**question, "expected_answer": expected} if expected is not None else question)
+
+def compile_answer_key(test: Test, version: Optional[str] = None) -> AnswerKey:
+    """Index a test's questions by id with their normalized answers and points."""
+    key = AnswerKey(test_id=str(test.id), version=version or answer_key_version(test))
+    answers = test.answers if isinstance(test.answers, dict) else {}
+    answers = {str(k): v for k, v in answers.items()}
+    for index, question in enumerate(test.questions or []):
+        if not isinstance(question, dict):
+            continue
+        entry = compile_entry(question, index, answers)
+        key.entries[entry.question_id] = entry
+        key.total_points += entry.points
+    return key
+
+def score_entry(entry: KeyEntry, answer: Any) -> Tuple[float, bool]:
+    """Fraction of the question's points earned, and whether it needs manual review."""
+    if answer is None or (isinstance(answer, str) and not answer.strip()):
+        return 0.0, False
+    if entry.mode == "exact":
+        given = normalize_answer(answer)
+        return (1.0 if entry.aliases.get(given, given) in entry.accepted else 0.0), False
+    if entry.mode == "numeric":
+        if isinstance(answer, (int, float)) and not isinstance(answer, bool):
+            values = [float(answer)]
+        else:
+            values = parse_numbers(str(answer))
+            # Several candidate numbers, or a negated or hedged one, is never taken as correct
+            if len(values) != 1 or (NEGATIONS | HEDGES) & set(normalize_answer(answer).split()):
+                return 0.0, True
+        return (1.0 if abs(values[0] - entry.value) <= entry.tolerance + 1e-9 else 0.0), False
+    if entry.mode == "multi_select":
+        if not entry.accepted:
+            return 0.0, False
+        picked = {entry.aliases.get(choice, choice) for choice in _choices(answer)}
+        right = len(picked & entry.accepted)
+        wrong = len(picked - entry.accepted)
+        # Wrong picks cancel right ones, so selecting everything earns nothing
+        return max(0.0, (right - wrong) / len(entry.accepted)), False
+    local = answer_matcher.score(entry.question or {}, str(answer))
+    if local is None or local.confidence < answer_matcher.min_confidence:
+        return 0.0, True
+    return local.fraction, False
+
+def _question_result(entry: KeyEntry, earned: float, answered: bool, needs_review: bool) -> Dict[str, Any]:
+    result = {"question_id": entry.question_id, "mode": entry.mode, "points": entry.points, "earned": earned, "answered": answered}
+    if needs_review:
+        result["needs_review"] = True
+    return result
+
+def _answer_token(answer: Any) -> Any:
+    """Hashable stand-in for an answer, equal for equal answers."""
+    if answer is None or isinstance(answer, (str, int, float, bool)):
+        return answer
+    return json.dumps(answer, sort_keys=True, default=str)
+
+def score_attempt(key: AnswerKey, answers: Iterable[Any]) -> ScoreResult:
+    """Score an attempt in one pass over its answers.
+
+    ``answers`` holds objects or dicts with ``question_id`` and ``answer``;
+    a repeated question id keeps its last answer.
+    """
+    given: Dict[str, Any] = {}
+    for item in answers:
+        qid = item.get("question_id") if isinstance(item, dict) else getattr(item, "question_id", None)
+        value = item.get("answer") if isinstance(item, dict) else getattr(item, "answer", None)
+        if qid is not None:
+            given[str(qid)] = value
+
+    earned = 0.0
+    questions = []
+    for qid, entry in key.entries.items():
+        answered = qid in given
+        fraction, needs_review = score_entry(entry, given.get(qid)) if answered else (0.0, False)
+        points = round(fraction * entry.points, 4)
+        earned += points
+        questions.append(_question_result(entry, points, answered, needs_review))
+
+    score = round(earned / key.total_points * 100, 2) if key.total_points > 0 else 0.0
+    return ScoreResult(
+        score=score,
+        earned=round(earned, 4),
+        breakdown={
+            "earned": round(earned, 4),
+            "total_points": key.total_points,
+            "key_version": key.version[:16],
+            "questions": questions
+        }
+    )
+
+def score_matrix(key: AnswerKey, attempts: List[Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Score many attempts' ``answers`` JSON at once.
+
+    Each question's answers are factorized into distinct values, every
+    distinct value is scored once, and the scores are gathered back as
+    an attempts x questions matrix of earned fractions. Returns the
+    fractions, an answered mask and a needs-review mask.
+    """
+    entries = list(key.entries.values())
+    columns = {entry.question_id: j for j, entry in enumerate(entries)}
+    codes = np.full((len(attempts), len(entries)), -1, dtype=np.int64)
+    distinct: List[Dict[Any, int]] = [{} for _ in entries]
+    values: List[List[Any]] = [[] for _ in entries]
+
+    for i, answers in enumerate(attempts):
+        for item in answers or []:
+            if not isinstance(item, dict):
+                continue
+            j = columns.get(str(item.get("question_id")))
+            if j is None:
+                continue
+            token = _answer_token(item.get("answer"))
+            code = distinct[j].get(token)
+            if code is None:
+                code = distinct[j][token] = len(values[j])
+                values[j].append(item.get("answer"))
+            codes[i, j] = code
+
+    fractions = np.zeros(codes.shape)
+    review = np.zeros(codes.shape, dtype=bool)
+    answered = codes >= 0
+    for j, entry in enumerate(entries):
+        if not values[j]:
+            continue
+        scored = [score_entry(entry, value) for value in values[j]]
+        column_fraction = np.array([fraction for fraction, _ in scored])
+        column_review = np.array([flag for _, flag in scored], dtype=bool)
+        rows = answered[:, j]
+        fractions[rows, j] = column_fraction[codes[rows, j]]
+        review[rows, j] = column_review[codes[rows, j]]
+    return fractions, answered, review
+
+def score_summary(scores: np.ndarray) -> Dict[str, Any]:
+    scores = scores[~np.isnan(scores)]
+    if scores.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(scores.size),
+        "mean": round(float(scores.mean()), 2),
+        "median": round(float(np.median(scores)), 2),
+        "std_dev": round(float(scores.std()), 2),
+        "min": round(float(scores.min()), 2),
+        "max": round(float(scores.max()), 2),
+        "bands": score_distribution(scores)
+    }
+
+def _earned_by_question(breakdown: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """Points earned per question id in a stored score breakdown."""
+    return {
+        str(question["question_id"]): float(question["earned"])
+        for question in (breakdown or {}).get("questions") or []
+        if isinstance(question, dict) and "question_id" in question and isinstance(question.get("earned"), (int, float))
+    }
+
+def rescore_attempts(db: Session, test: Test) -> Dict[str, Any]:
+    """Re-score every completed attempt of a test against its current answer key.
+
+    Attempts are loaded in one query, scored with ``score_matrix`` and
+    written back in one bulk UPDATE. Answers the local matcher cannot
+    decide keep the points they were given before, still flagged for
+    review. Returns the score distribution before and after.
+    """
+    started = time.monotonic()
+    key = answer_key_cache.get(test)
+    rows = db.query(TestAttempt.id, TestAttempt.answers, TestAttempt.score, TestAttempt.score_breakdown).filter(
+        TestAttempt.test_id == test.id,
+        TestAttempt.is_completed.is_(True)
+    ).all()
+
+    entries = list(key.entries.values())
+    points = np.array([entry.points for entry in entries], dtype=float)
+    fractions, answered, review = score_matrix(key, [row.answers for row in rows])
+    earned_matrix = np.round(fractions * points, 4)
+    previous: Dict[int, Dict[str, float]] = {}
+    for i, j in zip(*np.nonzero(review)):
+        if i not in previous:
+            previous[i] = _earned_by_question(rows[i].score_breakdown)
+        prior = previous[i].get(entries[j].question_id)
+        if prior is not None:
+            earned_matrix[i, j] = min(prior, points[j])
+    earned = earned_matrix.sum(axis=1)
+    after = np.round(earned / key.total_points * 100, 2) if key.total_points > 0 else np.zeros(len(rows))
+    before = np.array([row.score if row.score is not None else np.nan for row in rows], dtype=float)
+
+    updates = [
+        {
+            "id": row.id,
+            "score": float(after[i]),
+            "score_breakdown": {
+                "earned": round(float(earned[i]), 4),
+                "total_points": key.total_points,
+                "key_version": key.version[:16],
+                "questions": [
+                    _question_result(entry, float(earned_matrix[i, j]), bool(answered[i, j]), bool(review[i, j]))
+                    for j, entry in enumerate(entries)
+                ]
+            }
+        }
+        for i, row in enumerate(rows)
+    ]
+    if updates:
+        db.execute(update(TestAttempt), updates)
+        db.commit()
+
+    changed = int(np.sum(~np.isclose(np.nan_to_num(before, nan=-1.0), after)))
+    logger.info(f"Re-scored {len(rows)} attempts of test {test.id}; {changed} changed")
+    return {
+        "test_id": test.id,
+        "key_version": key.version[:16],
+        "attempts": len(rows),
+        "changed": changed,
+        "before": score_summary(before),
+        "after": score_summary(after),
+        "elapsed_seconds": round(time.monotonic() - started, 3)
+    }
+
+class AnswerKeyCache:
+    """Compiled answer keys by test id and key version, least recently used evicted."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._keys: "OrderedDict[Tuple[str, str], AnswerKey]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "compiles": 0}
+
+    def get(self, test: Test) -> AnswerKey:
+        version = answer_key_version(test)
+        cache_key = (str(test.id), version)
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                self._stats["hits"] += 1
+                return key
+
+        key = compile_answer_key(test, version)
+        with self._lock:
+            # Older versions of this test can never be requested again
+            for stale in [k for k in self._keys if k[0] == cache_key[0]]:
+                del self._keys[stale]
+            self._keys[cache_key] = key
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+            self._stats["compiles"] += 1
+        logger.debug(f"Compiled answer key {version[:12]} for test {test.id} ({len(key.entries)} questions)")
+        return key
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._keys)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+answer_key_cache = AnswerKeyCache(max_entries=settings.TEST_ANSWER_KEY_CACHE_ENTRIES)
@@ -1,10 +1,14 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
 import yt_dlp
 from moviepy import VideoFileClip
 import speech_recognition as sr
 import tempfile
 import os
-from app.services.llm_service import LLMService
+from functools import lru_cache
+from langchain_core.output_parsers import JsonOutputParser
+from app.services.llm_service import LLMService, get_llm_service
+from app.services.llm_admission import Priority
+from app.utils.token_budget import fit_text
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,8 +16,8 @@ logger = logging.getLogger(__name__)
 class VideoService:
     """Service for video processing and analysis"""
     
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: Optional[LLMService] = None):
+        self.llm_service = llm_service or get_llm_service()
         self.recognizer = sr.Recognizer()
     
     async def process_youtube_video(self, url: str) -> Dict[str, Any]:
@@ -106,20 +110,19 @@ class VideoService:
         prompt = f"""
         Summarize the following video transcript in {max_length} words or less:
         
-        {transcript[:3000]}  # Limit input size
+        {fit_text("video_summary", transcript)}
         
         Provide a concise summary highlighting main points.
         """
         
-        response = await self.llm_service.llm.ainvoke(prompt)
-        return response.content
+        return await self.llm_service.invoke_text(prompt, template_id="video_summary")
     
     async def _extract_key_points(self, transcript: str) -> list:
         """Extract key points from transcript"""
         prompt = f"""
         Extract key points from this video transcript:
         
-        {transcript[:2000]}
+        {fit_text("video_key_points", transcript)}
         
         Return as a JSON array of key points, each with:
         - timestamp_estimate (string)
@@ -128,26 +131,42 @@ class VideoService:
         """
         
         try:
-            from langchain_core.output_parsers import JsonOutputParser
-            parser = JsonOutputParser()
-            chain = prompt | self.llm_service.llm | parser
-            result = await chain.ainvoke({})
-            return result
-        except:
-            # Fallback to simple extraction
+            # Parsed through the cache so an unparseable completion is not stored
+            return await self.llm_service.invoke_text(
+                prompt, template_id="video_key_points", parser=JsonOutputParser()
+            )
+        except Exception as e:
+            logger.warning(f"Key point extraction failed: {e}")
             return ["Key point extraction failed"]
     
     async def explain_video(self, transcript: str, question: str) -> str:
         """Explain video content based on user question"""
-        prompt = f"""
+        return await self.llm_service.invoke_text(
+            self._explain_prompt(transcript, question),
+            template_id="video_explain",
+            priority=Priority.INTERACTIVE
+        )
+    
+    def stream_explanation(self, transcript: str, question: str) -> AsyncIterator[str]:
+        """Stream an answer about video content as it is generated"""
+        return self.llm_service.stream_text(
+            self._explain_prompt(transcript, question),
+            template_id="video_explain",
+            priority=Priority.INTERACTIVE
+        )
+    
+    def _explain_prompt(self, transcript: str, question: str) -> str:
+        return f"""
         Based on this video transcript, answer the following question:
         
-        Transcript: {transcript[:4000]}
+        Transcript: {fit_text("video_explain", transcript)}
         
         Question: {question}
         
         Provide a detailed explanation with timestamps if possible.
         """
-        
-        response = await self.llm_service.llm.ainvoke(prompt)
-        return response.content
\ No newline at end of file
+
+@lru_cache(maxsize=None)
+def get_video_service() -> VideoService:
+    """Shared VideoService instance; usable as a FastAPI dependency."""
+    return VideoService()
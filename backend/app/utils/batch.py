@@ -0,0 +1,46 @@
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, TypeVar
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+async def run_batch(
+    items: Sequence[T],
+    worker: Callable[[int, T], Awaitable[Dict[str, Any]]],
+    concurrency: int = 4
+) -> List[Dict[str, Any]]:
+    """Run ``worker`` over items with at most ``concurrency`` in flight.
+
+    Each worker handles (and persists) one item as soon as it is ready.
+    A failing item is reported with ``status="failed"`` instead of
+    aborting the batch. Results come back in input order.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(index: int, item: T) -> Dict[str, Any]:
+        async with semaphore:
+            started = time.monotonic()
+            try:
+                result = await worker(index, item)
+                result.setdefault("status", "completed")
+            except Exception as e:
+                logger.warning(f"Batch item {index} failed: {e}")
+                result = {"status": "failed", "error": str(e)}
+            result["index"] = index
+            result["elapsed_seconds"] = round(time.monotonic() - started, 3)
+            return result
+
+    tasks = [asyncio.ensure_future(run_one(i, item)) for i, item in enumerate(items)]
+    results = []
+    try:
+        for finished in asyncio.as_completed(tasks):
+            results.append(await finished)
+    finally:
+        # Cancelling the batch must not leave workers running unobserved
+        for task in tasks:
+            task.cancel()
+
+    return sorted(results, key=lambda r: r["index"])
@@ -0,0 +1,73 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from dataclasses import dataclass
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Step:
+    """One node of a step graph.
+
+    ``func`` is awaited with the results of ``depends_on`` passed as keyword
+    arguments named after those steps.
+    """
+    func: Callable[..., Awaitable[Any]]
+    depends_on: Sequence[str] = ()
+
+def topological_order(steps: Dict[str, Step]) -> List[str]:
+    """Order steps so every dependency comes first; raises ValueError on bad graphs."""
+    for name, step in steps.items():
+        unknown = [dep for dep in step.depends_on if dep not in steps]
+        if unknown:
+            raise ValueError(f"Step '{name}' depends on unknown steps: {unknown}")
+
+    order: List[str] = []
+    state: Dict[str, str] = {}
+
+    def visit(name: str) -> None:
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle through step '{name}'")
+        state[name] = "visiting"
+        for dep in steps[name].depends_on:
+            visit(dep)
+        state[name] = "done"
+        order.append(name)
+
+    for name in steps:
+        visit(name)
+    return order
+
+async def run_dag(steps: Dict[str, Step], timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Run steps concurrently, each as soon as its dependencies finish.
+
+    Total latency is that of the longest dependency chain rather than the
+    sum of all steps. The first failing step cancels the rest and its
+    exception propagates. Per-step durations are written to ``timings``
+    when a dict is given.
+    """
+    order = topological_order(steps)
+    tasks: Dict[str, asyncio.Future] = {}
+
+    async def run_step(name: str) -> Any:
+        step = steps[name]
+        inputs = {dep: await tasks[dep] for dep in step.depends_on}
+        started = time.monotonic()
+        result = await step.func(**inputs)
+        if timings is not None:
+            timings[name] = round(time.monotonic() - started, 3)
+        return result
+
+    for name in order:
+        tasks[name] = asyncio.ensure_future(run_step(name))
+
+    try:
+        results = await asyncio.gather(*tasks.values())
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+    return dict(zip(tasks, results))
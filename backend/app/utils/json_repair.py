@@ -0,0 +1,130 @@
+from typing import Any, Optional, Sequence
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+_FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+
+def _strip_fences(text: str) -> str:
+    """Prefer the first fenced block when the model wrapped its JSON in markdown."""
+    match = _FENCE_PATTERN.search(text)
+    if match:
+        return match.group(1)
+    # An unterminated fence still leaves a usable body after the opening line
+    return re.sub(r"^\s*```(?:json|JSON)?\s*", "", text)
+
+def _balanced_span(text: str) -> Optional[str]:
+    """Cut the first JSON object/array out of text, closing anything left open."""
+    start = None
+    for i, ch in enumerate(text):
+        if ch in _CLOSERS:
+            start = i
+            break
+    if start is None:
+        return None
+
+    stack = []
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            if stack and stack[-1] == ch:
+                stack.pop()
+            if not stack:
+                return text[start:i + 1]
+
+    # Truncated completion: close the open string and containers
+    tail = text[start:].rstrip().rstrip(",")
+    if in_string:
+        tail += '"'
+    return tail + "".join(reversed(stack))
+
+def repair_json(text: str) -> Any:
+    """Parse JSON from a raw LLM completion, repairing common defects.
+
+    Handles markdown fences, leading/trailing prose, unbalanced braces from
+    truncated output and trailing commas. Raises ValueError when nothing
+    usable can be recovered.
+    """
+    if not isinstance(text, str):
+        text = str(text)
+
+    candidate = _strip_fences(text).strip()
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+
+    span = _balanced_span(candidate)
+    if span is None:
+        raise ValueError("No JSON object found in LLM output")
+
+    span = _TRAILING_COMMA_PATTERN.sub(r"\1", span)
+    try:
+        return json.loads(span)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not repair LLM JSON output: {e}") from e
+
+def unwrap(result: Any, key: str, wrappers: Sequence[str] = ("test", "data", "result")) -> Any:
+    """Lift ``key`` (and sibling fields) out of a wrapper object such as ``{"test": {...}}``.
+
+    A bare list is treated as the value of ``key``.
+    """
+    if isinstance(result, list):
+        return {key: result}
+    if not isinstance(result, dict) or key in result:
+        return result
+
+    for wrapper in wrappers:
+        inner = result.get(wrapper)
+        if isinstance(inner, dict) and key in inner:
+            merged = {k: v for k, v in result.items() if k != wrapper}
+            for k, v in inner.items():
+                merged.setdefault(k, v)
+            return merged
+    return result
+
+class RepairingJsonOutputParser(JsonOutputParser):
+    """JsonOutputParser that repairs malformed completions instead of failing.
+
+    When ``required_key`` is set the parsed object must contain a non-empty
+    value for it, so an empty ``questions`` list counts as unusable output.
+    Failures raise OutputParserException carrying the raw completion.
+    """
+
+    required_key: Optional[str] = None
+
+    def parse(self, text: str) -> Any:
+        try:
+            result = repair_json(text)
+        except ValueError as e:
+            raise OutputParserException(str(e), llm_output=text) from e
+
+        if self.required_key:
+            result = unwrap(result, self.required_key)
+            if not isinstance(result, dict) or not result.get(self.required_key):
+                raise OutputParserException(
+                    f"LLM output has no usable '{self.required_key}'",
+                    llm_output=text
+                )
+        return result
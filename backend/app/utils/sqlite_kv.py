@@ -0,0 +1,82 @@
+from typing import Optional, Tuple
+from pathlib import Path
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SqliteKV:
+    """A small persistent key-value table in a local sqlite file.
+
+    The file is opened lazily and shared between threads. If it cannot be
+    opened (a sqlite error, or an unwritable path such as a read-only
+    serverless filesystem) the store disables itself and behaves as empty,
+    so callers keep working from memory. Later read and write failures
+    are logged and treated as misses. Calls block on file I/O; async
+    callers should run them in a worker thread.
+    """
+
+    def __init__(self, path: Optional[str], table: str, label: str):
+        self.path = path
+        self.table = table
+        self.label = label
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """The stored value and when it was stored, or None."""
+        row = self._run(f"SELECT value, stored_at FROM {self.table} WHERE key = ?", (key,), fetch=True)
+        return tuple(row) if row else None
+
+    def set(self, key: str, value: str, stored_at: Optional[float] = None) -> None:
+        self._run(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, stored_at) VALUES (?, ?, ?)",
+            (key, value, stored_at if stored_at is not None else time.time())
+        )
+
+    def delete(self, key: str) -> None:
+        self._run(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._run(f"DELETE FROM {self.table}")
+
+    def _run(self, sql: str, params: tuple = (), fetch: bool = False) -> Optional[tuple]:
+        conn = self._connection()
+        if conn is None:
+            return None
+        try:
+            with self._lock:
+                cursor = conn.execute(sql, params)
+                if fetch:
+                    return cursor.fetchone()
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"{self.label} {'read' if fetch else 'write'} failed: {e}")
+        return None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the sqlite file lazily; None when persistence is disabled."""
+        if not self.path:
+            return None
+        with self._lock:
+            if self._conn is None:
+                try:
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                    conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                        "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+                    )
+                    conn.commit()
+                    self._conn = conn
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning(f"{self.label} persistence disabled: {e}")
+                    self.path = None
+            return self._conn
@@ -0,0 +1,45 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from fastapi.responses import StreamingResponse
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"  # stop nginx from buffering the stream
+}
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """Encode one server-sent event; data is serialized as JSON."""
+    payload = json.dumps(data, default=str)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+async def stream_completion(
+    chunks: AsyncIterator[str],
+    on_complete: Callable[[str], Awaitable[Dict[str, Any]]]
+) -> AsyncIterator[str]:
+    """Relay LLM chunks as ``token`` events, then a final ``done`` event.
+
+    ``on_complete`` receives the full text once the stream ends (typically
+    to persist it) and returns the payload of the ``done`` event. Failures
+    are reported as an ``error`` event because the status code has already
+    been sent.
+    """
+    parts = []
+    try:
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield format_sse({"text": chunk}, event="token")
+
+        yield format_sse(await on_complete("".join(parts)), event="done")
+    except Exception as e:
+        logger.error(f"Streaming response failed: {e}")
+        yield format_sse({"detail": str(e)}, event="error")
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an event iterator in a text/event-stream response."""
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,137 @@
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from app.core.config import settings
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its vocabulary cannot be loaded offline
+    _encoding = None
+
+# Word/punctuation pieces; a close, dependency-free stand-in for BPE tokens
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Context budgets in tokens for the variable parts of each prompt
+TASK_BUDGETS: Dict[str, int] = {
+    "video_summary": 6000,
+    "video_key_points": 6000,
+    "video_explain": 8000,
+    "grading_detailed_feedback": 3000,
+    "grading_quality_analysis": 3000,
+    "grading_critical_thinking": 2500,
+    "grading_personalized_feedback": 1500,
+    "grading_exemplar_comparison": 3000,
+    "grading_improvements": 2500,
+    "grading_fused": 3000,
+    "grading_question": 1500,
+    "test_generator_context": 2000
+}
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, else a regex approximation."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(_TOKEN_PATTERN.findall(text))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the first ``max_tokens`` tokens of text."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if _encoding is not None:
+        tokens = _encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return _encoding.decode(tokens[:max_tokens])
+
+    for i, match in enumerate(_TOKEN_PATTERN.finditer(text)):
+        if i == max_tokens - 1:
+            return text[:match.end()]
+    return text
+
+@dataclass
+class Section:
+    """A named piece of prompt context.
+
+    Lower ``priority`` values are filled first; ``min_tokens`` is reserved
+    for the section before any priority ordering so a long high-priority
+    section cannot starve it completely.
+    """
+    name: str
+    text: str
+    priority: int = 0
+    min_tokens: int = 0
+
+class BudgetStats:
+    """Tokens sent and trimmed per task."""
+
+    def __init__(self):
+        self._tasks: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, task: str, sent: int, trimmed: int) -> None:
+        with self._lock:
+            stats = self._tasks.setdefault(task, {"calls": 0, "tokens_sent": 0, "tokens_trimmed": 0, "trimmed_calls": 0})
+            stats["calls"] += 1
+            stats["tokens_sent"] += sent
+            stats["tokens_trimmed"] += trimmed
+            if trimmed:
+                stats["trimmed_calls"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {task: dict(stats) for task, stats in self._tasks.items()}
+
+budget_stats = BudgetStats()
+
+def budget_for(task: str) -> int:
+    return TASK_BUDGETS.get(task, settings.LLM_CONTEXT_TOKEN_BUDGET)
+
+def fit_context(task: str, *sections: Section, max_tokens: Optional[int] = None) -> Dict[str, str]:
+    """Pack sections into the task's token budget.
+
+    Returns the (possibly trimmed) text per section name and records how
+    many tokens were sent and trimmed for the task.
+    """
+    budget = budget_for(task) if max_tokens is None else max_tokens
+    sizes = {section.name: count_tokens(section.text) for section in sections}
+    ordered: List[Section] = sorted(sections, key=lambda s: s.priority)
+
+    # Reserved minimums first, then remaining budget in priority order
+    allocation: Dict[str, int] = {}
+    remaining = budget
+    for section in ordered:
+        reserved = min(section.min_tokens, sizes[section.name], max(remaining, 0))
+        allocation[section.name] = reserved
+        remaining -= reserved
+    for section in ordered:
+        extra = min(sizes[section.name] - allocation[section.name], max(remaining, 0))
+        allocation[section.name] += extra
+        remaining -= extra
+
+    packed = {}
+    sent = trimmed = 0
+    for section in sections:
+        size, allowed = sizes[section.name], allocation[section.name]
+        if size <= allowed:
+            packed[section.name] = section.text
+            sent += size
+        else:
+            packed[section.name] = truncate_to_tokens(section.text, allowed) + f"\n[... {size - allowed} tokens trimmed ...]"
+            sent += allowed
+            trimmed += size - allowed
+
+    budget_stats.record(task, sent, trimmed)
+    if trimmed:
+        logger.debug(f"Trimmed {trimmed} tokens of context for {task} (budget {budget})")
+    return packed
+
+def fit_text(task: str, text: str, max_tokens: Optional[int] = None) -> str:
+    """Fit a single block of context into the task's token budget."""
+    return fit_context(task, Section("text", text), max_tokens=max_tokens)["text"]
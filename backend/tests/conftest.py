@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings require these at import time; tests never reach the services behind them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+os.environ.setdefault("LLM_CACHE_PATH", "")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,68 @@
+import pytest
+from app.services.answer_matcher import AnswerMatcher, parse_numbers
+
+matcher = AnswerMatcher(min_confidence=0.85, numeric_tolerance=0.01)
+
+def confident(question, answer):
+    grade = matcher.score(question, answer)
+    return grade if grade is not None and grade.confidence >= matcher.min_confidence else None
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,000", [1000.0]),
+    ("10,000 people", [10000.0]),
+    ("1,234,567.5", [1234567.5]),
+    ("4,5", [4.5]),
+    ("-3.25", [-3.25]),
+    ("2, 3", [2.0, 3.0]),
+])
+def test_parse_numbers(text, expected):
+    assert parse_numbers(text) == expected
+
+@pytest.mark.parametrize("answer", ["London, Berlin or Paris", "Paris or London", "maybe Paris"])
+def test_hedged_answer_is_escalated(answer):
+    assert confident({"expected_answer": "Paris"}, answer) is None
+
+def test_hedged_answer_with_expected_tokens_is_escalated():
+    assert confident({"expected_answer": "mitosis"}, "meiosis or mitosis") is None
+
+def test_negated_answer_is_escalated():
+    assert confident({"expected_answer": "mitochondria"}, "not the mitochondria") is None
+
+@pytest.mark.parametrize("answer", ["Paris", "paris.", " PARIS "])
+def test_exact_answer_is_correct(answer):
+    grade = confident({"expected_answer": "Paris"}, answer)
+    assert grade is not None and grade.fraction == 1.0
+
+def test_reordered_answer_is_correct():
+    grade = confident({"expected_answer": "chlorophyll a"}, "A chlorophyll")
+    assert grade is not None and grade.fraction == 1.0
+
+@pytest.mark.parametrize("expected, answer", [("1000", "1,000"), ("10000", "10,000 people"), ("4.5", "4,5"), ("5", "5")])
+def test_numeric_answer_is_correct(expected, answer):
+    grade = confident({"expected_answer": expected}, answer)
+    assert grade is not None and grade.fraction == 1.0
+
+@pytest.mark.parametrize("answer", ["not 5, it is 7", "5 or 7", "2 or 5", "it is not 5"])
+def test_numeric_answer_with_several_or_negated_numbers_is_escalated(answer):
+    assert confident({"expected_answer": "5"}, answer) is None
+
+def test_wrong_bare_number_is_wrong():
+    grade = confident({"expected_answer": "5"}, "7")
+    assert grade is not None and grade.fraction == 0.0
+
+def test_numeric_tolerance():
+    assert confident({"expected_answer": "9.81", "tolerance": 0.05}, "9.8").fraction == 1.0
+    assert confident({"expected_answer": "9.81", "tolerance": 0.05}, "9.7").fraction == 0.0
+
+def test_blank_answer_scores_zero():
+    grade = confident({"expected_answer": "Paris"}, "  ")
+    assert grade.method == "blank" and grade.fraction == 0.0
+
+def test_essay_and_keyless_questions_are_not_scored():
+    assert matcher.score({"type": "essay", "expected_answer": "x"}, "x") is None
+    assert matcher.score({"question": "Why?"}, "because") is None
+
+def test_keyword_coverage():
+    question = {"expected_answer": ["light energy", "chloroplasts", "glucose"]}
+    assert confident(question, "Using light energy, chloroplasts make glucose").fraction == 1.0
+    assert confident(question, "Plants make food") is None
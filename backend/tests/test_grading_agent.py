@@ -0,0 +1,55 @@
+import asyncio
+import json
+import pytest
+from app.ai.agents.grading_agent import GradingAgent
+from app.services.grading_memory import GradingMemory
+from app.services.grading_service import GradingService
+
+class CannedLLM:
+    """Stands in for LLMService, answering every prompt with one completion."""
+    model_id = "canned"
+
+    def __init__(self, response):
+        self.response = response
+
+    async def invoke_text(self, prompt, **kwargs):
+        return self.response
+
+FUSED = {
+    "score": 80,
+    "feedback": "Good",
+    "strengths": ["Clear"],
+    "areas_of_improvement": ["Depth"],
+    "quality_scores": {"completeness": 8, "relevance": 7},
+    "critical_thinking": {"score": 6, "strengths": ["Argues"], "weaknesses": [], "examples": "x"},
+    "personalized_feedback": "Keep going",
+    "improvement_suggestions": ["Add sources"]
+}
+
+def fused(response):
+    llm = CannedLLM(response)
+    agent = GradingAgent(llm_service=llm, grading_service=GradingService(llm), memory=GradingMemory())
+    assignment = {"topic": "Photosynthesis", "max_score": 100}
+    rubric = agent.grading_service._create_grading_rubric(agent._as_assignment(assignment))
+    return asyncio.run(agent._fused_evaluation(assignment, "Plants make sugar.", rubric, False))
+
+def test_fused_evaluation_parses_a_well_formed_reply():
+    aspects = fused(json.dumps(FUSED))
+    assert aspects["quality_analysis"]["overall_quality"] == 7.5
+    assert aspects["critical_thinking"]["critical_thinking_score"] == 6.0
+    assert aspects["improvement_suggestions"]["improvement_suggestions"] == ["Add sources"]
+
+@pytest.mark.parametrize("override", [
+    {"score": "85/100"},
+    {"score": "NaN"},
+    {"critical_thinking": "Shows some analysis"},
+    {"critical_thinking": {"score": "high"}},
+    {"quality_scores": [8, 7]},
+    {"quality_scores": {"depth": "deep"}},
+    {"improvement_suggestions": {"first": "Add sources"}}
+])
+def test_fused_evaluation_returns_none_for_malformed_fields(override):
+    assert fused(json.dumps({**FUSED, **override})) is None
+
+def test_fused_evaluation_returns_none_for_unparseable_reply():
+    assert fused("I would give this an 85.") is None
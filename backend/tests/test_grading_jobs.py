@@ -0,0 +1,141 @@
+from uuid import UUID
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.core.database import Base, get_db
+from app.core.security import get_current_user
+from app.models.user import User, UserRole
+from app.models.course import Course
+from app.models.assessment import (
+    Assignment, AssignmentStatus, AssignmentSubmission, GradingJob, GradingJobStatus, QuestionGrade
+)
+from app.services.grading_jobs import GradingJobRunner
+from app.services.grading_service import GradingService, question_hash
+
+QUESTIONS = [
+    {"question": "Explain photosynthesis", "type": "essay", "points": 50},
+    {"question": "What is chlorophyll?", "type": "essay", "points": 50}
+]
+
+class FixedLLM:
+    """Stands in for LLMService, giving every question half marks."""
+    model_id = "fixed"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def grade_question(self, number, question, answer, max_score, **kwargs):
+        self.calls += 1
+        return {"score": max_score / 2, "feedback": "new", "strengths": [], "areas_of_improvement": []}
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def seeded(session_factory):
+    db = session_factory()
+    lecturer = User(email="l@example.com", full_name="L", hashed_password="x", role=UserRole.LECTURER)
+    db.add(lecturer)
+    db.flush()
+    course = Course(title="Biology", code="BIO1", lecturer_id=lecturer.id)
+    db.add(course)
+    db.flush()
+    assignment = Assignment(
+        title="Photosynthesis", course_id=course.id, lecturer_id=lecturer.id, max_score=100,
+        status=AssignmentStatus.PUBLISHED, questions=QUESTIONS
+    )
+    db.add(assignment)
+    db.flush()
+    submissions = []
+    for i in range(2):
+        student = User(email=f"s{i}@example.com", full_name=f"S{i}", hashed_password="x", role=UserRole.STUDENT)
+        db.add(student)
+        db.flush()
+        submission = AssignmentSubmission(
+            assignment_id=assignment.id, student_id=student.id, content="1. Light to sugar\n2. A pigment",
+            score=80, feedback="auto", is_graded=True
+        )
+        db.add(submission)
+        db.flush()
+        for index, question in enumerate(QUESTIONS):
+            db.add(QuestionGrade(
+                submission_id=submission.id, question_index=index, question_hash=question_hash(question),
+                score=40, max_score=50, feedback="old", strengths=[], areas_of_improvement=[]
+            ))
+        submissions.append(submission)
+    db.commit()
+
+    app.dependency_overrides[get_db] = lambda: (yield from _session(session_factory))
+    app.dependency_overrides[get_current_user] = lambda: lecturer
+    yield db, assignment, submissions
+    app.dependency_overrides.clear()
+    db.close()
+
+def _session(session_factory):
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def edited_questions():
+    return [QUESTIONS[0], {**QUESTIONS[1], "question": "Where is chlorophyll found?"}]
+
+def test_question_edit_leaves_manually_graded_submissions_alone(seeded, session_factory):
+    db, assignment, (auto, manual) = seeded
+    client = TestClient(app)
+    response = client.post(
+        f"/api/v1/assignments/submissions/{manual.id}/grade", data={"score": 65, "feedback": "Marked by hand"}
+    )
+    assert response.status_code == 200
+
+    response = client.put(
+        f"/api/v1/assignments/assignments/{assignment.id}/questions", json={"questions": edited_questions()}
+    )
+    assert response.status_code == 200
+    job = db.get(GradingJob, UUID(response.json()["grading_job"]["id"]))
+    assert job.submission_ids == [str(auto.id)]
+
+    llm = FixedLLM()
+    runner = GradingJobRunner(grading_service=GradingService(llm), session_factory=session_factory)
+    asyncio.run(runner.run(job.id))
+    db.expire_all()
+    assert llm.calls == 1
+    assert (manual.score, manual.feedback, manual.question_grades) == (65, "Marked by hand", [])
+    assert auto.score == 65.0 and [g.feedback for g in auto.question_grades] == ["old", "new"]
+
+def test_partial_regrade_skips_submissions_graded_by_hand_after_the_job_was_queued(seeded, session_factory):
+    db, assignment, (auto, manual) = seeded
+    assignment.questions = edited_questions()
+    db.commit()
+    runner = GradingJobRunner(grading_service=GradingService(FixedLLM()), session_factory=session_factory)
+    job = runner.create_job(db, assignment, assignment.lecturer_id, question_indices=[1])
+    assert set(job.submission_ids) == {str(auto.id), str(manual.id)}
+
+    manual.score = 65
+    manual.question_grades.clear()
+    db.commit()
+    asyncio.run(runner.run(job.id))
+    db.expire_all()
+    assert manual.score == 65
+    assert db.get(GradingJob, job.id).results[str(manual.id)]["status"] == "skipped"
+
+def test_question_edit_waits_for_single_submission_jobs(seeded):
+    db, assignment, (auto, _) = seeded
+    db.add(GradingJob(
+        assignment_id=assignment.id, submission_id=auto.id, requested_by=auto.student_id,
+        status=GradingJobStatus.RUNNING, submission_ids=[str(auto.id)], results={}, total_count=1
+    ))
+    db.commit()
+    response = TestClient(app).put(
+        f"/api/v1/assignments/assignments/{assignment.id}/questions", json={"questions": edited_questions()}
+    )
+    assert response.status_code == 409
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+import asyncio
+from app.services.grading_service import GradingService, match_questions, question_hash, rubric_criteria
+
+class RecordingLLM:
+    """Stands in for LLMService and records each per-question call."""
+    model_id = "recording"
+
+    def __init__(self):
+        self.calls = []
+
+    async def grade_question(self, number, question, answer, max_score, **kwargs):
+        self.calls.append(kwargs)
+        return {"score": max_score / 2, "feedback": "ok", "strengths": [], "areas_of_improvement": []}
+
+RUBRIC = {
+    "version": 3,
+    "criteria": [
+        {"criterion": "Reasoning", "weight": 60, "description": "Justifies each step", "levels": {"excellent": "Every step justified"}},
+        {"criterion": "Clarity", "weight": 40, "description": "Clear notation"}
+    ]
+}
+
+def test_rubric_criteria_renders_weights_and_levels():
+    text = rubric_criteria(RUBRIC)
+    assert text.splitlines() == [
+        "- Reasoning (60%): Justifies each step; levels: excellent: Every step justified",
+        "- Clarity (40%): Clear notation"
+    ]
+    assert rubric_criteria({}) == ""
+
+def test_grade_questions_sends_rubric_criteria_to_each_question():
+    llm = RecordingLLM()
+    assignment = SimpleNamespace(
+        id=None, max_score=100,
+        questions=[{"question": "Prove it", "type": "essay"}, {"question": "Explain it", "type": "essay"}]
+    )
+    result = asyncio.run(GradingService(llm).grade_questions(assignment, "1. proof\n2. explanation", rubric=RUBRIC))
+    assert result["score"] == 50
+    assert len(llm.calls) == 2
+    for call in llm.calls:
+        assert call["criteria"] == rubric_criteria(RUBRIC)
+        assert call["rubric_version"] == 3
+
+def test_match_questions_follows_moved_questions():
+    old = {0: "a", 1: "b", 2: "c"}
+    assert match_questions(old, ["a", "b", "c"]) == {0: 0, 1: 1, 2: 2}
+    assert match_questions(old, ["new", "a", "b", "c"]) == {1: 0, 2: 1, 3: 2}
+    assert match_questions(old, ["a", "c"]) == {0: 0, 1: 2}
+    assert match_questions(old, ["c", "edited", "a"]) == {0: 2, 2: 0}
+
+def test_match_questions_pairs_duplicates_once():
+    assert match_questions({0: "a", 1: "a"}, ["b", "a", "a", "a"]) == {1: 1, 2: 0}
+
+def test_grade_questions_carries_grades_after_an_insert():
+    llm = RecordingLLM()
+    old = [{"question": "Prove it", "type": "essay"}, {"question": "Explain it", "type": "essay"}]
+    existing = {
+        i: {"question_hash": question_hash(q), "score": 40.0, "max_score": 50.0, "feedback": f"old {i}",
+            "strengths": [], "areas_of_improvement": []}
+        for i, q in enumerate(old)
+    }
+    assignment = SimpleNamespace(id=None, max_score=150, questions=[{"question": "New one", "type": "essay"}] + old)
+    result = asyncio.run(GradingService(llm).grade_questions(assignment, "1. a\n2. b\n3. c", existing=existing))
+    assert len(llm.calls) == 1
+    carried = {q["index"]: q for q in result["questions"] if not q["regraded"]}
+    assert {i: q["feedback"] for i, q in carried.items()} == {1: "old 0", 2: "old 1"}
+    assert carried[1]["score"] == 40.0
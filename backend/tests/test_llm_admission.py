@@ -0,0 +1,42 @@
+import asyncio
+import time
+from app.services.llm_admission import AdmissionController, Priority
+
+def test_throttled_caller_does_not_hold_a_slot():
+    # One request per second with the bucket drained: a bulk call already
+    # waiting on the rate limit must not keep an interactive call behind it.
+    admission = AdmissionController(max_concurrency=1, requests_per_minute=60)
+    admission.request_bucket.tokens = 0
+    order = []
+
+    async def call(name, priority):
+        async with admission.admit(priority) as waited:
+            order.append((name, waited))
+
+    async def scenario():
+        bulk = asyncio.create_task(call("bulk", Priority.BULK))
+        await asyncio.sleep(0.1)
+        assert admission.stats()["in_flight"] == 0
+        assert admission.queue_depth()["bulk"] == 1
+        await call("interactive", Priority.INTERACTIVE)
+        await bulk
+
+    asyncio.run(scenario())
+    assert [name for name, _ in order] == ["interactive", "bulk"]
+    assert order[0][1] < 1.2
+    assert admission.stats()["in_flight"] == 0
+
+def test_cancelled_waiter_releases_its_place():
+    admission = AdmissionController(max_concurrency=1)
+
+    async def scenario():
+        async with admission.admit():
+            waiter = asyncio.create_task(admission.admit().__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        async with admission.admit() as waited:
+            return waited
+
+    assert asyncio.run(scenario()) < 0.1
+    assert admission.stats()["in_flight"] == 0
@@ -0,0 +1,26 @@
+import asyncio
+from app.services.llm_cache import LLMResponseCache
+
+def test_unwritable_path_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    cache = LLMResponseCache(db_path=str(blocker / "llm_cache.sqlite3"))
+
+    async def roundtrip():
+        await cache.set("k", "completion")
+        return await cache.get("k")
+
+    assert asyncio.run(roundtrip()) == "completion"
+    assert not cache._disk.enabled
+
+def test_sqlite_tier_survives_a_new_instance(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    asyncio.run(LLMResponseCache(db_path=path).set("k", "completion"))
+    fresh = LLMResponseCache(db_path=path)
+    assert asyncio.run(fresh.get("k")) == "completion"
+    assert fresh.stats()["disk_hits"] == 1
+
+def test_expired_entries_miss(tmp_path):
+    cache = LLMResponseCache(ttl_seconds=-1, db_path=str(tmp_path / "llm_cache.sqlite3"))
+    asyncio.run(cache.set("k", "completion"))
+    assert asyncio.run(cache.get("k")) is None
@@ -0,0 +1,45 @@
+import asyncio
+from langchain_core.messages import HumanMessage
+from app.services.llm_router import RoutedChatModel, latency_critical
+
+class SlowBackend:
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+
+    async def _agenerate(self, messages, stop=None, **kwargs):
+        self.started += 1
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+def run_and_cancel(router, after):
+    """Cancel a hedged call and report which backend calls were cancelled.
+
+    Checked before the loop closes, since asyncio.run cancels leftovers.
+    """
+    backends = list(router.backends.values())
+
+    async def scenario():
+        with latency_critical():
+            call = asyncio.create_task(router._agenerate([HumanMessage(content="hi")]))
+        await asyncio.sleep(after)
+        call.cancel()
+        await asyncio.gather(call, return_exceptions=True)
+        await asyncio.sleep(0)
+        return [backend.cancelled for backend in backends]
+
+    return asyncio.run(scenario())
+
+def test_cancel_before_hedge_cancels_primary():
+    primary, hedge = SlowBackend(), SlowBackend()
+    router = RoutedChatModel(backends={"a": primary, "b": hedge}, hedge_delay=1.0)
+    assert run_and_cancel(router, 0.05) == [1, 0]
+    assert hedge.started == 0
+
+def test_cancel_after_hedge_cancels_both():
+    primary, hedge = SlowBackend(), SlowBackend()
+    router = RoutedChatModel(backends={"a": primary, "b": hedge}, hedge_delay=0.01)
+    assert run_and_cancel(router, 0.1) == [1, 1]
@@ -0,0 +1,34 @@
+import pytest
+from app.services.semantic_cache import SemanticCache, embed, normalize
+
+def similarity(a, b):
+    return float(embed(a) @ embed(b))
+
+def test_normalize_keeps_symbol_bearing_words_and_order():
+    assert normalize("C++ programming") == ["c++", "programming"]
+    assert normalize("Intro to C# and .NET") == ["c#", ".net"]
+    assert normalize("Python to Java") == ["python", "java"]
+
+@pytest.mark.parametrize("a, b", [
+    ("C programming", "C++ programming"),
+    ("C programming", "C# programming"),
+    ("C++ programming", "C# programming"),
+    ("Java to Python", "Python to Java"),
+    (".NET basics", "NET basics")
+])
+def test_different_topics_fall_below_the_threshold(a, b):
+    assert similarity(a, b) < 0.92
+
+@pytest.mark.parametrize("a, b", [
+    ("Introduction to Photosynthesis", "photosynthesis basics"),
+    ("Neural networks", "neural network"),
+    ("Linear algebra", "linear algebra for beginners")
+])
+def test_padded_or_inflected_topics_still_match(a, b):
+    assert similarity(a, b) >= 0.92
+
+def test_lookup_does_not_serve_a_colliding_topic():
+    cache = SemanticCache(families="flashcards", threshold=0.92)
+    cache.store("flashcards", "scope", "C programming", "cards about C")
+    assert cache.lookup("flashcards", "scope", "C++ programming") is None
+    assert cache.lookup("flashcards", "scope", "Intro to C programming") == "cards about C"
@@ -0,0 +1,26 @@
+from app.services.grading_memory import GradingMemory
+from app.utils.sqlite_kv import SqliteKV
+
+def test_roundtrip_and_delete(tmp_path):
+    store = SqliteKV(str(tmp_path / "kv.sqlite3"), "items", "Test store")
+    store.set("k", "v", stored_at=5.0)
+    assert store.get("k") == ("v", 5.0)
+    store.delete("k")
+    assert store.get("k") is None
+
+def test_unwritable_path_disables_the_store(tmp_path):
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    store = SqliteKV(str(blocker / "kv.sqlite3"), "items", "Test store")
+    store.set("k", "v")
+    assert store.get("k") is None
+    assert not store.enabled
+
+def test_grading_memory_reloads_evicted_scopes_from_disk(tmp_path):
+    path = str(tmp_path / "memory.sqlite3")
+    memory = GradingMemory(max_scopes=1, window=2, db_path=path)
+    memory.add("s1", "c1", "Essay 1", 8, 10, strengths=["clear"])
+    memory.add("s2", "c1", "Essay 1", 6, 10)
+    assert memory.stats()["evictions"] == 1
+    assert [e["score"] for e in memory.history("s1", "c1")] == [8]
+    assert GradingMemory(db_path=path).history("s2", "c1")[0]["score"] == 6
@@ -0,0 +1,144 @@
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.models.user import User, UserRole
+from app.models.course import Course
+from app.models import assessment
+from app.services.test_scoring import compile_answer_key, rescore_attempts, score_attempt, score_matrix
+
+def make_test(questions, answers=None):
+    return SimpleNamespace(id="test-1", questions=questions, answers=answers or {})
+
+def score(questions, answers, test_answers=None):
+    key = compile_answer_key(make_test(questions, test_answers))
+    return score_attempt(key, [{"question_id": qid, "answer": answer} for qid, answer in answers.items()])
+
+def test_numeric_key_with_thousands_separator():
+    key = compile_answer_key(make_test([{"id": "q1", "question": "x", "correct_answer": "1,000"}]))
+    entry = key.entries["q1"]
+    assert entry.mode == "numeric" and entry.value == 1000.0
+
+@pytest.mark.parametrize("answer, earned", [("1000", 1.0), ("1,000", 1.0), (1000, 1.0), ("100", 0.0)])
+def test_numeric_answers(answer, earned):
+    result = score([{"id": "q1", "question": "x", "correct_answer": "1,000"}], {"q1": answer})
+    assert result.breakdown["questions"][0]["earned"] == earned
+
+@pytest.mark.parametrize("answer", ["2 or 3", "not 3, it is 2", "3 or 2"])
+def test_numeric_answer_with_several_or_negated_numbers_scores_nothing(answer):
+    result = score([{"id": "q1", "question": "x", "correct_answer": 2}], {"q1": answer})
+    question = result.breakdown["questions"][0]
+    assert question["earned"] == 0.0 and question["needs_review"]
+
+def test_numeric_tolerance():
+    questions = [{"id": "q1", "question": "pi", "correct_answer": "3.14", "tolerance": 0.01}]
+    assert score(questions, {"q1": "3.1416"}).score == 100.0
+    assert score(questions, {"q1": "3"}).score == 0.0
+
+def test_multiple_choice_accepts_letter_or_option_text():
+    questions = [{"id": "q1", "question": "Capital", "options": ["A) Berlin", "B) Paris"], "correct_answer": "Paris"}]
+    key = compile_answer_key(make_test(questions))
+    assert key.entries["q1"].mode == "exact"
+    for answer in ("B", "b", "Paris", "B) Paris"):
+        assert score(questions, {"q1": answer}).score == 100.0
+    assert score(questions, {"q1": "A"}).score == 0.0
+
+def test_multi_select_partial_credit():
+    questions = [{"id": "q1", "question": "Primes", "type": "multi_select",
+                  "options": ["2", "3", "4", "5"], "correct_answer": ["2", "3", "5"], "points": 3}]
+    assert score(questions, {"q1": ["A", "B", "D"]}).earned == 3.0
+    assert score(questions, {"q1": ["A", "B"]}).earned == 2.0
+    assert score(questions, {"q1": ["A", "B", "C", "D"]}).earned == 2.0
+    assert score(questions, {"q1": ["A", "B", "C", "D", "C"]}).earned == 2.0
+
+def test_points_weighting_and_unanswered_questions():
+    questions = [
+        {"id": "q1", "question": "a", "correct_answer": "Paris", "points": 3},
+        {"id": "q2", "question": "b", "correct_answer": "Rome", "points": 1},
+    ]
+    result = score(questions, {"q1": "paris"})
+    assert result.score == 75.0
+    assert [q["answered"] for q in result.breakdown["questions"]] == [True, False]
+
+def test_questions_without_id_use_position_and_test_answers():
+    result = score([{"question": "a"}, {"question": "b"}], {"0": "Paris", "1": "Rome"}, {"0": "Paris", "1": "Oslo"})
+    assert result.score == 50.0
+
+def test_hedged_text_answer_is_not_credited():
+    questions = [{"id": "q1", "question": "Capital", "type": "text_based",
+                  "expected_answer": "the capital city of France is Paris"}]
+    result = score(questions, {"q1": "the capital city of France is London or Paris"})
+    assert result.breakdown["questions"][0]["earned"] == 0.0
+
+MIXED = [
+    {"id": "mc", "question": "Capital", "options": ["A) Berlin", "B) Paris"], "correct_answer": "B", "points": 2},
+    {"id": "ms", "question": "Primes", "type": "multi_select", "options": ["2", "3", "4", "5"],
+     "correct_answer": ["2", "3", "5"], "points": 3},
+    {"id": "num", "question": "pi", "correct_answer": "3.14", "tolerance": 0.01},
+    {"id": "txt", "question": "Why", "type": "text_based", "expected_answer": "plants convert light into sugar"},
+]
+
+ATTEMPTS = [
+    [{"question_id": "mc", "answer": "B"}, {"question_id": "ms", "answer": ["A", "B", "D"]},
+     {"question_id": "num", "answer": "3.1416"}, {"question_id": "txt", "answer": "Plants convert light into sugar."}],
+    [{"question_id": "mc", "answer": "Berlin"}, {"question_id": "ms", "answer": ["A", "C"]},
+     {"question_id": "num", "answer": "3 or 4"}, {"question_id": "txt", "answer": "photosynthesis happens"}],
+    [],
+    [{"question_id": "ms", "answer": "B, D"}, {"question_id": "unknown", "answer": "x"}],
+    # Repeated question ids keep the last answer
+    [{"question_id": "mc", "answer": "A"}, {"question_id": "mc", "answer": "B"},
+     {"question_id": "num", "answer": 3.14}, {"question_id": "num", "answer": "2"}],
+    [{"question_id": "mc", "answer": "B"}, {"question_id": "ms", "answer": ["A", "B", "D"]},
+     {"question_id": "num", "answer": "1,000"}, {"question_id": "txt", "answer": ""}],
+]
+
+def test_score_matrix_matches_score_attempt_row_for_row():
+    key = compile_answer_key(make_test(MIXED))
+    fractions, answered, review = score_matrix(key, ATTEMPTS)
+    entries = list(key.entries.values())
+    for i, answers in enumerate(ATTEMPTS):
+        expected = score_attempt(key, answers).breakdown["questions"]
+        for j, (entry, question) in enumerate(zip(entries, expected)):
+            assert round(fractions[i, j] * entry.points, 4) == question["earned"], (i, entry.question_id)
+            assert bool(answered[i, j]) == question["answered"], (i, entry.question_id)
+            assert bool(review[i, j]) == question.get("needs_review", False), (i, entry.question_id)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def test_rescore_keeps_previous_points_for_answers_needing_review(db):
+    lecturer = User(email="l@example.com", full_name="L", hashed_password="x", role=UserRole.LECTURER)
+    student = User(email="s@example.com", full_name="S", hashed_password="x", role=UserRole.STUDENT)
+    db.add_all([lecturer, student])
+    db.flush()
+    course = Course(title="Biology", code="BIO1", lecturer_id=lecturer.id)
+    db.add(course)
+    db.flush()
+    test = assessment.Test(title="T", course_id=course.id, lecturer_id=lecturer.id, test_type=assessment.TestType.MIXED, questions=MIXED, answers={})
+    db.add(test)
+    db.flush()
+    answers = ATTEMPTS[1]
+    breakdown = score_attempt(compile_answer_key(test), answers).breakdown
+    for question in breakdown["questions"]:
+        if question["question_id"] == "txt":
+            question["earned"] = 0.5  # marked by hand
+    attempt = assessment.TestAttempt(test_id=test.id, student_id=student.id, answers=answers, score=10.0,
+                          score_breakdown=breakdown, is_completed=True)
+    db.add(attempt)
+    db.commit()
+
+    result = rescore_attempts(db, test)
+    db.refresh(attempt)
+    questions = {q["question_id"]: q for q in attempt.score_breakdown["questions"]}
+    assert questions["txt"]["earned"] == 0.5 and questions["txt"]["needs_review"]
+    assert questions["num"]["earned"] == 0.0 and questions["num"]["needs_review"]
+    assert attempt.score == round(0.5 / 7 * 100, 2)
+    assert result["attempts"] == 1